@@ -0,0 +1,364 @@
+import datetime
+import json
+import math
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from config import db, app
+from models import Expenses, SpendingAnomaly, SpendingObservation, SpendingStat
+
+# A charge is flagged once its category has enough history and it stands out on every measure:
+# z-score against the long-run (Welford) or recent (EWMA) mean, above the running p95, and by a real amount
+MIN_HISTORY = 8
+Z_THRESHOLD = 3.0
+MIN_DEVIATION = 20.0
+EWMA_ALPHA = 0.1
+QUANTILE = 0.95
+UNCATEGORIZED = 'Uncategorized'
+CHUNK = 500
+
+stats_table = SpendingStat.__table__
+observations = SpendingObservation.__table__
+anomalies = SpendingAnomaly.__table__
+
+class P2Quantile:
+    # Jain & Chlamtac P-square estimator: one quantile from five markers, O(1) per observation
+    def __init__(self, p, state=None):
+        self.p = p
+        state = state or {}
+        self.initial = state.get('initial', [])
+        self.q = state.get('q')
+        self.n = state.get('n')
+        self.desired = state.get('desired')
+
+    def state(self):
+        if self.q is None:
+            return {'initial': self.initial}
+        return {'q': self.q, 'n': self.n, 'desired': self.desired}
+
+    def add(self, x):
+        if self.q is None:
+            self.initial.append(x)
+            if len(self.initial) == 5:
+                p = self.p
+                self.q = sorted(self.initial)
+                self.n = [1, 2, 3, 4, 5]
+                self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+                self.initial = []
+            return
+
+        q, n = self.q, self.n
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= x < q[i + 1])
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i, step in enumerate((0, self.p / 2, self.p, (1 + self.p) / 2, 1)):
+            self.desired[i] += step
+
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                parabolic = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if q[i - 1] < parabolic < q[i + 1]:
+                    q[i] = parabolic
+                else:
+                    q[i] = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                n[i] += d
+
+    def value(self):
+        if self.q is not None:
+            return self.q[2]
+        if not self.initial:
+            return None
+        ordered = sorted(self.initial)
+        return ordered[min(len(ordered) - 1, int(self.p * len(ordered)))]
+
+class OnlineStats:
+    def __init__(self, row=None):
+        row = row or {}
+        self.id = row.get('id')
+        self.count = row.get('count', 0)
+        self.mean = row.get('mean', 0.0)
+        self.m2 = row.get('m2', 0.0)
+        self.ewma = row.get('ewma', 0.0)
+        self.ewm_var = row.get('ewm_var', 0.0)
+        self.quantile = P2Quantile(QUANTILE, json.loads(row['sketch']) if row.get('sketch') else None)
+        self.last_date = row.get('last_date')
+
+    def score(self, amount):
+        # Returns (z, reason) when the amount is anomalous for this category, before it is folded in
+        if self.count < MIN_HISTORY:
+            return None
+        std = math.sqrt(self.m2 / (self.count - 1))
+        ewm_std = math.sqrt(self.ewm_var)
+        z = (amount - self.mean) / std if std else (math.inf if amount > self.mean else 0.0)
+        ewm_z = (amount - self.ewma) / ewm_std if ewm_std else (math.inf if amount > self.ewma else 0.0)
+        p95 = self.quantile.value()
+        if max(z, ewm_z) < Z_THRESHOLD or amount <= p95 or amount - self.mean < MIN_DEVIATION:
+            return None
+        z = min(max(z, ewm_z), 99.0)
+        return z, f"${amount:,.2f} is {z:.1f}σ above the usual ${self.mean:,.2f} (95th percentile ${p95:,.2f})"
+
+    def add(self, amount, day):
+        self.count += 1
+        delta = amount - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (amount - self.mean)
+        if self.count == 1:
+            self.ewma, self.ewm_var = amount, 0.0
+        else:
+            diff = amount - self.ewma
+            increment = EWMA_ALPHA * diff
+            self.ewma += increment
+            self.ewm_var = (1 - EWMA_ALPHA) * (self.ewm_var + diff * increment)
+        self.quantile.add(amount)
+        self.last_date = max(self.last_date, day) if self.last_date else day
+
+    def row(self, user_id, category):
+        return {'user_id': user_id, 'category': category, 'count': self.count, 'mean': self.mean, 'm2': self.m2,
+                'ewma': self.ewma, 'ewm_var': self.ewm_var, 'sketch': json.dumps(self.quantile.state()),
+                'last_date': self.last_date}
+
+def _to_date(value):
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value)[:10])
+
+def _plaid_category(transaction):
+    primary = (transaction.get('personal_finance_category') or {}).get('primary')
+    if primary:
+        return primary
+    # Legacy Plaid category hierarchy; categorization.py replaces 'category' with a plain string
+    legacy = transaction.get('category')
+    return legacy[0] if isinstance(legacy, list) and legacy else UNCATEGORIZED
+
+def _observe(stats, observation, flagged):
+    key = (observation['user_id'], observation['category'])
+    state = stats.get(key)
+    if state is None:
+        state = stats[key] = OnlineStats()
+    result = state.score(observation['amount'])
+    if result:
+        z, reason = result
+        flagged.append(dict(observation, expected_amount=round(state.mean, 2), z_score=round(z, 2), reason=reason))
+    state.add(observation['amount'], observation['date'])
+
+def _claim(connection, fresh, dialect):
+    # Record the observations; one already recorded by a concurrent ingest is skipped, not folded twice
+    fresh = sorted(fresh, key=lambda o: (o['kind'], o['ref']))
+    if not dialect:
+        connection.execute(observations.insert(), fresh)
+        return fresh
+    insert = dialect.insert(observations).on_conflict_do_nothing(index_elements=['kind', 'ref'])
+    claimed = set()
+    for start in range(0, len(fresh), CHUNK):
+        claimed.update(tuple(row) for row in connection.execute(
+            insert.returning(observations.c.kind, observations.c.ref), fresh[start:start + CHUNK]
+        ))
+    return [o for o in fresh if (o['kind'], o['ref']) in claimed]
+
+def _lock_stats(connection, keys, dialect):
+    # Creates missing (user, category) rows, then reads them all locked (FOR UPDATE on Postgres; on SQLite
+    # the observation insert already holds the database write lock), so concurrent ingests fold one after another
+    if dialect:
+        connection.execute(
+            dialect.insert(stats_table).on_conflict_do_nothing(index_elements=['user_id', 'category']),
+            [OnlineStats().row(*key) for key in keys],
+        )
+    query = (
+        sa.select(stats_table)
+        .where(sa.tuple_(stats_table.c.user_id, stats_table.c.category).in_(keys))
+        .order_by(stats_table.c.user_id, stats_table.c.category)
+        .with_for_update()
+    )
+    stats = {(row['user_id'], row['category']): OnlineStats(row) for row in connection.execute(query).mappings()}
+    missing = [key for key in keys if key not in stats]
+    if missing:
+        connection.execute(stats_table.insert(), [OnlineStats().row(*key) for key in missing])
+        stats.update({(row['user_id'], row['category']): OnlineStats(row) for row in connection.execute(query).mappings()})
+    return stats
+
+def ingest(connection, incoming):
+    # Fold new outflows into the running statistics; each charge is counted once however often it is re-fetched
+    incoming = {(o['kind'], o['ref']): o for o in incoming if o['user_id'] and o['amount'] > 0}
+    if not incoming:
+        return []
+
+    refs = list(incoming)
+    for start in range(0, len(refs), CHUNK):
+        chunk = refs[start:start + CHUNK]
+        seen = connection.execute(
+            sa.select(observations.c.kind, observations.c.ref)
+            .where(sa.tuple_(observations.c.kind, observations.c.ref).in_(chunk))
+        )
+        for row in seen:
+            incoming.pop(tuple(row), None)
+    if not incoming:
+        return []
+
+    dialect = {'sqlite': sqlite, 'postgresql': postgresql}.get(connection.dialect.name)
+    fresh = _claim(connection, list(incoming.values()), dialect)
+    if not fresh:
+        return []
+    fresh.sort(key=lambda o: (o['date'], o['ref']))
+    stats = _lock_stats(connection, sorted({(o['user_id'], o['category']) for o in fresh}), dialect)
+
+    flagged = []
+    for observation in fresh:
+        _observe(stats, observation, flagged)
+
+    if flagged:
+        connection.execute(anomalies.insert(), flagged)
+    touched = {(o['user_id'], o['category']) for o in fresh}
+    connection.execute(
+        stats_table.update().where(stats_table.c.id == sa.bindparam('stat_id')),
+        [dict(stats[key].row(*key), stat_id=stats[key].id) for key in touched],
+    )
+    return flagged
+
+def detect_anomalies(user_id, transactions):
+    # Transaction hook for GET /api/transactions; Plaid reports outflows as positive amounts
+    incoming = [
+        {
+            'user_id': user_id,
+            'kind': 'transaction',
+            'ref': t['transaction_id'],
+            'category': _plaid_category(t)[:100],
+            'merchant': (t.get('merchant_name') or t.get('name') or '')[:200] or None,
+            'amount': round(float(t['amount']), 2),
+            'date': _to_date(t['date']),
+        }
+        for t in transactions if t.get('transaction_id') and not t.get('pending')
+    ]
+    flagged = ingest(db.session.connection(), incoming)
+    db.session.commit()
+    return flagged
+
+def _expense_observation(expense):
+    return {'user_id': expense.user_id, 'kind': 'expense', 'ref': str(expense.id), 'category': expense.category,
+            'merchant': None, 'amount': round(expense.amount, 2), 'date': expense.date}
+
+# Expense columns that feed an observation; a change to any of them replaces it
+OBSERVED_COLUMNS = ('user_id', 'category', 'amount', 'date')
+
+def _replay(connection, keys, rescored=()):
+    # Recompute (user, category) stats from their observations, in date order like rebuild_anomaly_state.
+    # The EWMA and p95 sketch can't subtract a charge, so a retraction replays the category's history instead.
+    # Only the refs in `rescored` are flagged again; other flags (and their dismissals) are left alone.
+    if not keys:
+        return
+    dialect = {'sqlite': sqlite, 'postgresql': postgresql}.get(connection.dialect.name)
+    locked = _lock_stats(connection, sorted(keys), dialect)
+    stats = {key: OnlineStats({'id': state.id}) for key, state in locked.items()}
+    columns = [observations.c[name] for name in ('user_id', 'kind', 'ref', 'category', 'merchant', 'amount', 'date')]
+    rows = connection.execute(
+        sa.select(*columns)
+        .where(sa.tuple_(observations.c.user_id, observations.c.category).in_(sorted(keys)))
+        .order_by(observations.c.date, observations.c.ref)
+    ).mappings()
+    flagged = []
+    for row in rows:
+        _observe(stats, dict(row), flagged)
+
+    flagged = [f for f in flagged if f['ref'] in rescored]
+    if flagged:
+        connection.execute(anomalies.insert(), flagged)
+    connection.execute(
+        stats_table.update().where(stats_table.c.id == sa.bindparam('stat_id')),
+        [dict(state.row(*key), stat_id=state.id) for key, state in stats.items()],
+    )
+
+def _retract(connection, refs, replacements):
+    # Replace the recorded observations (and any flag) for these expense ids, then replay every category
+    # an old or new observation is in
+    refs = sorted(refs)
+    keys = set()
+    for start in range(0, len(refs), CHUNK):
+        chunk = refs[start:start + CHUNK]
+        keys.update(tuple(row) for row in connection.execute(
+            sa.select(observations.c.user_id, observations.c.category)
+            .where(observations.c.kind == 'expense', observations.c.ref.in_(chunk))
+        ))
+        connection.execute(observations.delete().where(observations.c.kind == 'expense', observations.c.ref.in_(chunk)))
+        connection.execute(anomalies.delete().where(anomalies.c.kind == 'expense', anomalies.c.ref.in_(chunk)))
+
+    replacements = [o for o in replacements if o['user_id'] and o['amount'] > 0]
+    for start in range(0, len(replacements), CHUNK):
+        connection.execute(observations.insert(), replacements[start:start + CHUNK])
+    keys.update((o['user_id'], o['category']) for o in replacements)
+    _replay(connection, keys, {o['ref'] for o in replacements})
+
+def _changed(obj):
+    state = sa.inspect(obj)
+    return any(state.attrs[name].history.has_changes() for name in OBSERVED_COLUMNS)
+
+def observe_expenses(session, flush_context):
+    # Keep the stats in step with manually entered expenses, in the same transaction they change in:
+    # new ones are scored, edited ones replace their old observation and deleted ones retract it
+    created = [obj for obj in session.new if isinstance(obj, Expenses)]
+    edited = [obj for obj in session.dirty if isinstance(obj, Expenses) and _changed(obj)]
+    deleted = [obj for obj in session.deleted if isinstance(obj, Expenses)]
+    if not (created or edited or deleted):
+        return
+
+    connection = session.connection()
+    if edited or deleted:
+        _retract(connection, {str(obj.id) for obj in edited + deleted}, [_expense_observation(obj) for obj in edited])
+    if created:
+        ingest(connection, [_expense_observation(obj) for obj in created])
+
+def register_anomaly_listener():
+    if not sa.event.contains(Session, 'after_flush', observe_expenses):
+        sa.event.listen(Session, 'after_flush', observe_expenses)
+
+def rebuild_anomaly_state():
+    # One streaming pass over every recorded charge in date order; dismissals survive the rebuild
+    dismissed = {tuple(row) for row in db.session.execute(
+        sa.select(anomalies.c.kind, anomalies.c.ref).where(anomalies.c.dismissed.is_(True))
+    )}
+
+    # Expenses entered before the detector existed
+    known = sa.select(observations.c.id).where(observations.c.kind == 'expense', observations.c.ref == sa.cast(Expenses.id, sa.String))
+    backfill = [
+        _expense_observation(expense)
+        for expense in Expenses.query.filter(Expenses.user_id.isnot(None), Expenses.amount > 0, ~known.exists())
+    ]
+    for start in range(0, len(backfill), CHUNK):
+        db.session.execute(observations.insert(), backfill[start:start + CHUNK])
+
+    db.session.execute(stats_table.delete())
+    db.session.execute(anomalies.delete())
+
+    stats, flagged = {}, []
+    columns = [observations.c[name] for name in ('user_id', 'kind', 'ref', 'category', 'merchant', 'amount', 'date')]
+    rows = db.session.execute(
+        sa.select(*columns).order_by(observations.c.date, observations.c.ref).execution_options(yield_per=CHUNK)
+    ).mappings()
+    for row in rows:
+        _observe(stats, dict(row), flagged)
+        if len(flagged) >= CHUNK:
+            db.session.execute(anomalies.insert(), [dict(f, dismissed=(f['kind'], f['ref']) in dismissed) for f in flagged])
+            flagged = []
+    if flagged:
+        db.session.execute(anomalies.insert(), [dict(f, dismissed=(f['kind'], f['ref']) in dismissed) for f in flagged])
+
+    rows = [state.row(*key) for key, state in stats.items()]
+    for start in range(0, len(rows), CHUNK):
+        db.session.execute(stats_table.insert(), rows[start:start + CHUNK])
+    db.session.commit()
+    return len(stats)
+
+if __name__ == "__main__":
+    with app.app_context():
+        rebuilt = rebuild_anomaly_state()
+        print(f"✅ Rebuilt spending statistics for {rebuilt} user/category pair(s).")
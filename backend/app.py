@@ -9,6 +9,22 @@ from key_utils import validate_key
 from routes.transaction import setup_transaction_routes
 from routes.exchange_token import setup_exchange_token
 from routes.plaid_routes import setup_plaid_routes
+from routes.export import setup_export_routes
+from routes.savings import setup_savings_routes
+from routes.recurring import setup_recurring_routes
+from routes.categories import setup_category_routes
+from routes.expenses import setup_expense_routes
+from routes.income import setup_income_routes
+from routes.search import setup_search_routes
+from routes.analytics import setup_analytics_routes
+from routes.anomalies import setup_anomaly_routes
+from routes.budget import setup_budget_routes
+from routes.xp import setup_xp_routes
+from routes.balances import setup_balance_routes
+from routes.cache import setup_cache_routes
+from routes.counters import setup_counter_routes
+from routes.forecast import setup_forecast_routes
+from profiling import register_profiler
 import os
 
 os.environ['REQUESTS_CA_BUNDLE'] = '/etc/ssl/cert.pem'
@@ -22,6 +38,22 @@ setup_linked_account_routes(app)
 setup_goal_routes(app)
 setup_home_route(app)
 setup_tax_info_routes(app)
+setup_export_routes(app)
+setup_savings_routes(app)
+setup_recurring_routes(app)
+setup_category_routes(app)
+setup_expense_routes(app)
+setup_income_routes(app)
+setup_search_routes(app)
+setup_analytics_routes(app)
+setup_anomaly_routes(app)
+setup_budget_routes(app)
+setup_xp_routes(app)
+setup_balance_routes(app)
+setup_cache_routes(app)
+setup_counter_routes(app)
+setup_forecast_routes(app)
+register_profiler(app)
 
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,227 @@
+import datetime
+from collections import defaultdict
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, attributes
+from config import db, app
+from models import BalanceNode, Expenses, Income, Transaction
+from partitioning import PARTITIONED_MODELS, archive_table, iter_archived_rows, range_source
+
+# Per-user, per-category Fenwick trees over day numbers, stored one row per non-empty node.
+# A node i covers days (i - lowbit(i), i], so a prefix total reads at most log2(SIZE) rows
+# and a write updates at most log2(SIZE) rows.
+EPOCH = datetime.date(1970, 1, 1)
+SIZE = 1 << 16  # days, up to 2149
+CHUNK = 500
+
+nodes = BalanceNode.__table__
+
+# kind -> (model, date column, amount column, category column or None)
+INDEXED_MODELS = {
+    'transaction': (Transaction, 'transaction_date', 'transaction_amount', None),
+    'expense': (Expenses, 'date', 'amount', 'category'),
+    'income': (Income, 'date', 'amount', 'source'),
+}
+KIND_OF = {model: kind for kind, (model, *_) in INDEXED_MODELS.items()}
+
+def day_index(day):
+    index = (day - EPOCH).days + 1
+    if not 1 <= index < SIZE:
+        raise ValueError(f"Date outside the balance index range: {day}")
+    return index
+
+def indexable(day):
+    # Rows dated outside the index range are left out rather than failing the write
+    return day is not None and 1 <= (day - EPOCH).days + 1 < SIZE
+
+def update_path(index):
+    while index < SIZE:
+        yield index
+        index += index & -index
+
+def prefix_path(index):
+    while index > 0:
+        yield index
+        index -= index & -index
+
+# --- Maintenance ---
+
+def _committed(obj, name):
+    history = attributes.get_history(obj, name)
+    if history.deleted:
+        return history.deleted[0]
+    return history.unchanged[0] if history.unchanged else getattr(obj, name)
+
+def _entry(obj, read):
+    # (user_id, kind, category, day, amount) for one row, as stored or as about to be written
+    kind = KIND_OF[type(obj)]
+    _, date_column, amount_column, category_column = INDEXED_MODELS[kind]
+    return (read(obj, 'user_id'), kind, read(obj, category_column) if category_column else '',
+            read(obj, date_column), read(obj, amount_column))
+
+def balance_deltas(session):
+    # (user_id, kind, category, node) -> [amount, count] for everything this flush is about to write
+    deltas = defaultdict(lambda: [0.0, 0])
+
+    def add(entry, sign):
+        user_id, kind, category, day, amount = entry
+        if user_id is None or not indexable(day):
+            return
+        for node in update_path(day_index(day)):
+            delta = deltas[(user_id, kind, category or '', node)]
+            delta[0] += sign * (amount or 0.0)
+            delta[1] += sign
+
+    tracked = tuple(KIND_OF)
+    for obj in session.new:
+        if isinstance(obj, tracked):
+            add(_entry(obj, getattr), 1)
+    for obj in session.deleted:
+        if isinstance(obj, tracked):
+            add(_entry(obj, _committed), -1)
+    for obj in session.dirty:
+        if isinstance(obj, tracked) and session.is_modified(obj):
+            add(_entry(obj, _committed), -1)
+            add(_entry(obj, getattr), 1)
+
+    return {key: delta for key, delta in deltas.items() if delta[1] or abs(delta[0]) > 1e-9}
+
+def _apply(connection, deltas):
+    rows = [
+        {'user_id': user_id, 'kind': kind, 'category': category, 'node': node, 'amount': amount, 'count': count}
+        for (user_id, kind, category, node), (amount, count) in deltas.items()
+    ]
+    dialect = {'sqlite': sqlite, 'postgresql': postgresql}.get(connection.dialect.name)
+    for start in range(0, len(rows), CHUNK):
+        chunk = rows[start:start + CHUNK]
+        if dialect:
+            insert = dialect.insert(nodes)
+            connection.execute(
+                insert.on_conflict_do_update(
+                    index_elements=['user_id', 'kind', 'category', 'node'],
+                    set_={'amount': nodes.c.amount + insert.excluded.amount, 'count': nodes.c.count + insert.excluded.count},
+                ),
+                chunk,
+            )
+            continue
+        for row in chunk:
+            updated = connection.execute(
+                nodes.update()
+                .where(nodes.c.user_id == row['user_id'], nodes.c.kind == row['kind'],
+                       nodes.c.category == row['category'], nodes.c.node == row['node'])
+                .values(amount=nodes.c.amount + row['amount'], count=nodes.c.count + row['count'])
+            ).rowcount
+            if not updated:
+                connection.execute(nodes.insert().values(**row))
+
+def apply_balance_deltas(session, flush_context, instances):
+    # Same transaction as the Transaction / Expenses / Income write, so the index can't drift from it
+    deltas = balance_deltas(session)
+    if deltas:
+        _apply(session.connection(), deltas)
+
+def register_balance_listener():
+    if not sa.event.contains(Session, 'before_flush', apply_balance_deltas):
+        sa.event.listen(Session, 'before_flush', apply_balance_deltas)
+
+def _all_rows(kind):
+    # Live rows (plus sealed SQLite shards), then archived partitions
+    model, date_column, amount_column, category_column = INDEXED_MODELS[kind]
+    source = range_source(model)
+    columns = [source.c.user_id, source.c[date_column], source.c[amount_column]]
+    columns.append(source.c[category_column] if category_column else sa.literal(''))
+    for row in db.session.execute(sa.select(*columns).execution_options(yield_per=CHUNK)):
+        yield tuple(row)
+
+    if model.__tablename__ not in PARTITIONED_MODELS:
+        return
+    archive = archive_table(model.__tablename__)
+    if not sa.inspect(db.engine).has_table(archive.name):
+        return
+    for user_id in db.session.execute(sa.select(archive.c.user_id).distinct()).scalars():
+        for record in iter_archived_rows(db.engine, model, user_id):
+            yield (record['user_id'], record[date_column], record[amount_column], record[category_column] if category_column else '')
+
+def rebuild_balance_index():
+    # Aggregate every row to (user, kind, category, day) first, then spread each day over its Fenwick nodes.
+    # All reads happen before the old index is cleared, so the rewrite is a single write phase.
+    deltas = defaultdict(lambda: [0.0, 0])
+    for kind in INDEXED_MODELS:
+        days = defaultdict(lambda: [0.0, 0])
+        for user_id, day, amount, category in _all_rows(kind):
+            if user_id is None or not indexable(day):
+                continue
+            point = days[(user_id, category or '', day_index(day))]
+            point[0] += amount or 0.0
+            point[1] += 1
+
+        for (user_id, category, index), (amount, count) in days.items():
+            for node in update_path(index):
+                delta = deltas[(user_id, kind, category, node)]
+                delta[0] += amount
+                delta[1] += count
+
+    db.session.execute(nodes.delete())
+    _apply(db.session.connection(), deltas)
+    db.session.commit()
+    return len(deltas)
+
+# --- Queries ---
+
+def _clamp(index):
+    return min(max(index, 0), SIZE - 1)
+
+def range_totals(user_id, start_date=None, end_date=None, kinds=None, category=None):
+    # Totals per (kind, category) over [start_date, end_date] from two prefix sums, in one query.
+    # Bounds outside the index range are clamped; rows dated there are never indexed anyway.
+    hi = _clamp((end_date - EPOCH).days + 1) if end_date else SIZE - 1
+    lo = _clamp((start_date - EPOCH).days) if start_date else 0
+    hi_nodes, lo_nodes = set(prefix_path(hi)), set(prefix_path(lo))
+
+    query = sa.select(nodes.c.kind, nodes.c.category, nodes.c.node, nodes.c.amount, nodes.c.count).where(
+        nodes.c.user_id == user_id, nodes.c.node.in_(hi_nodes | lo_nodes)
+    )
+    if kinds:
+        query = query.where(nodes.c.kind.in_(kinds))
+    if category is not None:
+        query = query.where(nodes.c.category == category)
+
+    totals = defaultdict(lambda: [0.0, 0])
+    for kind, row_category, node, amount, count in db.session.execute(query):
+        sign = (node in hi_nodes) - (node in lo_nodes)
+        if sign:
+            total = totals[(kind, row_category)]
+            total[0] += sign * amount
+            total[1] += sign * count
+    return {key: (round(amount, 2), count) for key, (amount, count) in totals.items() if count}
+
+def running_balance(user_id, points):
+    # Cumulative income, expenses and transaction amounts at each day in points (all history up to that day)
+    indexes = [day_index(day) for day in points]
+    needed = sorted({node for index in indexes for node in prefix_path(index)})
+    values = defaultdict(lambda: defaultdict(float))
+    for start in range(0, len(needed), CHUNK):
+        query = (
+            sa.select(nodes.c.kind, nodes.c.node, sa.func.sum(nodes.c.amount))
+            .where(nodes.c.user_id == user_id, nodes.c.node.in_(needed[start:start + CHUNK]))
+            .group_by(nodes.c.kind, nodes.c.node)
+        )
+        for kind, node, amount in db.session.execute(query):
+            values[kind][node] = amount
+
+    series = []
+    for day, index in zip(points, indexes):
+        sums = {kind: round(sum(values[kind].get(node, 0.0) for node in prefix_path(index)), 2) for kind in INDEXED_MODELS}
+        series.append({
+            'date': day.isoformat(),
+            'income': sums['income'],
+            'expenses': sums['expense'],
+            'transactions': sums['transaction'],
+            'balance': round(sums['income'] - sums['expense'], 2),
+        })
+    return series
+
+if __name__ == "__main__":
+    with app.app_context():
+        written = rebuild_balance_index()
+        print(f"✅ Rebuilt the balance index ({written} node(s)).")
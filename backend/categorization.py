@@ -0,0 +1,231 @@
+import re
+import threading
+from collections import defaultdict
+import sqlalchemy as sa
+from config import db, app
+from models import CategoryRule, TransactionCategory
+
+CATEGORIES = ('Income', 'Expense', 'Savings')
+AMOUNT_SIGNS = ('any', 'inflow', 'outflow')
+RECATEGORIZE_BATCH_SIZE = 1000
+
+# Plaid personal_finance_category primaries that decide the category on their own
+PLAID_PRIMARY_CATEGORIES = {
+    'INCOME': 'Income',
+    'EXPENSE': 'Expense',
+}
+
+# Starting rule set, carried over from the client-side categorizer (src/utils/categorizeTransactions.ts).
+# (keyword, category, priority, amount_sign, plaid_primary); 'savings' and 'ally' only count on TRANSFER
+# transactions, as on the client, so "Sally's Salon" stays an expense.
+DEFAULT_RULES = (
+    ('payroll', 'Income', 10, 'inflow', None),
+    ('deposit', 'Income', 10, 'inflow', None),
+    ('payment received', 'Income', 10, 'inflow', None),
+    ('savings', 'Savings', 5, 'any', 'TRANSFER'),
+    ('transfer', 'Savings', 5, 'any', None),
+    ('high yield', 'Savings', 5, 'any', None),
+    ('emergency', 'Savings', 5, 'any', None),
+    ('ally', 'Savings', 5, 'any', 'TRANSFER'),
+)
+
+_WORD_CHAR = re.compile(r'\w')
+
+class KeywordMatcher:
+    def __init__(self, rules):
+        # rules: (keyword, category, priority, amount_sign[, plaid_primary]) tuples; several rules may share a keyword
+        self.rules = defaultdict(list)
+        for rule in rules:
+            if rule[0]:
+                self.rules[rule[0].lower()].append(tuple(rule) + (None,) * (5 - len(rule)))
+        keywords = sorted(self.rules, key=len, reverse=True)
+        # Keywords starting at the same position are prefixes of the longest one found there
+        self.prefixes = {keyword: [other for other in keywords if keyword.startswith(other)] for keyword in keywords}
+        # A lookahead matches at every position, so overlapping keywords are all seen ("uber eats" and "uber").
+        # Keywords only match whole words: "ally" is not found in "finally".
+        alternatives = '|'.join(re.escape(keyword) for keyword in keywords)
+        self.pattern = re.compile(f"(?<!\\w)(?=({alternatives})(?!\\w))") if keywords else None
+
+    def match(self, text, amount, plaid_primary=None):
+        # Highest-priority rule whose amount sign and Plaid primary fit, over every keyword occurring in the text
+        if not self.pattern or not text:
+            return None
+
+        text = text.lower()
+        primary = (plaid_primary or '').upper()
+        best = None
+        for found in self.pattern.finditer(text):
+            for keyword in self.prefixes[found.group(1)]:
+                # A shorter keyword must end a word too
+                if _WORD_CHAR.match(text, found.start() + len(keyword)):
+                    continue
+                for rule in self.rules[keyword]:
+                    sign = rule[3]
+                    if (sign == 'inflow' and amount >= 0) or (sign == 'outflow' and amount <= 0):
+                        continue
+                    if rule[4] and rule[4].upper() != primary:
+                        continue
+                    if best is None or rule[2] > best[2]:
+                        best = rule
+        return best
+
+_matcher_cache = {'version': None, 'matcher': None}
+
+def rules_version():
+    count, max_id, last_change = db.session.query(
+        sa.func.count(CategoryRule.id), sa.func.max(CategoryRule.id), sa.func.max(CategoryRule.updated_at)
+    ).one()
+    return f"{count}:{max_id}:{last_change.isoformat() if last_change else ''}"
+
+def get_matcher():
+    # Recompile only when the rules table has changed since the last compile
+    version = rules_version()
+    if _matcher_cache['version'] != version:
+        rules = db.session.query(CategoryRule.keyword, CategoryRule.category, CategoryRule.priority, CategoryRule.amount_sign,
+                                 CategoryRule.plaid_primary).all()
+        _matcher_cache['matcher'] = KeywordMatcher([tuple(rule) for rule in rules])
+        _matcher_cache['version'] = version
+    return version, _matcher_cache['matcher']
+
+def categorize(matcher, description, amount, plaid_primary):
+    primary = (plaid_primary or '').upper()
+    if primary in PLAID_PRIMARY_CATEGORIES:
+        return PLAID_PRIMARY_CATEGORIES[primary], 'plaid'
+
+    rule = matcher.match(description, amount, primary)
+    if rule:
+        return rule[1], 'rule'
+    return 'Expense', 'default'
+
+def _plaid_fields(transaction):
+    category = transaction.get('personal_finance_category') or {}
+    description = transaction.get('name') or transaction.get('merchant_name') or ''
+    return description[:1000], float(transaction['amount']), category.get('primary')
+
+def categorize_transactions(user_id, transactions):
+    # Attach a category to each Plaid transaction dict, persisting new or stale results in one commit
+    version, matcher = get_matcher()
+    ids = [t['transaction_id'] for t in transactions if t.get('transaction_id')]
+    stored = {row.transaction_id: row for row in TransactionCategory.query.filter(TransactionCategory.transaction_id.in_(ids))} if ids else {}
+
+    changed = False
+    for transaction in transactions:
+        description, amount, primary = _plaid_fields(transaction)
+        row = stored.get(transaction.get('transaction_id'))
+
+        if row and (row.source == 'override' or row.rules_version == version):
+            transaction['category'] = row.category
+            continue
+
+        category, source = categorize(matcher, description, amount, primary)
+        transaction['category'] = category
+        if not transaction.get('transaction_id'):
+            continue
+
+        if row is None:
+            row = TransactionCategory(user_id=user_id, transaction_id=transaction['transaction_id'])
+            db.session.add(row)
+        row.description, row.amount, row.plaid_primary = description, amount, primary
+        row.category, row.source, row.rules_version = category, source, version
+        changed = True
+
+    if changed:
+        db.session.commit()
+    return transactions
+
+def recategorize_all():
+    # Re-run the current rules over every stored, non-overridden result in id-ordered chunks
+    version, matcher = get_matcher()
+    updated = 0
+    last_id = 0
+    while True:
+        rows = (
+            db.session.query(TransactionCategory.id, TransactionCategory.description, TransactionCategory.amount,
+                             TransactionCategory.plaid_primary, TransactionCategory.category)
+            .filter(TransactionCategory.id > last_id, TransactionCategory.source != 'override')
+            .order_by(TransactionCategory.id)
+            .limit(RECATEGORIZE_BATCH_SIZE)
+            .all()
+        )
+        if not rows:
+            break
+
+        changes = []
+        for row_id, description, amount, primary, current in rows:
+            category, source = categorize(matcher, description, amount, primary)
+            changes.append({'id': row_id, 'category': category, 'source': source, 'rules_version': version})
+            updated += category != current
+
+        db.session.execute(sa.update(TransactionCategory), changes)
+        db.session.commit()
+        last_id = rows[-1][0]
+    return updated
+
+class Recategorizer:
+    # Rule changes only request a rescan; stored results are stale until then, and
+    # categorize_transactions already recomputes any it serves whose rules_version is out of date
+    def __init__(self, app):
+        self.app = app
+        self.requested = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def request(self):
+        self.requested.set()
+        self._ensure_started()
+
+    def _ensure_started(self):
+        if self.thread and self.thread.is_alive():
+            return
+        with self.lock:
+            if not (self.thread and self.thread.is_alive()):
+                self.thread = threading.Thread(target=self._run, name="recategorize", daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                # Changes made while a rescan runs are picked up by one more pass
+                self.requested.wait()
+                self.requested.clear()
+                try:
+                    updated = recategorize_all()
+                    self.app.logger.info(f"Recategorized {updated} stored transaction(s)")
+                except Exception:
+                    db.session.rollback()
+                    self.app.logger.error("Recategorization failed", exc_info=True)
+                finally:
+                    db.session.remove()
+
+recategorizer = Recategorizer(app)
+
+def set_override(user_id, transaction_id, category):
+    row = TransactionCategory.query.filter_by(transaction_id=transaction_id, user_id=user_id).first()
+    if not row:
+        return None
+    row.category, row.source, row.rules_version = category, 'override', None
+    db.session.commit()
+    return row
+
+def clear_override(user_id, transaction_id):
+    row = TransactionCategory.query.filter_by(transaction_id=transaction_id, user_id=user_id).first()
+    if not row:
+        return None
+    version, matcher = get_matcher()
+    row.category, row.source = categorize(matcher, row.description, row.amount, row.plaid_primary)
+    row.rules_version = version
+    db.session.commit()
+    return row
+
+def seed_default_rules():
+    if CategoryRule.query.first():
+        return 0
+    for keyword, category, priority, amount_sign, plaid_primary in DEFAULT_RULES:
+        db.session.add(CategoryRule(keyword=keyword, category=category, priority=priority, amount_sign=amount_sign, plaid_primary=plaid_primary))
+    db.session.commit()
+    return len(DEFAULT_RULES)
+
+if __name__ == "__main__":
+    with app.app_context():
+        added = seed_default_rules()
+        print(f"✅ Seeded {added} default category rule(s).")
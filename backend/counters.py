@@ -0,0 +1,69 @@
+import sqlalchemy as sa
+from config import db
+from entity_cache import entity_cache
+from firestore_mirror import mirror
+from models import Goal, TaxInfo
+from xp_ledger import record_goal_progress
+
+# model -> columns that may be changed in place with a delta
+COUNTER_COLUMNS = {
+    Goal: ('current_amount',),
+    TaxInfo: ('total_saved',),
+}
+
+class DeltaConflict(Exception):
+    def __init__(self, conflicts):
+        super().__init__(f"{len(conflicts)} delta update(s) could not be applied")
+        self.conflicts = conflicts
+
+def _increment(connection, model, column, update):
+    # UPDATE ... SET col = col + :delta, version = version + 1 [AND version = :expected], then the new values
+    statement = (
+        sa.update(model)
+        .where(model.id == update['id'])
+        .values({column: column + update['delta'], model.version: model.version + 1})
+    )
+    if update.get('expected_version') is not None:
+        statement = statement.where(model.version == update['expected_version'])
+
+    if connection.dialect.update_returning:
+        return connection.execute(statement.returning(column, model.version)).first()
+    if connection.execute(statement).rowcount != 1:
+        return None
+    # The row stays locked by the update until commit, so this reads what the update wrote
+    return connection.execute(sa.select(column, model.version).where(model.id == update['id'])).first()
+
+def apply_deltas(model, column_name, updates):
+    # Applies every delta in one transaction, or none of them; returns id -> new column value and version
+    if column_name not in COUNTER_COLUMNS.get(model, ()):
+        raise ValueError(f"{model.__tablename__}.{column_name} is not a counter column")
+    column = getattr(model, column_name)
+    connection = db.session.connection()
+
+    results, conflicts = {}, []
+    # Stable sort by id: concurrent batches lock rows in the same order, and one id's deltas keep their order
+    for update in sorted(updates, key=lambda update: update['id']):
+        row = _increment(connection, model, column, update)
+        if row is not None:
+            results[update['id']] = {'id': update['id'], column_name: float(row[0]), 'version': row[1]}
+            continue
+        current = connection.execute(sa.select(model.version).where(model.id == update['id'])).scalar()
+        conflicts.append({
+            'id': update['id'],
+            'reason': 'not_found' if current is None else 'version_mismatch',
+            'expected_version': update.get('expected_version'),
+            'version': current,
+        })
+
+    if conflicts:
+        db.session.rollback()
+        raise DeltaConflict(conflicts)
+
+    if model is Goal:
+        record_goal_progress(connection, results)
+    db.session.commit()
+    for id in results:
+        entity_cache.invalidate(model, id)
+    if model is Goal:
+        mirror.enqueue({('goals', id): None for id in results})
+    return results
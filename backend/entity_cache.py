@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from config import app
+
+# Opt-in: serve the per-id GET routes from a read-through cache of their serialized responses
+ENTITY_CACHE = os.getenv('ENTITY_CACHE', 'false').lower() == 'true'
+# 'memory' is a per-process LRU; anything else is a Flask-Caching CACHE_TYPE (e.g. RedisCache) shared by all workers
+ENTITY_CACHE_BACKEND = os.getenv('ENTITY_CACHE_BACKEND', 'memory')
+ENTITY_CACHE_SIZE = int(os.getenv('ENTITY_CACHE_SIZE', '10000'))
+# Bounds how long another worker's in-process copy can lag behind a write
+ENTITY_CACHE_TTL_S = int(os.getenv('ENTITY_CACHE_TTL_S', '60'))
+# An invalidation leaves a tombstone this long; a miss whose load started before the write can't store over it
+ENTITY_CACHE_TOMBSTONE_S = int(os.getenv('ENTITY_CACHE_TOMBSTONE_S', '10'))
+
+TOMBSTONE = '__pennypilot_entity_invalidated__'
+
+class LRUCache:
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout=None):
+        with self.lock:
+            self._store(key, value, timeout)
+        return True
+
+    def add(self, key, value, timeout=None):
+        # Stores only if there is no live entry, like Flask-Caching's add
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                return False
+            self._store(key, value, timeout)
+            return True
+
+    def _store(self, key, value, timeout):
+        self.entries[key] = (time.monotonic() + (timeout or self.ttl), value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+def _shared_backend():
+    # Flask-Caching (over cachelib) is only needed when a shared backend is configured
+    from flask_caching import Cache
+
+    config = {key: value for key, value in os.environ.items() if key.startswith('CACHE_')}
+    config.update({'CACHE_TYPE': ENTITY_CACHE_BACKEND, 'CACHE_DEFAULT_TIMEOUT': ENTITY_CACHE_TTL_S})
+    config.setdefault('CACHE_KEY_PREFIX', 'pennypilot-entity:')
+    return Cache(app, config=config)
+
+class EntityCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.lock = threading.Lock()
+        self.stats = defaultdict(lambda: {'hits': 0, 'misses': 0, 'invalidations': 0})
+
+    def _count(self, model, name):
+        with self.lock:
+            self.stats[model.__tablename__][name] += 1
+
+    def fetch(self, model, id, load):
+        # Serialized row for model / id, calling load() (which may 404) on a miss
+        if not ENTITY_CACHE:
+            return load()
+        key = f"{model.__tablename__}:{id}"
+        value = self.backend.get(key)
+        if value is not None and value != TOMBSTONE:
+            self._count(model, 'hits')
+            return value
+
+        self._count(model, 'misses')
+        value = load()
+        # Add-if-absent: while a recent invalidation's tombstone is there (in any worker sharing the backend),
+        # a load that may have read the row before that write is returned but not stored
+        self.backend.add(key, value)
+        return value
+
+    def invalidate(self, model, id):
+        # Call after the write is committed
+        if not ENTITY_CACHE:
+            return
+        self.backend.set(f"{model.__tablename__}:{id}", TOMBSTONE, timeout=ENTITY_CACHE_TOMBSTONE_S)
+        self._count(model, 'invalidations')
+
+    def summary(self):
+        with self.lock:
+            snapshot = {table: dict(stats) for table, stats in self.stats.items()}
+        models = {}
+        for table, stats in sorted(snapshot.items()):
+            lookups = stats['hits'] + stats['misses']
+            models[table] = {**stats, 'hit_ratio': round(stats['hits'] / lookups, 4) if lookups else None}
+        hits = sum(stats['hits'] for stats in models.values())
+        lookups = hits + sum(stats['misses'] for stats in models.values())
+        return {
+            'enabled': ENTITY_CACHE,
+            'backend': ENTITY_CACHE_BACKEND,
+            'entries': len(self.backend) if isinstance(self.backend, LRUCache) else None,
+            'hit_ratio': round(hits / lookups, 4) if lookups else None,
+            'models': models,
+        }
+
+entity_cache = EntityCache(
+    LRUCache(ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL_S) if not ENTITY_CACHE or ENTITY_CACHE_BACKEND == 'memory' else _shared_backend()
+)
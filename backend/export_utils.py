@@ -0,0 +1,106 @@
+import base64
+import csv
+import io
+import json
+from config import db
+from models import Transaction, Income, Expenses, Savings, Goal
+from partitioning import PARTITIONED_MODELS, iter_archived_rows, range_source
+
+# Rows pulled from the database per round trip while streaming an export
+EXPORT_BATCH_SIZE = 500
+
+# resource name -> (model, date column used for range filters, exported columns)
+EXPORTABLE = {
+    'transactions': (Transaction, Transaction.transaction_date, ('id', 'transaction_date', 'transaction_amount')),
+    'income': (Income, Income.date, ('id', 'amount', 'source', 'date', 'description')),
+    'expenses': (Expenses, Expenses.date, ('id', 'amount', 'category', 'date', 'description')),
+    'savings': (Savings, Savings.date, ('id', 'amount', 'goal_name', 'target_amount', 'date', 'goal_id')),
+    'goals': (Goal, Goal.deadline, ('id', 'target_amount', 'current_amount', 'deadline')),
+}
+
+def is_archivable(resource):
+    return EXPORTABLE[resource][0].__tablename__ in PARTITIONED_MODELS
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(resource, user_id, after_id):
+    payload = json.dumps({'r': resource, 'u': user_id, 'after': after_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def decode_cursor(token, resource, user_id):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        after_id = int(payload['after'])
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+
+    # A cursor only resumes the export it was issued for
+    if payload.get('r') != resource or payload.get('u') != user_id:
+        raise InvalidCursor("Cursor does not match this export")
+    return after_id
+
+def build_export_query(resource, user_id, start_date=None, end_date=None, after_id=None):
+    model, date_column, columns = EXPORTABLE[resource]
+
+    # Only touches the partitions the date range overlaps when partitioned storage is on
+    source = range_source(model, start_date, end_date)
+    date_column = source.c[date_column.name]
+
+    # Plain column rows instead of ORM entities so nothing piles up in the identity map
+    query = db.session.query(*[source.c[name] for name in columns]).filter(source.c.user_id == user_id)
+    if start_date:
+        query = query.filter(date_column >= start_date)
+    if end_date:
+        query = query.filter(date_column <= end_date)
+    if after_id is not None:
+        query = query.filter(source.c.id > after_id)
+    return query.order_by(source.c.id), source.c.id
+
+def page_bounds(query, id_column, limit):
+    # Find the last id in this page and whether anything follows it, using only the id index
+    ids = query.with_entities(id_column)
+    last_id = ids.offset(limit - 1).limit(1).scalar()
+    if last_id is None:
+        return None, False
+    has_more = ids.filter(id_column > last_id).limit(1).scalar() is not None
+    return last_id, has_more
+
+def archived_rows(resource, user_id, start_date=None, end_date=None):
+    model, date_column, columns = EXPORTABLE[resource]
+    for record in iter_archived_rows(db.engine, model, user_id, start_date, end_date):
+        yield tuple(record.get(name) for name in columns)
+
+def _serialize(value):
+    if value is None:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+def query_rows(query):
+    return query.yield_per(EXPORT_BATCH_SIZE)
+
+def stream_rows(rows, resource, fmt):
+    columns = EXPORTABLE[resource][2]
+
+    if fmt == 'ndjson':
+        for row in rows:
+            record = {name: _serialize(value) for name, value in zip(columns, row)}
+            yield json.dumps(record) + '\n'
+        return
+
+    # CSV: reuse one small buffer and flush it once per batch
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    pending = 0
+    for row in rows:
+        writer.writerow(['' if value is None else _serialize(value) for value in row])
+        pending += 1
+        if pending >= EXPORT_BATCH_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pending = 0
+    yield buffer.getvalue()
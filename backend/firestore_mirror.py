@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+import sqlalchemy as sa
+from sqlalchemy.orm import Session, attributes
+from config import app, db
+from models import Budget, Goal, Savings
+from schemas import budget_schema, goal_schema
+from xp_ledger import xp_summaries
+
+# Opt-in: push goal, budget and XP progress changes to Firestore so the client can listen instead of polling
+FIRESTORE_MIRROR = os.getenv('FIRESTORE_MIRROR', 'false').lower() == 'true'
+# Changes wait this long before going out, so repeated writes to one document are sent once
+FIRESTORE_MIRROR_INTERVAL_MS = float(os.getenv('FIRESTORE_MIRROR_INTERVAL_MS', '500'))
+FIRESTORE_MIRROR_RETRY_S = float(os.getenv('FIRESTORE_MIRROR_RETRY_S', '5'))
+# Firestore's limit on writes per batch
+FIRESTORE_BATCH_SIZE = 500
+CHUNK = 500
+
+# Documents live under users/{user_id}/goals/{id}, users/{user_id}/budgets/{id} and users/{user_id}/progress/xp
+def _goal_document(goal):
+    return {**goal_schema.dump(goal), 'saved_amount': goal.saved_amount, 'savings_count': goal.savings_count}
+
+DOCUMENTS = {
+    'goals': (Goal, _goal_document),
+    'budgets': (Budget, budget_schema.dump),
+}
+
+def firestore_client():
+    from google.cloud import firestore
+
+    # FIRESTORE_EMULATOR_HOST (localhost:8080 with `firebase emulators:start --only firestore`) targets the emulator
+    if os.getenv('FIRESTORE_EMULATOR_HOST'):
+        return firestore.Client(project=os.getenv('FIRESTORE_PROJECT_ID', 'demo-pennypilot'))
+    import setup_cred  # initializes firebase_admin from GOOGLE_CREDENTIALS
+    from firebase_admin import firestore as admin_firestore
+    return admin_firestore.client()
+
+class FirestoreMirror:
+    def __init__(self, app, client_factory):
+        self.app = app
+        self.client_factory = client_factory
+        self.client = None
+        # (collection, id) -> owning user id, if known; a dict so repeated changes coalesce
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.full = threading.Event()
+        self.thread = None
+
+    def enqueue(self, changes):
+        if not FIRESTORE_MIRROR or not changes:
+            return
+        with self.lock:
+            self._merge(changes)
+            if len(self.pending) >= FIRESTORE_BATCH_SIZE:
+                self.full.set()
+        self._ensure_started()
+        self.wake.set()
+
+    def _merge(self, changes, keep_newer=False):
+        for key, user_id in changes.items():
+            if key not in self.pending or (user_id is not None and not keep_newer):
+                self.pending[key] = user_id
+
+    def _ensure_started(self):
+        if self.thread and self.thread.is_alive():
+            return
+        with self.lock:
+            if not (self.thread and self.thread.is_alive()):
+                self.thread = threading.Thread(target=self._run, name="firestore-mirror", daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                self.wake.wait()
+                self.full.wait(FIRESTORE_MIRROR_INTERVAL_MS / 1000)
+                with self.lock:
+                    self.wake.clear()
+                    self.full.clear()
+                    changes, self.pending = self.pending, {}
+                if not changes:
+                    continue
+                try:
+                    self.flush(changes)
+                except Exception:
+                    self.app.logger.error(f"Firestore mirror of {len(changes)} document(s) failed, retrying", exc_info=True)
+                    with self.lock:
+                        self._merge(changes, keep_newer=True)
+                    self.wake.set()
+                    time.sleep(FIRESTORE_MIRROR_RETRY_S)
+                finally:
+                    db.session.remove()
+
+    def flush(self, changes):
+        # Reads the current rows for every changed document and writes them (or deletes them) in batches
+        writes, users = [], {user_id for (collection, user_id) in changes if collection == 'progress'}
+        for collection, (model, serialize) in DOCUMENTS.items():
+            ids = [id for (changed, id) in changes if changed == collection]
+            rows = {}
+            for start in range(0, len(ids), CHUNK):
+                for row in model.query.filter(model.id.in_(ids[start:start + CHUNK])):
+                    rows[row.id] = row
+            for id in ids:
+                row = rows.get(id)
+                user_id = row.user_id if row else changes[(collection, id)]
+                if user_id is None:
+                    continue
+                writes.append((f'users/{user_id}/{collection}/{id}', serialize(row) if row else None))
+                users.add(user_id)
+
+        # A purged user's progress document is removed rather than rewritten with zeros
+        purged = {user_id for (collection, user_id) in changes if collection == 'purged'}
+        users -= purged | {None}
+        for user_id, summary in xp_summaries(users).items():
+            writes.append((f'users/{user_id}/progress/xp', summary))
+        writes += [(f'users/{user_id}/progress/xp', None) for user_id in purged]
+
+        if self.client is None:
+            self.client = self.client_factory()
+        for start in range(0, len(writes), FIRESTORE_BATCH_SIZE):
+            batch = self.client.batch()
+            for path, document in writes[start:start + FIRESTORE_BATCH_SIZE]:
+                if document is None:
+                    batch.delete(self.client.document(path))
+                else:
+                    batch.set(self.client.document(path), document)
+            batch.commit()
+        return len(writes)
+
+mirror = FirestoreMirror(app, firestore_client)
+
+def _committed(obj, name):
+    history = attributes.get_history(obj, name)
+    return history.deleted[0] if history.deleted else getattr(obj, name)
+
+def capture_changes(session, flush_context):
+    # Remember which documents this transaction touches; they are only queued once it commits
+    changes = session.info.setdefault('firestore_changes', {})
+    modified = [obj for obj in session.dirty if session.is_modified(obj)]
+    for obj in (*session.new, *modified, *session.deleted):
+        if isinstance(obj, Goal):
+            changes[('goals', obj.id)] = _committed(obj, 'user_id')
+        elif isinstance(obj, Budget):
+            changes[('budgets', obj.id)] = _committed(obj, 'user_id')
+        elif isinstance(obj, Savings):
+            # Savings move their goal's saved_amount (goal_progress.py) and the user's XP
+            for goal_id in {_committed(obj, 'goal_id'), obj.goal_id} - {None}:
+                changes.setdefault(('goals', goal_id), None)
+            changes[('progress', obj.user_id)] = obj.user_id
+
+def _enqueue_committed(session):
+    mirror.enqueue(session.info.pop('firestore_changes', None))
+
+def _discard_rolled_back(session):
+    session.info.pop('firestore_changes', None)
+
+def register_firestore_listener():
+    if not FIRESTORE_MIRROR:
+        return
+    if not sa.event.contains(Session, 'after_flush', capture_changes):
+        sa.event.listen(Session, 'after_flush', capture_changes)
+        sa.event.listen(Session, 'after_commit', _enqueue_committed)
+        sa.event.listen(Session, 'after_rollback', _discard_rolled_back)
+
+def resync():
+    # Write every goal, budget and progress document from the database (backfill, or after an outage)
+    changes = {}
+    for collection, (model, _) in DOCUMENTS.items():
+        for id, user_id in db.session.execute(sa.select(model.id, model.user_id).where(model.user_id.isnot(None))):
+            changes[(collection, id)] = user_id
+    return mirror.flush(changes)
+
+if __name__ == "__main__":
+    with app.app_context():
+        written = resync()
+        print(f"✅ Mirrored {written} document(s) to Firestore.")
@@ -0,0 +1,186 @@
+import datetime
+import math
+import os
+import numpy as np
+import sqlalchemy as sa
+from plaid.model.accounts_get_request import AccountsGetRequest
+from config import app, db
+from models import AccessToken, BalanceWarning, RecurringStream, SpendingObservation
+from plaid_calls import call_plaid
+from plaid_client_config import client
+from recurring import FREQUENCIES, normalize_merchant
+
+MIN_DAYS, MAX_DAYS = 30, 90
+# Spending outside recurring streams is projected at its average daily rate over this window
+FORECAST_LOOKBACK_DAYS = int(os.getenv('FORECAST_LOOKBACK_DAYS', '90'))
+# Shortest window a rate is averaged over, so a few days of history don't set a wild rate
+MIN_RATE_SPAN = 14
+# A balance below this is a warning
+FORECAST_LOW_BALANCE = float(os.getenv('FORECAST_LOW_BALANCE', '0'))
+# Horizon used by the batch warnings run
+FORECAST_WARNING_DAYS = int(os.getenv('FORECAST_WARNING_DAYS', '30'))
+# One-sided 95% band for day-to-day spending noise
+BAND_Z = 1.645
+
+PERIODS = {name: period for name, period, _ in FREQUENCIES}
+warnings_table = BalanceWarning.__table__
+
+def fetch_accounts(user_id):
+    # Depository accounts across every item the user has linked
+    accounts = []
+    for token in AccessToken.query.filter_by(user_id=user_id):
+        response = call_plaid(client.accounts_get, AccountsGetRequest(access_token=token.access_token)).to_dict()
+        accounts += [account for account in response['accounts'] if str(account.get('type')) == 'depository']
+    return accounts
+
+def _start_balance(account):
+    balances = account.get('balances') or {}
+    available = balances.get('available')
+    return float(available if available is not None else balances.get('current') or 0.0)
+
+def _primary_index(accounts):
+    # Recurring streams and spending are not tracked per account; they land on the main checking account
+    checking = [i for i, account in enumerate(accounts) if str(account.get('subtype')) == 'checking']
+    candidates = checking or range(len(accounts))
+    return max(candidates, key=lambda i: _start_balance(accounts[i]))
+
+def recurring_flows(streams, today, days):
+    # Net flow per day on the grid (inflows positive) and the dated occurrences behind it
+    flows = np.zeros(days)
+    if not streams:
+        return flows, []
+    period = np.array([PERIODS[stream.frequency] for stream in streams])
+    first = np.array([(stream.next_date - today).days for stream in streams], dtype=float)
+    # A stream whose expected date has passed without a charge rolls forward to its next occurrence
+    behind = first < 0
+    first[behind] += np.ceil(-first[behind] / period[behind]) * period[behind]
+
+    steps = int(math.ceil(days / period.min())) + 1
+    offsets = np.rint(first[:, None] + period[:, None] * np.arange(steps)).astype(np.int64)
+    # Plaid reports outflows as positive amounts
+    amounts = np.broadcast_to(-np.array([stream.average_amount for stream in streams])[:, None], offsets.shape)
+    inside = (offsets >= 0) & (offsets < days)
+    np.add.at(flows, offsets[inside], amounts[inside])
+
+    stream_index, _ = np.nonzero(inside)
+    events = sorted(
+        (int(offset), streams[i].merchant, round(float(amount), 2))
+        for i, offset, amount in zip(stream_index, offsets[inside], amounts[inside])
+    )
+    return flows, events
+
+def spending_rate(user_id, today, recurring_merchants):
+    # Average daily spend and its day-to-day std from synced transactions not explained by a recurring stream
+    since = today - datetime.timedelta(days=FORECAST_LOOKBACK_DAYS)
+    rows = db.session.execute(
+        sa.select(SpendingObservation.category, SpendingObservation.merchant, SpendingObservation.amount, SpendingObservation.date)
+        .where(SpendingObservation.user_id == user_id, SpendingObservation.kind == 'transaction',
+               SpendingObservation.date > since, SpendingObservation.date <= today)
+    ).all()
+    rows = [row for row in rows if not (row.merchant and normalize_merchant({'name': row.merchant}) in recurring_merchants)]
+    if not rows:
+        return 0.0, 0.0, {}
+
+    age = np.array([(today - row.date).days for row in rows])
+    amounts = np.array([row.amount for row in rows])
+    span = max(int(age.max()) + 1, MIN_RATE_SPAN)
+    daily = np.bincount(age, weights=amounts, minlength=span)
+
+    categories, category_index = np.unique([row.category for row in rows], return_inverse=True)
+    by_category = np.bincount(category_index, weights=amounts) / span
+    return float(daily.mean()), float(daily.std()), {
+        category: round(float(rate), 2) for category, rate in zip(categories, by_category)
+    }
+
+def forecast(user_id, days=MIN_DAYS, accounts=None, today=None):
+    # Projected end-of-day balances for each depository account over the next `days` days
+    days = max(MIN_DAYS, min(int(days), MAX_DAYS))
+    today = today or datetime.date.today()
+    if accounts is None:
+        accounts = fetch_accounts(user_id)
+
+    streams = RecurringStream.query.filter(
+        RecurringStream.user_id == user_id, RecurringStream.is_active.is_(True),
+        RecurringStream.frequency.isnot(None), RecurringStream.next_date.isnot(None),
+    ).all()
+    flows, events = recurring_flows(streams, today, days)
+    rate, noise, by_category = spending_rate(user_id, today, {stream.merchant for stream in streams})
+    dates = [today + datetime.timedelta(days=offset) for offset in range(days)]
+    income_days = [offset for offset, _, amount in events if amount > 0]
+
+    result = {
+        'user_id': user_id,
+        'dates': [day.isoformat() for day in dates],
+        'daily_spending': round(rate, 2),
+        'spending_by_category': by_category,
+        'next_income_date': dates[income_days[0]].isoformat() if income_days else None,
+        'upcoming': [{'date': dates[offset].isoformat(), 'merchant': merchant, 'amount': amount} for offset, merchant, amount in events],
+        'accounts': [],
+    }
+    if not accounts:
+        return result
+
+    # accounts x days grid: every account starts flat, the primary one carries the projected flows
+    primary = _primary_index(accounts)
+    start = np.array([_start_balance(account) for account in accounts])
+    paths = np.repeat(start[:, None], days, axis=1)
+    paths[primary] += np.cumsum(flows - rate)
+    low = paths.copy()
+    low[primary] -= BAND_Z * noise * np.sqrt(np.arange(1, days + 1))
+
+    below = paths < FORECAST_LOW_BALANCE
+    first_low = np.where(below.any(axis=1), below.argmax(axis=1), -1)
+    min_index = paths.argmin(axis=1)
+    for i, account in enumerate(accounts):
+        result['accounts'].append({
+            'account_id': account.get('account_id'),
+            'name': account.get('name'),
+            'subtype': str(account.get('subtype')),
+            'primary': i == primary,
+            'balance': round(float(start[i]), 2),
+            'projected': np.round(paths[i], 2).tolist(),
+            'low': np.round(low[i], 2).tolist(),
+            'min_balance': round(float(paths[i, min_index[i]]), 2),
+            'min_date': dates[min_index[i]].isoformat(),
+            'first_low_date': dates[first_low[i]].isoformat() if first_low[i] >= 0 else None,
+            'before_income': bool(first_low[i] >= 0 and (not income_days or first_low[i] < income_days[0])),
+        })
+    return result
+
+def precompute_warnings(days=FORECAST_WARNING_DAYS):
+    # Batch mode: forecast every linked user and keep a Balance_Warnings row per account headed below the threshold
+    user_ids = db.session.execute(sa.select(AccessToken.user_id).distinct()).scalars().all()
+    written = 0
+    for user_id in user_ids:
+        try:
+            result = forecast(user_id, days)
+        except Exception:
+            db.session.rollback()
+            app.logger.warning("Balance forecast failed for a user, keeping their previous warnings", exc_info=True)
+            continue
+
+        rows = [
+            {
+                'user_id': user_id,
+                'account_id': account['account_id'],
+                'account_name': account['name'],
+                'balance': account['balance'],
+                'first_low_date': datetime.date.fromisoformat(account['first_low_date']),
+                'min_balance': account['min_balance'],
+                'min_date': datetime.date.fromisoformat(account['min_date']),
+                'before_income': account['before_income'],
+                'computed_at': datetime.datetime.now(),
+            }
+            for account in result['accounts'] if account['first_low_date']
+        ]
+        db.session.execute(warnings_table.delete().where(warnings_table.c.user_id == user_id))
+        if rows:
+            db.session.execute(warnings_table.insert(), rows)
+        db.session.commit()
+        written += len(rows)
+    return len(user_ids), written
+
+if __name__ == "__main__":
+    with app.app_context():
+        users, warnings = precompute_warnings()
+        print(f"✅ Forecast {users} user(s), {warnings} low-balance warning(s).")
@@ -0,0 +1,112 @@
+import sqlalchemy as sa
+from collections import defaultdict
+from sqlalchemy.orm import Session, attributes
+from config import db, app
+from entity_cache import entity_cache
+from models import Goal, Savings
+
+def _old_and_new(obj, name):
+    # (committed value, current value) for one attribute of a pending/dirty/deleted object
+    history = attributes.get_history(obj, name)
+    old = history.deleted[0] if history.deleted else (history.unchanged[0] if history.unchanged else None)
+    return old, getattr(obj, name)
+
+def savings_deltas(session):
+    # goal id -> [amount delta, count delta] for everything this flush is about to write
+    deltas = defaultdict(lambda: [0.0, 0])
+
+    for obj in session.new:
+        if isinstance(obj, Savings) and obj.goal_id is not None:
+            deltas[obj.goal_id][0] += obj.amount
+            deltas[obj.goal_id][1] += 1
+
+    for obj in session.deleted:
+        if isinstance(obj, Savings):
+            goal_id = _old_and_new(obj, 'goal_id')[0]
+            if goal_id is not None:
+                deltas[goal_id][0] -= _old_and_new(obj, 'amount')[0] or 0.0
+                deltas[goal_id][1] -= 1
+
+    for obj in session.dirty:
+        if not isinstance(obj, Savings) or not session.is_modified(obj):
+            continue
+        old_goal, new_goal = _old_and_new(obj, 'goal_id')
+        old_amount, new_amount = _old_and_new(obj, 'amount')
+        if old_goal is not None:
+            deltas[old_goal][0] -= old_amount or 0.0
+            deltas[old_goal][1] -= 1
+        if new_goal is not None:
+            deltas[new_goal][0] += new_amount
+            deltas[new_goal][1] += 1
+
+    return {goal_id: delta for goal_id, delta in deltas.items() if delta != [0.0, 0]}
+
+def apply_savings_deltas(session, flush_context, instances):
+    # Runs inside the same transaction as the Savings write, so the counters can't commit without it
+    for goal_id, (amount, count) in savings_deltas(session).items():
+        session.execute(
+            sa.update(Goal)
+            .where(Goal.id == goal_id)
+            .values(saved_amount=Goal.saved_amount + amount, savings_count=Goal.savings_count + count)
+            .execution_options(synchronize_session=False)
+        )
+    unlink_deleted_goals(session)
+
+def unlink_deleted_goals(session):
+    # Savings outlive their goal: unlink them in the same transaction, or their goal_id would point
+    # at a missing row (an FK violation on Postgres, a reused id on SQLite)
+    goal_ids = [obj.id for obj in session.deleted if isinstance(obj, Goal)]
+    if not goal_ids:
+        return
+    unlinked = session.execute(sa.select(Savings.id).where(Savings.goal_id.in_(goal_ids))).scalars().all()
+    if unlinked:
+        session.execute(
+            sa.update(Savings)
+            .where(Savings.id.in_(unlinked))
+            .values(goal_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        session.info.setdefault('unlinked_savings', []).extend(unlinked)
+
+def _invalidate_unlinked(session):
+    for id in session.info.pop('unlinked_savings', ()):
+        entity_cache.invalidate(Savings, id)
+
+def _discard_unlinked(session):
+    session.info.pop('unlinked_savings', None)
+
+def register_goal_progress_listener():
+    if not sa.event.contains(Session, 'before_flush', apply_savings_deltas):
+        sa.event.listen(Session, 'before_flush', apply_savings_deltas)
+        sa.event.listen(Session, 'after_commit', _invalidate_unlinked)
+        sa.event.listen(Session, 'after_rollback', _discard_unlinked)
+
+def check_goal_progress(repair=False):
+    # Recompute every goal's totals with one aggregate and report (optionally fix) any drift
+    totals = (
+        db.session.query(Savings.goal_id, sa.func.coalesce(sa.func.sum(Savings.amount), 0).label('amount'), sa.func.count(Savings.id).label('count'))
+        .filter(Savings.goal_id.isnot(None))
+        .group_by(Savings.goal_id)
+        .subquery()
+    )
+    rows = (
+        db.session.query(Goal.id, Goal.saved_amount, Goal.savings_count, totals.c.amount, totals.c.count)
+        .outerjoin(totals, totals.c.goal_id == Goal.id)
+        .all()
+    )
+
+    drifted = []
+    for goal_id, saved_amount, savings_count, amount, count in rows:
+        amount, count = amount or 0.0, count or 0
+        if round(saved_amount or 0.0, 2) != round(amount, 2) or (savings_count or 0) != count:
+            drifted.append({'id': goal_id, 'saved_amount': amount, 'savings_count': count})
+
+    if repair and drifted:
+        db.session.execute(sa.update(Goal), drifted)
+        db.session.commit()
+    return drifted
+
+if __name__ == "__main__":
+    with app.app_context():
+        fixed = check_goal_progress(repair=True)
+        print(f"✅ Repaired {len(fixed)} goal(s) with drifted progress.")
@@ -0,0 +1,120 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from config import app, db
+
+# Opt-in: batch writes from many requests into one transaction instead of one commit per row
+GROUP_COMMIT = os.getenv('GROUP_COMMIT', 'false').lower() == 'true'
+GROUP_COMMIT_MAX_ROWS = int(os.getenv('GROUP_COMMIT_MAX_ROWS', '64'))
+GROUP_COMMIT_MAX_WAIT_MS = float(os.getenv('GROUP_COMMIT_MAX_WAIT_MS', '5'))
+# A write still queued after this long is withdrawn and fails its request; one already being flushed is waited for
+GROUP_COMMIT_TIMEOUT_S = float(os.getenv('GROUP_COMMIT_TIMEOUT_S', '10'))
+
+class GroupCommitter:
+    def __init__(self, app, max_rows=GROUP_COMMIT_MAX_ROWS, max_wait_ms=GROUP_COMMIT_MAX_WAIT_MS):
+        self.app = app
+        self.max_rows = max_rows
+        self.max_wait = max_wait_ms / 1000
+        self.pending = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, operation):
+        # Blocks the calling request until the batch its write joined has been committed
+        future = Future()
+        self.pending.put((operation, future))
+        self._ensure_started()
+        try:
+            return future.result(timeout=GROUP_COMMIT_TIMEOUT_S)
+        except TimeoutError:
+            if future.cancel():
+                # Never reached the database; the flusher skips cancelled writes
+                raise
+            return future.result()
+
+    def _ensure_started(self):
+        if self.thread and self.thread.is_alive():
+            return
+        with self.lock:
+            if not (self.thread and self.thread.is_alive()):
+                self.thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                batch = [self.pending.get()]
+                deadline = time.monotonic() + self.max_wait
+                while len(batch) < self.max_rows:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(self.pending.get(timeout=remaining))
+                    except queue.Empty:
+                        break
+                self._flush(batch)
+
+    def _flush(self, batch):
+        # Claim every write; a cancelled one has already failed its request and must not be applied
+        batch = [(operation, future) for operation, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        session = db.session
+        try:
+            for operation, future in batch:
+                operation(session)
+            session.commit()
+        except Exception:
+            session.rollback()
+            self.app.logger.warning(f"Group commit of {len(batch)} write(s) failed, retrying one by one", exc_info=True)
+            self._flush_individually(batch)
+            return
+        finally:
+            session.expunge_all()
+
+        for operation, future in batch:
+            future.set_result(True)
+
+    def _flush_individually(self, batch):
+        # Isolate the bad write so the rest of the batch still lands
+        session = db.session
+        for operation, future in batch:
+            try:
+                operation(session)
+                session.commit()
+                future.set_result(True)
+            except Exception as e:
+                session.rollback()
+                future.set_exception(e)
+            finally:
+                session.expunge_all()
+
+write_batcher = GroupCommitter(app)
+
+# Drop-in replacements for the add/commit, commit and delete/commit pairs in the route handlers
+
+def commit_add(obj):
+    if not GROUP_COMMIT:
+        db.session.add(obj)
+        db.session.commit()
+        return
+    write_batcher.submit(lambda session: session.add(obj))
+
+def commit_update(obj):
+    if not GROUP_COMMIT:
+        db.session.commit()
+        return
+    # Hand the modified row over to the flusher's session
+    db.session.expunge(obj)
+    write_batcher.submit(lambda session: session.merge(obj))
+
+def commit_delete(obj):
+    if not GROUP_COMMIT:
+        db.session.delete(obj)
+        db.session.commit()
+        return
+    db.session.expunge(obj)
+    write_batcher.submit(lambda session: session.delete(session.merge(obj)))
@@ -0,0 +1,22 @@
+import os
+
+# gunicorn -c gunicorn.conf.py app:app
+#
+# PLAID_ASYNC=false (default): classic sync workers, one in-flight request per process.
+# PLAID_ASYNC=true: gevent workers, so a process keeps serving while Plaid calls are waiting on the
+# network; in-flight Plaid calls are still capped by PLAID_MAX_CONCURRENCY (see plaid_calls.py).
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+
+if os.getenv('PLAID_ASYNC', 'false').lower() == 'true':
+    worker_class = 'gevent'
+    worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '1000'))
+else:
+    worker_class = 'sync'
+
+def post_worker_init(worker):
+    # Every worker resumes user purges interrupted by a restart; only one of them claims each job (purge.py)
+    from purge import purger
+    purger.start()
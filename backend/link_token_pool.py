@@ -0,0 +1,147 @@
+import datetime
+import os
+import threading
+import time
+import sqlalchemy as sa
+from plaid.model.link_token_create_request import LinkTokenCreateRequest
+from plaid.model.link_token_create_request_user import LinkTokenCreateRequestUser
+from plaid.model.country_code import CountryCode
+from plaid.model.products import Products
+from config import app, db
+from models import AccessToken, LinkTokenPool
+from plaid_calls import call_plaid
+from plaid_client_config import client
+
+# Opt-in: hand out link tokens minted ahead of time by a background thread instead of calling Plaid per click
+LINK_TOKEN_POOL = os.getenv('LINK_TOKEN_POOL', 'false').lower() == 'true'
+# Upper bound on pooled tokens overall and per user
+LINK_TOKEN_POOL_SIZE = int(os.getenv('LINK_TOKEN_POOL_SIZE', '500'))
+LINK_TOKEN_POOL_PER_USER = int(os.getenv('LINK_TOKEN_POOL_PER_USER', '1'))
+# A pooled token is only handed out if it stays valid at least this long (time to finish the Link flow)
+LINK_TOKEN_POOL_MIN_TTL_S = int(os.getenv('LINK_TOKEN_POOL_MIN_TTL_S', '900'))
+LINK_TOKEN_POOL_REFILL_S = float(os.getenv('LINK_TOKEN_POOL_REFILL_S', '30'))
+# Plaid calls per refill pass, so refills never crowd out synchronous requests
+LINK_TOKEN_POOL_MINT_BATCH = int(os.getenv('LINK_TOKEN_POOL_MINT_BATCH', '20'))
+# Users who asked for a token this recently are kept warm; users with a linked bank too if RETURNING is on
+LINK_TOKEN_POOL_ACTIVE_HOURS = float(os.getenv('LINK_TOKEN_POOL_ACTIVE_HOURS', '24'))
+LINK_TOKEN_POOL_RETURNING = os.getenv('LINK_TOKEN_POOL_RETURNING', 'false').lower() == 'true'
+
+pool = LinkTokenPool.__table__
+
+def link_token_request(user_id):
+    return LinkTokenCreateRequest(
+        client_name="PennyPilot",
+        country_codes=[CountryCode('US')],
+        language="en",
+        products=[Products("auth"), Products("transactions")],
+        user=LinkTokenCreateRequestUser(client_user_id=user_id),
+    )
+
+def _utcnow():
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+def _naive_utc(expiration):
+    if expiration is None:
+        # Plaid link tokens live for four hours
+        return _utcnow() + datetime.timedelta(hours=4)
+    if isinstance(expiration, str):
+        expiration = datetime.datetime.fromisoformat(expiration.replace('Z', '+00:00'))
+    if expiration.tzinfo:
+        expiration = expiration.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return expiration
+
+class LinkTokenRefiller:
+    def __init__(self, app):
+        self.app = app
+        self.wake = threading.Event()
+        self.demand = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def note_demand(self, user_id):
+        # Remember who is linking and let the refiller top them up right away
+        with self.lock:
+            self.demand[user_id] = time.monotonic()
+        self._ensure_started()
+        self.wake.set()
+
+    def _ensure_started(self):
+        if self.thread and self.thread.is_alive():
+            return
+        with self.lock:
+            if not (self.thread and self.thread.is_alive()):
+                self.thread = threading.Thread(target=self._run, name="link-token-pool", daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                self.wake.wait(LINK_TOKEN_POOL_REFILL_S)
+                self.wake.clear()
+                try:
+                    refill()
+                except Exception:
+                    db.session.rollback()
+                    self.app.logger.error("Link token pool refill failed", exc_info=True)
+                finally:
+                    db.session.remove()
+
+    def active_users(self):
+        cutoff = time.monotonic() - LINK_TOKEN_POOL_ACTIVE_HOURS * 3600
+        with self.lock:
+            for user_id in [u for u, seen in self.demand.items() if seen < cutoff]:
+                del self.demand[user_id]
+            recent = sorted(self.demand, key=self.demand.get, reverse=True)
+        if LINK_TOKEN_POOL_RETURNING:
+            known = set(recent)
+            returning = db.session.execute(sa.select(AccessToken.user_id).distinct()).scalars()
+            recent += [user_id for user_id in returning if user_id not in known]
+        return recent
+
+refiller = LinkTokenRefiller(app)
+
+def take_link_token(user_id):
+    # Claim the user's oldest still-usable pooled token, or None if there is none
+    refiller.note_demand(user_id)
+    usable_after = _utcnow() + datetime.timedelta(seconds=LINK_TOKEN_POOL_MIN_TTL_S)
+    candidates = db.session.execute(
+        sa.select(pool.c.id, pool.c.link_token, pool.c.expiration)
+        .where(pool.c.user_id == user_id, pool.c.expiration > usable_after)
+        .order_by(pool.c.expiration)
+        .limit(3)
+    ).all()
+    for token_id, link_token, expiration in candidates:
+        # Another worker may claim the same row; only the delete that wins hands it out
+        if db.session.execute(pool.delete().where(pool.c.id == token_id)).rowcount == 1:
+            db.session.commit()
+            return {'link_token': link_token, 'expiration': expiration.replace(tzinfo=datetime.timezone.utc), 'request_id': None}
+    db.session.rollback()
+    return None
+
+def refill():
+    # Drop tokens that are too close to expiry, then top up active users within the size limits
+    usable_after = _utcnow() + datetime.timedelta(seconds=LINK_TOKEN_POOL_MIN_TTL_S)
+    db.session.execute(pool.delete().where(pool.c.expiration <= usable_after))
+    db.session.commit()
+
+    counts = dict(db.session.execute(sa.select(pool.c.user_id, sa.func.count()).group_by(pool.c.user_id)).all())
+    room = LINK_TOKEN_POOL_SIZE - sum(counts.values())
+    minted = 0
+    for user_id in refiller.active_users():
+        missing = LINK_TOKEN_POOL_PER_USER - counts.get(user_id, 0)
+        while missing > 0 and room > 0 and minted < LINK_TOKEN_POOL_MINT_BATCH:
+            response = call_plaid(client.link_token_create, link_token_request(user_id)).to_dict()
+            db.session.execute(pool.insert().values(
+                user_id=user_id,
+                link_token=response['link_token'],
+                expiration=_naive_utc(response.get('expiration')),
+            ))
+            db.session.commit()
+            missing, room, minted = missing - 1, room - 1, minted + 1
+        if minted >= LINK_TOKEN_POOL_MINT_BATCH:
+            # More to do than one pass allows; go again without waiting for the interval
+            refiller.wake.set()
+            break
+        if room <= 0:
+            break
+    return minted
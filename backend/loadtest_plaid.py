@@ -0,0 +1,120 @@
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Requests per second through /api/create_link_token against the local Plaid simulator (PLAID_ENV=Simulator),
+# once on sync gunicorn workers and once on gevent workers (PLAID_ASYNC=true):
+#   python loadtest_plaid.py --latencies 50 200 500 --workers 2 --clients 64 --duration 10
+# --sigma > 0 draws latencies from a lognormal around each median instead of a fixed delay.
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+LOADTEST_KEY = 'loadtest-key'
+
+def _prepare_database(path):
+    os.environ['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    sys.path.insert(0, BACKEND_DIR)
+    from config import app, db
+    from base import Base
+    from key_utils import store_key
+    import models  # noqa: F401 - registers the tables
+
+    with app.app_context():
+        Base.metadata.create_all(db.engine)
+        db.create_all()
+        store_key(db.session, LOADTEST_KEY)
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def _wait_until_serving(url, timeout=30):
+    # The master opens the port before the workers have imported the app, so wait for a real response
+    import requests
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.post(url, json={'key': LOADTEST_KEY, 'user_id': 'loadtest'}, timeout=5).status_code == 200:
+                # Give the remaining workers a moment to finish booting as well
+                time.sleep(1)
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"gunicorn did not start serving {url}")
+
+def _drive(url, clients, duration):
+    import requests
+
+    def worker():
+        session = requests.Session()
+        done = failed = 0
+        deadline = time.time() + duration
+        while time.time() < deadline:
+            try:
+                response = session.post(url, json={'key': LOADTEST_KEY, 'user_id': 'loadtest'}, timeout=30)
+                if response.status_code == 200:
+                    done += 1
+                else:
+                    failed += 1
+            except requests.RequestException:
+                failed += 1
+        return done, failed
+
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        results = list(pool.map(lambda _: worker(), range(clients)))
+    elapsed = time.time() - started
+    return sum(r[0] for r in results) / elapsed, sum(r[1] for r in results)
+
+def run_mode(async_mode, latency_ms, args, database_uri):
+    latency = f'lognormal:{latency_ms}:{args.sigma}' if args.sigma else f'fixed:{latency_ms}'
+    port = _free_port()
+    env = dict(
+        os.environ,
+        SQLALCHEMY_DATABASE_URI=database_uri,
+        PLAID_ENV='Simulator',
+        PLAID_SIM_LATENCY=latency,
+        PLAID_SIM_ERROR_RATE='',
+        PLAID_SIM_RATE_LIMIT='',
+        PLAID_ASYNC='true' if async_mode else 'false',
+        GUNICORN_BIND=f'127.0.0.1:{port}',
+        GUNICORN_WORKERS=str(args.workers),
+    )
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        url = f'http://127.0.0.1:{port}/api/create_link_token'
+        _wait_until_serving(url)
+        return _drive(url, args.clients, args.duration)
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test Plaid-bound routes on sync vs gevent workers")
+    parser.add_argument("--latencies", type=int, nargs="+", default=[50, 200, 500], help="simulated Plaid latency in ms")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--clients", type=int, default=64, help="concurrent client connections")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per run")
+    parser.add_argument("--sigma", type=float, default=0, help="lognormal spread of the simulated latency")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, 'loadtest.db')
+        _prepare_database(database_path)
+
+        print(f"{args.workers} worker(s), {args.clients} concurrent clients, {args.duration:g}s per run")
+        print(f"{'latency ms':>10}  {'sync rps':>10}  {'async rps':>10}  {'errors':>8}")
+        for latency_ms in args.latencies:
+            sync_rps, sync_errors = run_mode(False, latency_ms, args, f'sqlite:///{database_path}')
+            async_rps, async_errors = run_mode(True, latency_ms, args, f'sqlite:///{database_path}')
+            print(f"{latency_ms:>10}  {sync_rps:>10.1f}  {async_rps:>10.1f}  {sync_errors + async_errors:>8}")
+        print("✅ Load test complete.")
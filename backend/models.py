@@ -1,5 +1,6 @@
 from config import db, app
 import sqlalchemy as sa
+import datetime
 import os
 
 class User(db.Model):
@@ -20,9 +21,12 @@ class LinkedAccount(db.Model):
 user = db.relationship('User', backref='linked_account')
 class Transaction(db.Model):
     __tablename__ = 'Transactions'
+    # AUTOINCREMENT on SQLite: ids of rows sealed into monthly shards are never handed out again (partitioning.py)
+    __table_args__ = {'sqlite_autoincrement': True}
     id = db.Column(db.Integer, primary_key=True)
     transaction_date = db.Column(db.Date, nullable=False)
     transaction_amount = db.Column(db.Float, nullable=False)
+    user_id = db.Column(db.String(50), db.ForeignKey('Users.id'), index=True)
 
 
 class Goal(db.Model):
@@ -31,6 +35,12 @@ class Goal(db.Model):
     target_amount = db.Column(db.Float, nullable=False)
     current_amount = db.Column(db.Float, nullable=False)
     deadline = db.Column(db.Date, nullable=False)
+    user_id = db.Column(db.String(50), db.ForeignKey('Users.id'), index=True)
+    # Maintained from linked Savings rows, see goal_progress.py
+    saved_amount = db.Column(db.Float, nullable=False, default=0)
+    savings_count = db.Column(db.Integer, nullable=False, default=0)
+    # Incremented by every write to the goal, see counters.py
+    version = db.Column(db.Integer, nullable=False, default=0)
 
 class TaxInfo(db.Model):
     __tablename__ = 'Tax_Info'
@@ -45,23 +55,30 @@ class TaxInfo(db.Model):
     total_income = db.Column(db.Float, nullable=False)
     tax_to_save = db.Column(db.Float, nullable=False)
     total_saved = db.Column(db.Float, nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=0)
 
 class Income(db.Model):
     __tablename__ = 'Income'
+    # AUTOINCREMENT on SQLite: ids of rows sealed into monthly shards are never handed out again (partitioning.py)
+    __table_args__ = {'sqlite_autoincrement': True}
     id = db.Column(db.Integer, primary_key=True)
     amount = db.Column(db.Float, nullable=False)
     source = db.Column(db.String(100), nullable=False)
     date = db.Column(db.Date, nullable=False)
     description = db.Column(db.String(1000))
+    user_id = db.Column(db.String(50), db.ForeignKey('Users.id'), index=True)
 # I'm guessing the description should be allowed to be empty, need to fix this if I'm wrong.
 
 class Expenses(db.Model):
     __tablename__ = 'Expenses'
+    # AUTOINCREMENT on SQLite: ids of rows sealed into monthly shards are never handed out again (partitioning.py)
+    __table_args__ = {'sqlite_autoincrement': True}
     id = db.Column(db.Integer, primary_key=True)
     amount = db.Column(db.Float, nullable=False)
     category = db.Column(db.String(100), nullable=False)
     date = db.Column(db.Date, nullable=False)
     description = db.Column(db.String(1000))
+    user_id = db.Column(db.String(50), db.ForeignKey('Users.id'), index=True)
 # Here too.
 
 class Savings(db.Model):
@@ -71,6 +88,8 @@ class Savings(db.Model):
     goal_name = db.Column(db.String(100), nullable=False)
     target_amount = db.Column(db.Float, nullable=False)
     date = db.Column(db.Date, nullable=False)
+    user_id = db.Column(db.String(50), db.ForeignKey('Users.id'), index=True)
+    goal_id = db.Column(db.Integer, db.ForeignKey('Goals.id'), index=True)
 
 class Budget(db.Model):
     __tablename__ = 'Budget'
@@ -79,6 +98,189 @@ class Budget(db.Model):
     target_amount = db.Column(db.Float, nullable=False)
     month = db.Column(db.String(3), nullable=False)
     year = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.String(50), db.ForeignKey('Users.id'), index=True)
+
+class RecurringStream(db.Model):
+    __tablename__ = 'Recurring_Streams'
+    __table_args__ = (sa.UniqueConstraint('user_id', 'merchant'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(50), nullable=False, index=True)
+    merchant = db.Column(db.String(200), nullable=False)
+    # weekly / biweekly / monthly / annual, or None while no pattern has been found
+    frequency = db.Column(db.String(10))
+    average_amount = db.Column(db.Float, nullable=False)
+    amount_variation = db.Column(db.Float, nullable=False)
+    occurrences = db.Column(db.Integer, nullable=False)
+    last_date = db.Column(db.Date, nullable=False)
+    next_date = db.Column(db.Date)
+    is_subscription = db.Column(db.Boolean, nullable=False, default=False)
+    is_active = db.Column(db.Boolean, nullable=False, default=False)
+    # Recent [day ordinal, amount] pairs, newest last, capped in recurring.py
+    history = db.Column(db.Text, nullable=False)
+
+class CategoryRule(db.Model):
+    __tablename__ = 'Category_Rules'
+    id = db.Column(db.Integer, primary_key=True)
+    keyword = db.Column(db.String(100), nullable=False)
+    category = db.Column(db.String(20), nullable=False)
+    priority = db.Column(db.Integer, nullable=False, default=0)
+    # any / inflow / outflow (Plaid reports inflows as negative amounts)
+    amount_sign = db.Column(db.String(10), nullable=False, default='any')
+    # Only applies to transactions with this Plaid personal_finance_category primary (e.g. TRANSFER); null for any
+    plaid_primary = db.Column(db.String(50))
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.now, onupdate=datetime.datetime.now)
+
+class TransactionCategory(db.Model):
+    __tablename__ = 'Transaction_Categories'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(50), nullable=False, index=True)
+    transaction_id = db.Column(db.String(100), unique=True, nullable=False)
+    description = db.Column(db.String(1000))
+    amount = db.Column(db.Float, nullable=False)
+    plaid_primary = db.Column(db.String(50))
+    category = db.Column(db.String(20), nullable=False)
+    # override / plaid / rule / default
+    source = db.Column(db.String(10), nullable=False)
+    rules_version = db.Column(db.String(40))
+
+class SearchDocument(db.Model):
+    # Denormalized search text for Plaid transactions, expenses and incomes, see search_index.py
+    __tablename__ = 'Search_Documents'
+    __table_args__ = (sa.UniqueConstraint('kind', 'ref'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(50), index=True)
+    # transaction / expense / income
+    kind = db.Column(db.String(12), nullable=False)
+    ref = db.Column(db.String(100), nullable=False)
+    merchant = db.Column(db.String(200))
+    description = db.Column(db.String(1000))
+    amount = db.Column(db.Float, nullable=False)
+    date = db.Column(db.Date, nullable=False)
+
+class SpendingStat(db.Model):
+    # Online per-user, per-category spending statistics, see anomalies.py
+    __tablename__ = 'Spending_Stats'
+    __table_args__ = (sa.UniqueConstraint('user_id', 'category'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(50), nullable=False)
+    category = db.Column(db.String(100), nullable=False)
+    # Welford running mean / sum of squared deviations
+    count = db.Column(db.Integer, nullable=False)
+    mean = db.Column(db.Float, nullable=False)
+    m2 = db.Column(db.Float, nullable=False)
+    ewma = db.Column(db.Float, nullable=False)
+    ewm_var = db.Column(db.Float, nullable=False)
+    # P-square quantile markers as JSON
+    sketch = db.Column(db.Text, nullable=False)
+    last_date = db.Column(db.Date)
+
+class SpendingObservation(db.Model):
+    # Every charge folded into Spending_Stats once, so re-fetched transactions are not counted twice
+    __tablename__ = 'Spending_Observations'
+    __table_args__ = (sa.UniqueConstraint('kind', 'ref'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(50), nullable=False, index=True)
+    # transaction / expense
+    kind = db.Column(db.String(12), nullable=False)
+    ref = db.Column(db.String(100), nullable=False)
+    category = db.Column(db.String(100), nullable=False)
+    merchant = db.Column(db.String(200))
+    amount = db.Column(db.Float, nullable=False)
+    date = db.Column(db.Date, nullable=False, index=True)
+
+class SpendingAnomaly(db.Model):
+    __tablename__ = 'Spending_Anomalies'
+    __table_args__ = (sa.UniqueConstraint('kind', 'ref'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(50), nullable=False, index=True)
+    kind = db.Column(db.String(12), nullable=False)
+    ref = db.Column(db.String(100), nullable=False)
+    category = db.Column(db.String(100), nullable=False)
+    merchant = db.Column(db.String(200))
+    amount = db.Column(db.Float, nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    expected_amount = db.Column(db.Float, nullable=False)
+    z_score = db.Column(db.Float, nullable=False)
+    reason = db.Column(db.String(200), nullable=False)
+    dismissed = db.Column(db.Boolean, nullable=False, default=False)
+
+class BalanceNode(db.Model):
+    # Fenwick tree nodes over day numbers per user / kind / category, see balance_index.py
+    __tablename__ = 'Balance_Nodes'
+    __table_args__ = (sa.UniqueConstraint('user_id', 'kind', 'category', 'node'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(50), nullable=False)
+    # transaction / expense / income
+    kind = db.Column(db.String(12), nullable=False)
+    category = db.Column(db.String(100), nullable=False)
+    node = db.Column(db.Integer, nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    count = db.Column(db.Integer, nullable=False)
+
+class BalanceWarning(db.Model):
+    # Accounts projected to fall below the low-balance threshold, precomputed by forecast.py
+    __tablename__ = 'Balance_Warnings'
+    __table_args__ = (sa.UniqueConstraint('user_id', 'account_id'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(50), nullable=False, index=True)
+    account_id = db.Column(db.String(100), nullable=False)
+    account_name = db.Column(db.String(200))
+    balance = db.Column(db.Float, nullable=False)
+    first_low_date = db.Column(db.Date, nullable=False)
+    min_balance = db.Column(db.Float, nullable=False)
+    min_date = db.Column(db.Date, nullable=False)
+    # True if the dip comes before the next expected income deposit
+    before_income = db.Column(db.Boolean, nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.now)
+
+class UserPurge(db.Model):
+    # Progress of a user's data purge, see purge.py; an unfinished job resumes at `step`
+    __tablename__ = 'User_Purges'
+    user_id = db.Column(db.String(50), primary_key=True)
+    # pending / running / done / failed
+    status = db.Column(db.String(10), nullable=False)
+    step = db.Column(db.String(50))
+    rows_deleted = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.String(500))
+    requested_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.now)
+    finished_at = db.Column(db.DateTime)
+    # Last progress of a running job; one silent for longer than PURGE_LEASE_S is taken over
+    heartbeat_at = db.Column(db.DateTime)
+
+class LinkTokenPool(db.Model):
+    # Pre-minted Plaid link tokens waiting to be handed out, see link_token_pool.py
+    __tablename__ = 'Link_Token_Pool'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(50), nullable=False, index=True)
+    link_token = db.Column(db.String(200), nullable=False)
+    # UTC
+    expiration = db.Column(db.DateTime, nullable=False, index=True)
+
+class XpEvent(db.Model):
+    # Append-only gamification ledger, see xp_ledger.py; rows are never updated, and only deleted by a user purge
+    __tablename__ = 'Xp_Events'
+    __table_args__ = (sa.Index('ix_Xp_Events_user_id_id', 'user_id', 'id'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(50), nullable=False)
+    event = db.Column(db.String(30), nullable=False)
+    # goal:<id> / savings:<id> / budget:<id>
+    ref = db.Column(db.String(50), nullable=False, index=True)
+    xp = db.Column(db.Integer, nullable=False)
+    goals = db.Column(db.Integer, nullable=False, default=0)
+    completed_goals = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.now)
+
+class XpTotals(db.Model):
+    # Materialized from Xp_Events, one row per user
+    __tablename__ = 'Xp_Totals'
+    user_id = db.Column(db.String(50), primary_key=True)
+    xp = db.Column(db.Integer, nullable=False)
+    level = db.Column(db.Integer, nullable=False)
+    goals = db.Column(db.Integer, nullable=False)
+    completed_goals = db.Column(db.Integer, nullable=False)
+    # JSON list of earned badge names
+    badges = db.Column(db.Text, nullable=False)
+    last_event_id = db.Column(db.Integer, nullable=False)
 
 class AccessToken(db.Model):
     __tablename__ = 'access_tokens'
@@ -0,0 +1,40 @@
+import argparse
+from config import db, app
+from partitioning import (archive_cold_partitions, enable_postgres_partitioning, ensure_postgres_partitions,
+                          is_postgres, seal_closed_months)
+
+# Run from cron / a scheduler:
+#   python partition_maintenance.py enable               one-time conversion of the tables on Postgres
+#   python partition_maintenance.py maintain             create upcoming partitions (Postgres) or seal closed months (SQLite)
+#   python partition_maintenance.py archive --older-than 24
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Partition maintenance for Transactions, Income and Expenses")
+    parser.add_argument("command", choices=["enable", "maintain", "archive"])
+    parser.add_argument("--older-than", type=int, default=24, help="archive partitions older than this many months")
+    args = parser.parse_args(argv)
+
+    with app.app_context():
+        engine = db.engine
+
+        if args.command == "enable":
+            if is_postgres(engine):
+                enable_postgres_partitioning(engine)
+                print("✅ Tables converted to monthly partitions.")
+            else:
+                print("SQLite has no native partitioning; 'maintain' seals closed months into shard tables instead.")
+
+        elif args.command == "maintain":
+            if is_postgres(engine):
+                ensure_postgres_partitions(engine)
+                print("✅ Upcoming monthly partitions are in place.")
+            else:
+                moved = seal_closed_months(engine)
+                print(f"✅ Sealed {moved} row(s) into monthly shard tables.")
+
+        elif args.command == "archive":
+            archived = archive_cold_partitions(engine, args.older_than)
+            print(f"✅ Archived {len(archived)} partition(s): {', '.join(archived) or 'none'}")
+
+if __name__ == "__main__":
+    main()
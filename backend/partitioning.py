@@ -0,0 +1,263 @@
+import datetime
+import itertools
+import json
+import os
+import zlib
+import sqlalchemy as sa
+from config import db
+from models import Transaction, Income, Expenses
+
+# Opt-in: monthly partitions on Postgres, monthly shard tables on SQLite
+PARTITIONED_STORAGE = os.getenv('PARTITIONED_STORAGE', 'false').lower() == 'true'
+# Months (including the current one) kept in the live table on SQLite before they are sealed into shards
+SQLITE_OPEN_MONTHS = int(os.getenv('PARTITION_OPEN_MONTHS', '2'))
+# Months of partitions created ahead of time on Postgres
+POSTGRES_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', '3'))
+
+# table name -> (model, partition key column name)
+PARTITIONED_MODELS = {
+    'Transactions': (Transaction, 'transaction_date'),
+    'Income': (Income, 'date'),
+    'Expenses': (Expenses, 'date'),
+}
+
+archive_metadata = sa.MetaData()
+shard_metadata = sa.MetaData()
+
+def month_start(day):
+    return datetime.date(day.year, day.month, 1)
+
+def add_months(day, months):
+    index = day.year * 12 + (day.month - 1) + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table_name, month):
+    return f"{table_name}_p{month.year:04d}{month.month:02d}"
+
+def partition_month(table_name, name):
+    # Inverse of partition_name; returns None for anything that isn't a monthly partition of table_name
+    suffix = name[len(table_name) + 2:]
+    if not name.startswith(f"{table_name}_p") or len(suffix) != 6 or not suffix.isdigit():
+        return None
+    return datetime.date(int(suffix[:4]), int(suffix[4:]), 1)
+
+def is_postgres(engine):
+    return engine.dialect.name == 'postgresql'
+
+def is_partitioned(model):
+    return PARTITIONED_STORAGE and model.__tablename__ in PARTITIONED_MODELS
+
+def archive_table(table_name):
+    name = f"{table_name}_archive"
+    if name in archive_metadata.tables:
+        return archive_metadata.tables[name]
+
+    # One compressed chunk per (user, month) holding that month's rows as JSON
+    return sa.Table(
+        name, archive_metadata,
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('user_id', sa.String(50), index=True),
+        sa.Column('month', sa.Date, nullable=False, index=True),
+        sa.Column('row_count', sa.Integer, nullable=False),
+        sa.Column('payload', sa.LargeBinary, nullable=False),
+    )
+
+def shard_table(table_name, month):
+    name = partition_name(table_name, month)
+    if name in shard_metadata.tables:
+        return shard_metadata.tables[name]
+
+    model, key = PARTITIONED_MODELS[table_name]
+    columns = [sa.Column(c.name, c.type, primary_key=c.primary_key) for c in model.__table__.columns]
+    return sa.Table(name, shard_metadata, *columns, sa.Index(f"ix_{name}_user_date", 'user_id', key))
+
+def _quote(engine, name):
+    return engine.dialect.identifier_preparer.quote(name)
+
+def _existing_partitions(engine, table_name):
+    # Monthly partitions (Postgres) or shards (SQLite) that currently exist, oldest first
+    if is_postgres(engine):
+        with engine.connect() as conn:
+            names = conn.execute(sa.text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = :parent"
+            ), {"parent": table_name}).scalars().all()
+    else:
+        names = sa.inspect(engine).get_table_names()
+
+    months = [partition_month(table_name, name) for name in names]
+    return sorted(month for month in months if month)
+
+# --- Postgres: native range partitioning ---
+
+def _create_postgres_partition(conn, engine, table_name, key, month):
+    conn.execute(sa.text(
+        f"CREATE TABLE IF NOT EXISTS {_quote(engine, partition_name(table_name, month))} "
+        f"PARTITION OF {_quote(engine, table_name)} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    ))
+
+def enable_postgres_partitioning(engine):
+    today = datetime.date.today()
+    for table_name, (model, key) in PARTITIONED_MODELS.items():
+        with engine.begin() as conn:
+            relkind = conn.execute(sa.text("SELECT relkind FROM pg_class WHERE relname = :name"), {"name": table_name}).scalar()
+            if relkind == 'p':
+                continue
+
+            table, old, column = _quote(engine, table_name), _quote(engine, f"{table_name}_unpartitioned"), _quote(engine, key)
+            sequence = conn.execute(sa.text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": f'"{table_name}"'}).scalar()
+            first = conn.execute(sa.text(f"SELECT MIN({column}) FROM {table}")).scalar() or today
+
+            conn.execute(sa.text(f"ALTER TABLE {table} RENAME TO {old}"))
+            conn.execute(sa.text(f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE ({column})"))
+            conn.execute(sa.text(f"CREATE TABLE {_quote(engine, table_name + '_default')} PARTITION OF {table} DEFAULT"))
+
+            month = month_start(first)
+            while month <= add_months(month_start(today), POSTGRES_MONTHS_AHEAD):
+                _create_postgres_partition(conn, engine, table_name, key, month)
+                month = add_months(month, 1)
+
+            conn.execute(sa.text(f"INSERT INTO {table} SELECT * FROM {old}"))
+            if sequence:
+                # Keep the id sequence alive when the old table is dropped
+                conn.execute(sa.text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+            conn.execute(sa.text(f"DROP TABLE {old}"))
+
+            # The partition key has to be part of the primary key on a partitioned table
+            conn.execute(sa.text(f"ALTER TABLE {table} ADD PRIMARY KEY (id, {column})"))
+            conn.execute(sa.text(f"ALTER TABLE {table} ADD FOREIGN KEY (user_id) REFERENCES \"Users\" (id)"))
+            conn.execute(sa.text(f"CREATE INDEX {_quote(engine, 'ix_' + table_name + '_user_date')} ON {table} (user_id, {column})"))
+
+def ensure_postgres_partitions(engine):
+    current = month_start(datetime.date.today())
+    with engine.begin() as conn:
+        for table_name, (model, key) in PARTITIONED_MODELS.items():
+            for offset in range(POSTGRES_MONTHS_AHEAD + 1):
+                _create_postgres_partition(conn, engine, table_name, key, add_months(current, offset))
+
+# --- SQLite: sealed monthly shard tables ---
+
+def _has_autoincrement(conn, table_name):
+    sql = conn.execute(sa.text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table_name}).scalar()
+    return 'AUTOINCREMENT' in (sql or '').upper()
+
+def _keep_id_counter(conn, table_name, high_water):
+    # Without AUTOINCREMENT SQLite reuses max(rowid) + 1, so the next insert could take an id already in a shard.
+    # AUTOINCREMENT tables: make sure sqlite_sequence is at least the high-water id.
+    # Older tables created without it: the row holding the high-water id is left in the base table, returns its id.
+    if _has_autoincrement(conn, table_name):
+        updated = conn.execute(sa.text(
+            "UPDATE sqlite_sequence SET seq = MAX(seq, :seq) WHERE name = :name"
+        ), {"name": table_name, "seq": high_water}).rowcount
+        if not updated:
+            conn.execute(sa.text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"), {"name": table_name, "seq": high_water})
+        return None
+    return high_water
+
+def seal_closed_months(engine):
+    cutoff = add_months(month_start(datetime.date.today()), -(SQLITE_OPEN_MONTHS - 1))
+    sealed = 0
+    for table_name, (model, key) in PARTITIONED_MODELS.items():
+        base = model.__table__
+        column = base.c[key]
+        with engine.begin() as conn:
+            days = conn.execute(sa.select(sa.func.strftime('%Y-%m-01', column)).where(column < cutoff).distinct()).scalars().all()
+            high_water = conn.execute(sa.select(sa.func.max(base.c.id))).scalar()
+            held = _keep_id_counter(conn, table_name, high_water) if days else None
+            for day in sorted(days):
+                month = datetime.date.fromisoformat(day)
+                shard = shard_table(table_name, month)
+                shard.create(conn, checkfirst=True)
+
+                in_month = sa.and_(column >= month, column < add_months(month, 1))
+                if held is not None:
+                    in_month = sa.and_(in_month, base.c.id != held)
+                conn.execute(shard.insert().from_select([c.name for c in base.columns], sa.select(base).where(in_month)))
+                sealed += conn.execute(base.delete().where(in_month)).rowcount
+    return sealed
+
+def sealed_shards(engine, table_name):
+    # SQLite shard tables holding sealed months of table_name; on Postgres the parent table already covers them
+    if is_postgres(engine):
+        return []
+    return [shard_table(table_name, month) for month in _existing_partitions(engine, table_name)]
+
+def range_source(model, start_date=None, end_date=None):
+    # Selectable to read model rows from, restricted to the partitions a date range can touch.
+    # Postgres prunes natively, so only SQLite shards need stitching together here.
+    if not is_partitioned(model) or is_postgres(db.engine):
+        return model.__table__
+
+    table_name = model.__tablename__
+    first = month_start(start_date) if start_date else None
+    last = month_start(end_date) if end_date else None
+    months = [m for m in _existing_partitions(db.engine, table_name) if (not first or m >= first) and (not last or m <= last)]
+    if not months:
+        return model.__table__
+
+    base = model.__table__
+    selects = [sa.select(base)] + [sa.select(shard_table(table_name, m)) for m in months]
+    return sa.union_all(*selects).subquery(table_name)
+
+# --- Retention: compressed archives of cold partitions ---
+
+def _row_to_json(row):
+    return {name: value.isoformat() if hasattr(value, 'isoformat') else value for name, value in row._mapping.items()}
+
+def archive_cold_partitions(engine, older_than_months):
+    cutoff = add_months(month_start(datetime.date.today()), -older_than_months)
+    archived = []
+    for table_name, (model, key) in PARTITIONED_MODELS.items():
+        archive = archive_table(table_name)
+        archive.create(engine, checkfirst=True)
+
+        for month in _existing_partitions(engine, table_name):
+            if month >= cutoff:
+                break
+
+            name = partition_name(table_name, month)
+            partition = sa.table(name, *[sa.column(c.name) for c in model.__table__.columns])
+            with engine.begin() as conn:
+                rows = conn.execute(sa.select(partition).order_by(partition.c.user_id, partition.c.id))
+                for user_id, user_rows in itertools.groupby(rows, key=lambda row: row.user_id):
+                    records = [_row_to_json(row) for row in user_rows]
+                    conn.execute(archive.insert().values(
+                        user_id=user_id,
+                        month=month,
+                        row_count=len(records),
+                        payload=zlib.compress(json.dumps(records).encode(), 9),
+                    ))
+
+                if is_postgres(engine):
+                    conn.execute(sa.text(f"ALTER TABLE {_quote(engine, table_name)} DETACH PARTITION {_quote(engine, name)}"))
+                conn.execute(sa.text(f"DROP TABLE {_quote(engine, name)}"))
+            if name in shard_metadata.tables:
+                shard_metadata.remove(shard_metadata.tables[name])
+            archived.append(name)
+    return archived
+
+def iter_archived_rows(engine, model, user_id, start_date=None, end_date=None):
+    # Decompress only the (user, month) chunks that overlap the range, then filter by day
+    table_name = model.__tablename__
+    key = PARTITIONED_MODELS[table_name][1]
+    archive = archive_table(table_name)
+    if not sa.inspect(engine).has_table(archive.name):
+        return
+
+    query = sa.select(archive.c.payload).where(archive.c.user_id == user_id).order_by(archive.c.month)
+    if start_date:
+        query = query.where(archive.c.month >= month_start(start_date))
+    if end_date:
+        query = query.where(archive.c.month <= end_date)
+
+    with engine.connect() as conn:
+        for payload in conn.execute(query).scalars():
+            for record in json.loads(zlib.decompress(payload)):
+                day = datetime.date.fromisoformat(record[key])
+                if (start_date and day < start_date) or (end_date and day > end_date):
+                    continue
+                record[key] = day
+                yield record
@@ -0,0 +1,21 @@
+import os
+import threading
+
+# Upper bound on Plaid calls in flight per worker process. Under the gevent worker (PLAID_ASYNC=true)
+# threading primitives are patched to be cooperative, so waiting here parks a greenlet, not a process.
+PLAID_MAX_CONCURRENCY = int(os.getenv('PLAID_MAX_CONCURRENCY', '50'))
+# How long a request may wait for a free slot before it is turned away with a 503
+PLAID_QUEUE_TIMEOUT_S = float(os.getenv('PLAID_QUEUE_TIMEOUT_S', '2'))
+
+_slots = threading.BoundedSemaphore(PLAID_MAX_CONCURRENCY)
+
+class PlaidBusy(Exception):
+    pass
+
+def call_plaid(method, plaid_request):
+    if not _slots.acquire(timeout=PLAID_QUEUE_TIMEOUT_S):
+        raise PlaidBusy("Too many Plaid requests in flight")
+    try:
+        return method(plaid_request)
+    finally:
+        _slots.release()
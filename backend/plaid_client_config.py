@@ -8,11 +8,16 @@ from config import db
 load_dotenv()
 CLIENT_ID = os.getenv('PLAID_CLIENT_ID', 'your_client_id')
 SECRET = os.getenv('PLAID_SECRET', 'your_secret')
-ENV = os.getenv('PLAID_ENV', 'Sandbox')  # Default to Sandbox environment
+ENV = os.getenv('PLAID_ENV', 'Sandbox')  # Default to Sandbox environment; 'Simulator' runs fully offline
 
-configuration = plaid.Configuration(
-    host=getattr(plaid.Environment, ENV),
-    api_key={'clientId': CLIENT_ID, 'secret': SECRET}
-)
+if ENV.lower() == 'simulator':
+    # Local stand-in with generated data, see plaid_simulator.py
+    from plaid_simulator import PlaidSimulator
+    client = PlaidSimulator.from_env()
+else:
+    configuration = plaid.Configuration(
+        host=getattr(plaid.Environment, ENV),
+        api_key={'clientId': CLIENT_ID, 'secret': SECRET}
+    )
 
-client = plaid_api.PlaidApi(plaid.ApiClient(configuration))
\ No newline at end of file
+    client = plaid_api.PlaidApi(plaid.ApiClient(configuration))
\ No newline at end of file
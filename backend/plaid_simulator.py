@@ -0,0 +1,326 @@
+import bisect
+import datetime
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from plaid import ApiException
+
+# Local stand-in for the Plaid endpoints we call, selected with PLAID_ENV=Simulator.
+#
+# PLAID_SIM_LATENCY       per-endpoint latency distributions in ms, e.g.
+#                         "default=lognormal:120:0.5,transactions_get=lognormal:400:0.6,link_token_create=fixed:80"
+#                         (fixed:<ms>, uniform:<lo>:<hi>, normal:<mean>:<sd>, lognormal:<median>:<sigma>)
+# PLAID_SIM_ERROR_RATE    share of calls failing with a 500 INTERNAL_SERVER_ERROR, e.g. "default=0.01,accounts_get=0.05"
+# PLAID_SIM_RATE_LIMIT    calls per second allowed per endpoint before 429 RATE_LIMIT_EXCEEDED, e.g. "transactions_get=30"
+# PLAID_SIM_HISTORY_DAYS  days of synthetic history per item (default 730)
+# PLAID_SIM_DAILY_TRANSACTIONS  average discretionary transactions per day (default 3)
+# PLAID_SIM_SEED          makes every item's history reproducible (default 0)
+
+ACCESS_TOKEN_PREFIX = 'access-simulator-'
+PUBLIC_TOKEN_PREFIX = 'public-simulator-'
+CACHED_ITEMS = 32
+
+# name, Plaid primary / detailed category, legacy category, amount range, day of month or period in days
+RECURRING = (
+    ('Landlord Properties', 'RENT_AND_UTILITIES', 'RENT_AND_UTILITIES_RENT', ['Payment', 'Rent'], (1200, 1200), 'monthly', 1),
+    ('City Power & Light', 'RENT_AND_UTILITIES', 'RENT_AND_UTILITIES_GAS_AND_ELECTRICITY', ['Service', 'Utilities'], (60, 140), 'monthly', 12),
+    ('Netflix', 'ENTERTAINMENT', 'ENTERTAINMENT_TV_AND_MOVIES', ['Service', 'Subscription'], (15.49, 15.49), 'monthly', 18),
+    ('Spotify', 'ENTERTAINMENT', 'ENTERTAINMENT_MUSIC_AND_AUDIO', ['Service', 'Subscription'], (10.99, 10.99), 'monthly', 5),
+    ('Planet Fitness', 'PERSONAL_CARE', 'PERSONAL_CARE_GYMS_AND_FITNESS_CENTERS', ['Recreation', 'Gyms and Fitness Centers'], (24.99, 24.99), 'monthly', 20),
+    ('ACME Corp Payroll', 'INCOME', 'INCOME_WAGES', ['Transfer', 'Payroll'], (-2150, -2050), 'every', 14),
+)
+
+# name, Plaid primary / detailed category, legacy category, lognormal median and sigma, relative frequency
+DISCRETIONARY = (
+    ('Whole Foods', 'FOOD_AND_DRINK', 'FOOD_AND_DRINK_GROCERIES', ['Shops', 'Supermarkets and Groceries'], 65, 0.5, 5),
+    ('Trader Joes', 'FOOD_AND_DRINK', 'FOOD_AND_DRINK_GROCERIES', ['Shops', 'Supermarkets and Groceries'], 45, 0.4, 4),
+    ('Starbucks', 'FOOD_AND_DRINK', 'FOOD_AND_DRINK_COFFEE', ['Food and Drink', 'Restaurants', 'Coffee Shop'], 6, 0.3, 8),
+    ('Chipotle', 'FOOD_AND_DRINK', 'FOOD_AND_DRINK_FAST_FOOD', ['Food and Drink', 'Restaurants'], 13, 0.3, 4),
+    ('Shell', 'TRANSPORTATION', 'TRANSPORTATION_GAS', ['Travel', 'Gas Stations'], 45, 0.3, 3),
+    ('Uber', 'TRANSPORTATION', 'TRANSPORTATION_TAXIS_AND_RIDE_SHARES', ['Travel', 'Taxi'], 18, 0.5, 3),
+    ('Amazon', 'GENERAL_MERCHANDISE', 'GENERAL_MERCHANDISE_ONLINE_MARKETPLACES', ['Shops', 'Digital Purchase'], 35, 0.9, 4),
+    ('Target', 'GENERAL_MERCHANDISE', 'GENERAL_MERCHANDISE_SUPERSTORES', ['Shops', 'Department Stores'], 55, 0.7, 2),
+    ('CVS Pharmacy', 'MEDICAL', 'MEDICAL_PHARMACIES_AND_SUPPLEMENTS', ['Shops', 'Pharmacies'], 20, 0.6, 1),
+)
+
+def _parse_settings(raw, parse):
+    settings = {}
+    for part in filter(None, (p.strip() for p in (raw or '').split(','))):
+        name, _, value = part.rpartition('=')
+        settings[name or 'default'] = parse(value)
+    return settings
+
+def _parse_distribution(spec):
+    kind, *args = spec.split(':')
+    if kind not in ('fixed', 'uniform', 'normal', 'lognormal'):
+        raise ValueError(f"Unknown latency distribution: {spec}")
+    return kind, [float(arg) for arg in args]
+
+def _sample_ms(rng, distribution):
+    kind, args = distribution
+    if kind == 'fixed':
+        return args[0]
+    if kind == 'uniform':
+        return rng.uniform(args[0], args[1])
+    if kind == 'normal':
+        return max(rng.gauss(args[0], args[1]), 0.0)
+    return args[0] * rng.lognormvariate(0.0, args[1])
+
+def _field(obj, name, default=None):
+    # Works for both plaid model objects and plain dicts
+    if obj is None:
+        return default
+    value = obj.get(name)
+    return default if value is None else value
+
+class SimulatedResponse(dict):
+    # Same access patterns as the plaid response models: response["x"] and response.to_dict()
+    def to_dict(self):
+        return dict(self)
+
+class PlaidSimulator:
+    def __init__(self, latency=None, error_rate=None, rate_limit=None, history_days=730, daily_transactions=3.0, seed=0):
+        self.latency = latency or {}
+        self.error_rate = error_rate or {}
+        self.rate_limit = rate_limit or {}
+        self.history_days = history_days
+        self.daily_transactions = daily_transactions
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._items = OrderedDict()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            latency=_parse_settings(os.getenv('PLAID_SIM_LATENCY', 'default=lognormal:150:0.4'), _parse_distribution),
+            error_rate=_parse_settings(os.getenv('PLAID_SIM_ERROR_RATE', ''), float),
+            rate_limit=_parse_settings(os.getenv('PLAID_SIM_RATE_LIMIT', ''), float),
+            history_days=int(os.getenv('PLAID_SIM_HISTORY_DAYS', '730')),
+            daily_transactions=float(os.getenv('PLAID_SIM_DAILY_TRANSACTIONS', '3')),
+            seed=int(os.getenv('PLAID_SIM_SEED', '0')),
+        )
+
+    # --- Upstream behaviour ---
+
+    def _setting(self, settings, endpoint):
+        return settings.get(endpoint, settings.get('default'))
+
+    def _take_token(self, endpoint):
+        # Token bucket per endpoint, refilled continuously at the configured rate
+        rate = self._setting(self.rate_limit, endpoint)
+        if not rate:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(endpoint, (rate, now))
+            tokens = min(rate, tokens + (now - updated) * rate)
+            allowed = tokens >= 1
+            self._buckets[endpoint] = (tokens - 1 if allowed else tokens, now)
+        return allowed
+
+    def _upstream(self, endpoint):
+        distribution = self._setting(self.latency, endpoint)
+        with self._lock:
+            delay = _sample_ms(self._rng, distribution) if distribution else 0.0
+            failing = self._rng.random() < (self._setting(self.error_rate, endpoint) or 0.0)
+        if delay:
+            time.sleep(delay / 1000)
+
+        if not self._take_token(endpoint):
+            raise self._error(429, 'RATE_LIMIT_EXCEEDED', 'RATE_LIMIT', f"rate limit exceeded for {endpoint}")
+        if failing:
+            raise self._error(500, 'API_ERROR', 'INTERNAL_SERVER_ERROR', "an unexpected error occurred (simulated)")
+
+    def _error(self, status, error_type, error_code, message):
+        # Shaped like the errors the plaid SDK raises for real API failures
+        error = ApiException(status=status, reason=error_code)
+        error.body = json.dumps({
+            'error_type': error_type,
+            'error_code': error_code,
+            'error_message': message,
+            'display_message': None,
+            'request_id': self._request_id(),
+        })
+        return error
+
+    def _request_id(self):
+        return uuid.uuid4().hex[:15]
+
+    # --- Synthetic items ---
+
+    def _item_seed(self, access_token):
+        return int.from_bytes(hashlib.sha256(f"{self.seed}:{access_token}".encode()).digest()[:8], 'little')
+
+    def _item(self, access_token):
+        if not access_token or not access_token.startswith(ACCESS_TOKEN_PREFIX):
+            raise self._error(400, 'INVALID_INPUT', 'INVALID_ACCESS_TOKEN', "provided access token is in an invalid format")
+
+        with self._lock:
+            if access_token in self._items:
+                self._items.move_to_end(access_token)
+                return self._items[access_token]
+
+        item = self._generate_item(access_token)
+        with self._lock:
+            self._items[access_token] = item
+            while len(self._items) > CACHED_ITEMS:
+                self._items.popitem(last=False)
+        return item
+
+    def _generate_item(self, access_token):
+        # Deterministic per access token, so repeated fetches see the same history
+        rng = random.Random(self._item_seed(access_token))
+        item_id = 'item-simulator-' + access_token[len(ACCESS_TOKEN_PREFIX):]
+        checking = f"acc-{rng.getrandbits(48):012x}"
+        credit = f"acc-{rng.getrandbits(48):012x}"
+
+        today = datetime.date.today()
+        start = today - datetime.timedelta(days=self.history_days)
+        weights = [entry[-1] for entry in DISCRETIONARY]
+        rows = []
+
+        def add(day, merchant, primary, detailed, legacy, amount, account_id):
+            rows.append({
+                'transaction_id': f"tx-{rng.getrandbits(64):016x}",
+                'account_id': account_id,
+                'amount': round(amount, 2),
+                'iso_currency_code': 'USD',
+                'date': day,
+                'authorized_date': day,
+                'name': merchant.upper(),
+                'merchant_name': merchant,
+                'category': legacy,
+                'personal_finance_category': {'primary': primary, 'detailed': detailed},
+                'payment_channel': 'online' if primary in ('ENTERTAINMENT', 'GENERAL_MERCHANDISE') else 'in store',
+                'pending': day >= today - datetime.timedelta(days=1),
+            })
+
+        for offset in range(self.history_days + 1):
+            day = start + datetime.timedelta(days=offset)
+            for merchant, primary, detailed, legacy, (low, high), schedule, when in RECURRING:
+                due = day.day == when if schedule == 'monthly' else offset % when == 0
+                if due:
+                    add(day, merchant, primary, detailed, legacy, rng.uniform(low, high), checking)
+
+            for _ in range(self._poisson(rng, self.daily_transactions)):
+                merchant, primary, detailed, legacy, median, sigma, _ = rng.choices(DISCRETIONARY, weights)[0]
+                amount = median * rng.lognormvariate(0.0, sigma)
+                # A handful of unusually large charges per year
+                if rng.random() < 0.002:
+                    amount *= rng.uniform(5, 15)
+                add(day, merchant, primary, detailed, legacy, amount, credit if rng.random() < 0.6 else checking)
+
+        rows.sort(key=lambda row: (row['date'], row['transaction_id']))
+        spent = sum(row['amount'] for row in rows if row['account_id'] == credit and row['date'] > today - datetime.timedelta(days=30))
+        accounts = [
+            {
+                'account_id': checking,
+                'name': 'Simulated Checking',
+                'official_name': 'Simulated Everyday Checking',
+                'mask': f"{rng.randrange(10000):04d}",
+                'type': 'depository',
+                'subtype': 'checking',
+                'balances': {'available': round(rng.uniform(800, 6000), 2), 'current': None, 'limit': None, 'iso_currency_code': 'USD'},
+            },
+            {
+                'account_id': credit,
+                'name': 'Simulated Credit Card',
+                'official_name': 'Simulated Rewards Visa',
+                'mask': f"{rng.randrange(10000):04d}",
+                'type': 'credit',
+                'subtype': 'credit card',
+                'balances': {'available': None, 'current': round(spent, 2), 'limit': 5000.0, 'iso_currency_code': 'USD'},
+            },
+        ]
+        accounts[0]['balances']['current'] = accounts[0]['balances']['available']
+        accounts[1]['balances']['available'] = round(5000.0 - spent, 2)
+
+        return {'item_id': item_id, 'accounts': accounts, 'transactions': rows, 'dates': [row['date'] for row in rows]}
+
+    @staticmethod
+    def _poisson(rng, mean):
+        # Knuth; means here are small
+        limit, count, product = pow(2.718281828459045, -mean), 0, rng.random()
+        while product > limit:
+            count += 1
+            product *= rng.random()
+        return count
+
+    def _item_payload(self, item):
+        return {'item_id': item['item_id'], 'institution_id': 'ins_simulator', 'products': ['auth', 'transactions'],
+                'billed_products': ['auth', 'transactions'], 'error': None}
+
+    # --- Endpoints ---
+
+    def link_token_create(self, request):
+        self._upstream('link_token_create')
+        return SimulatedResponse(
+            link_token=f"link-simulator-{uuid.uuid4()}",
+            expiration=datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=4),
+            request_id=self._request_id(),
+        )
+
+    def sandbox_public_token_create(self, request=None):
+        # Lets scripts complete a "Link" flow without the Link UI
+        self._upstream('sandbox_public_token_create')
+        return SimulatedResponse(public_token=f"{PUBLIC_TOKEN_PREFIX}{uuid.uuid4()}", request_id=self._request_id())
+
+    def item_public_token_exchange(self, request):
+        self._upstream('item_public_token_exchange')
+        public_token = _field(request, 'public_token', '')
+        if not public_token.startswith(PUBLIC_TOKEN_PREFIX):
+            raise self._error(400, 'INVALID_INPUT', 'INVALID_PUBLIC_TOKEN', "provided public token is in an invalid format")
+        token = hashlib.sha256(public_token.encode()).hexdigest()[:32]
+        return SimulatedResponse(access_token=f"{ACCESS_TOKEN_PREFIX}{token}", item_id=f"item-simulator-{token}",
+                                 request_id=self._request_id())
+
+    def accounts_get(self, request):
+        self._upstream('accounts_get')
+        item = self._item(_field(request, 'access_token'))
+        return SimulatedResponse(accounts=[dict(account) for account in item['accounts']], item=self._item_payload(item),
+                                 request_id=self._request_id())
+
+    def transactions_get(self, request):
+        self._upstream('transactions_get')
+        item = self._item(_field(request, 'access_token'))
+        options = _field(request, 'options')
+        count = min(_field(options, 'count', 100), 500)
+        offset = _field(options, 'offset', 0)
+        account_ids = _field(options, 'account_ids')
+
+        # History is sorted by date, so the requested window is two binary searches
+        dates = item['dates']
+        lo = bisect.bisect_left(dates, _field(request, 'start_date'))
+        hi = bisect.bisect_right(dates, _field(request, 'end_date'))
+        window = item['transactions'][lo:hi]
+        if account_ids:
+            window = [row for row in window if row['account_id'] in account_ids]
+
+        # Newest first, like Plaid
+        page = [dict(row) for row in reversed(window)][offset:offset + count]
+        accounts = [a for a in item['accounts'] if not account_ids or a['account_id'] in account_ids]
+        return SimulatedResponse(accounts=accounts, transactions=page, total_transactions=len(window),
+                                 item=self._item_payload(item), request_id=self._request_id())
+
+    def item_remove(self, request):
+        self._upstream('item_remove')
+        self._item(_field(request, 'access_token'))
+        with self._lock:
+            self._items.pop(_field(request, 'access_token'), None)
+        return SimulatedResponse(request_id=self._request_id())
+
+if __name__ == "__main__":
+    # Generate one large history to check fixture size and generation time
+    simulator = PlaidSimulator.from_env()
+    simulator.latency = {}
+    started = time.time()
+    item = simulator._item(f"{ACCESS_TOKEN_PREFIX}example")
+    print(f"✅ Generated {len(item['transactions'])} transactions over {simulator.history_days} days "
+          f"in {time.time() - started:.2f}s")
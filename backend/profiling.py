@@ -0,0 +1,241 @@
+import argparse
+import collections
+import datetime
+import json
+import os
+import random
+import sys
+import threading
+import time
+from flask import g, request
+from config import app, db
+from key_utils import validate_key
+
+# Opt-in: with this off no request hooks are installed, so requests pay nothing
+REQUEST_PROFILING = os.getenv('REQUEST_PROFILING', 'false').lower() == 'true'
+# Fraction of requests profiled at random, e.g. 0.01
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+# Profile every request and keep the ones slower than this (0 = off)
+PROFILE_SLOW_MS = float(os.getenv('PROFILE_SLOW_MS', '0'))
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'profiles'))
+# Oldest profiles are removed beyond this many files
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '1000'))
+# A request carrying a valid API key in this header is always profiled
+PROFILE_HEADER = 'X-Profile'
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+_labels = {}
+
+def _label(code):
+    # "function (file.py:line)", relative to the backend for our code and to site-packages for libraries
+    label = _labels.get(code)
+    if label is None:
+        filename = code.co_filename
+        if filename.startswith(BACKEND_DIR):
+            filename = os.path.relpath(filename, BACKEND_DIR)
+        else:
+            filename = '/'.join(filename.split(os.sep)[-2:])
+        label = _labels[code] = f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(';', ':')
+    return label
+
+def collapse(frame):
+    # Root-first "a;b;c", the folded format flamegraph.pl and speedscope read
+    labels = []
+    while frame is not None:
+        labels.append(_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+def _greenlet_workers():
+    monkey = sys.modules.get('gevent.monkey')
+    return bool(monkey and monkey.is_module_patched('threading'))
+
+def _current_task():
+    # Returns how to find this request's frame at sampling time
+    if _greenlet_workers():
+        # gevent workers run requests as greenlets on one OS thread; a suspended greenlet keeps its frame in gr_frame
+        import greenlet
+        current = greenlet.getcurrent()
+        return lambda frames: current.gr_frame
+    ident = threading.get_ident()
+    return lambda frames: frames.get(ident)
+
+class _Profile:
+    def __init__(self, locate):
+        self.locate = locate
+        self.stacks = collections.Counter()
+
+class StackSampler:
+    def __init__(self, interval_s):
+        self.interval_s = interval_s
+        self.active = set()
+        self.lock = threading.Lock()
+        self.busy = threading.Event()
+        self.thread = None
+
+    def start(self):
+        profile = _Profile(_current_task())
+        with self.lock:
+            self.active.add(profile)
+            self.busy.set()
+        self._ensure_started()
+        return profile
+
+    def stop(self, profile):
+        with self.lock:
+            self.active.discard(profile)
+            if not self.active:
+                self.busy.clear()
+        return profile.stacks
+
+    def _ensure_started(self):
+        if self.thread and self.thread.is_alive():
+            return
+        with self.lock:
+            if not (self.thread and self.thread.is_alive()):
+                self.thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        # Sleeps on `busy` while no request is being profiled
+        while True:
+            self.busy.wait()
+            time.sleep(self.interval_s)
+            frames = sys._current_frames()
+            with self.lock:
+                for profile in self.active:
+                    frame = profile.locate(frames)
+                    if frame is not None:
+                        profile.stacks[collapse(frame)] += 1
+
+sampler = StackSampler(PROFILE_INTERVAL_MS / 1000)
+
+def _reason():
+    key = request.headers.get(PROFILE_HEADER)
+    if key and validate_key(db.session, key):
+        return 'header'
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        return 'sampled'
+    if PROFILE_SLOW_MS:
+        return 'slow'
+    return None
+
+def _start_profile():
+    reason = _reason()
+    if reason:
+        g.profile = (reason, datetime.datetime.now(), time.perf_counter(), sampler.start())
+
+def _record_status(response):
+    if 'profile' in g:
+        g.profile_status = response.status_code
+    return response
+
+def _finish_profile(exc=None):
+    profile = g.pop('profile', None)
+    if profile is None:
+        return
+    reason, started_at, started, sample = profile
+    stacks = sampler.stop(sample)
+    duration_ms = (time.perf_counter() - started) * 1000
+    if reason == 'slow' and duration_ms < PROFILE_SLOW_MS:
+        return
+
+    meta = {
+        'method': request.method,
+        'path': request.path,
+        'route': request.url_rule.rule if request.url_rule else None,
+        'endpoint': request.endpoint,
+        'status': 500 if exc is not None else g.pop('profile_status', None),
+        'duration_ms': round(duration_ms, 1),
+        'started_at': started_at.isoformat(),
+        'reason': reason,
+        'samples': sum(stacks.values()),
+        'interval_ms': PROFILE_INTERVAL_MS,
+        'pid': os.getpid(),
+    }
+    try:
+        write_profile(meta, stacks)
+    except OSError:
+        app.logger.warning("Could not write request profile", exc_info=True)
+
+_written = 0
+
+def write_profile(meta, stacks):
+    # One file per request: a "# {json}" metadata line, then "stack count" lines
+    global _written
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = f"{datetime.datetime.now():%Y%m%d-%H%M%S-%f}-{os.getpid()}.folded"
+    with open(os.path.join(PROFILE_DIR, name), 'w') as f:
+        f.write('# ' + json.dumps(meta) + '\n')
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    _written += 1
+    if _written % 100 == 0:
+        prune_profiles()
+
+def prune_profiles(keep=PROFILE_MAX_FILES):
+    # File names start with their timestamp, so name order is age order
+    names = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith('.folded'))
+    for name in names[:max(len(names) - keep, 0)]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, name))
+        except FileNotFoundError:
+            pass
+
+def register_profiler(app):
+    if not REQUEST_PROFILING or 'request_profiler' in app.extensions:
+        return
+    app.extensions['request_profiler'] = sampler
+    app.before_request(_start_profile)
+    app.after_request(_record_status)
+    app.teardown_request(_finish_profile)
+
+def read_profile(path):
+    with open(path) as f:
+        meta = json.loads(f.readline()[2:])
+        stacks = collections.Counter()
+        for line in f:
+            stack, _, count = line.rstrip('\n').rpartition(' ')
+            stacks[stack] += int(count)
+    return meta, stacks
+
+def load_profiles(directory=PROFILE_DIR, route=None, min_ms=0, since=None):
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.folded'):
+            continue
+        meta, stacks = read_profile(os.path.join(directory, name))
+        if route and not (meta['path'].startswith(route) or (meta['route'] or '').startswith(route)):
+            continue
+        if meta['duration_ms'] < min_ms or (since and meta['started_at'] < since):
+            continue
+        yield name, meta, stacks
+
+def merge(profiles, by_route=True):
+    # Sums stacks across profiles; each route becomes its own root frame unless by_route is off
+    merged = collections.Counter()
+    for _, meta, stacks in profiles:
+        root = f"{meta['method']} {meta['route'] or meta['path']}"
+        for stack, count in stacks.items():
+            merged[f"{root};{stack}" if by_route else stack] += count
+    return merged
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge request profiles into folded stacks for flamegraph.pl or speedscope")
+    parser.add_argument("--dir", default=PROFILE_DIR)
+    parser.add_argument("--route", help="only requests whose path or route starts with this")
+    parser.add_argument("--min-ms", type=float, default=0, help="only requests at least this slow")
+    parser.add_argument("--since", help="only requests started at or after this ISO timestamp")
+    parser.add_argument("--no-route-root", action="store_true", help="don't split the graph by route")
+    parser.add_argument("--list", action="store_true", help="list the matching profiles instead")
+    args = parser.parse_args()
+
+    profiles = list(load_profiles(args.dir, args.route, args.min_ms, args.since))
+    if args.list:
+        for name, meta, _ in profiles:
+            print(f"{name}  {meta['duration_ms']:>8.1f} ms  {meta['status']}  {meta['method']} {meta['path']}  ({meta['reason']}, {meta['samples']} samples)")
+    else:
+        merged = merge(profiles, by_route=not args.no_route_root)
+        for stack, count in merged.most_common():
+            print(f"{stack} {count}")
+    print(f"✅ {len(profiles)} profile(s), {sum(meta['samples'] for _, meta, _ in profiles)} sample(s).", file=sys.stderr)
@@ -0,0 +1,301 @@
+import datetime
+import functools
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import plaid
+import sqlalchemy as sa
+from plaid.model.item_remove_request import ItemRemoveRequest
+from config import app, db
+from entity_cache import entity_cache
+from firestore_mirror import mirror
+from link_token_pool import refiller
+from models import (
+    AccessToken, BalanceNode, BalanceWarning, Budget, Expenses, Goal, Income, LinkedAccount, LinkTokenPool,
+    RecurringStream, Savings, SearchDocument, SpendingAnomaly, SpendingObservation, SpendingStat, Transaction,
+    TransactionCategory, User, UserPurge, XpEvent, XpTotals,
+)
+from partitioning import PARTITIONED_MODELS, archive_table, sealed_shards
+from plaid_calls import call_plaid
+from plaid_client_config import client
+from snapshots import snapshot_path
+
+# Rows deleted per transaction; small chunks keep row and page locks short on large tables
+PURGE_CHUNK_SIZE = int(os.getenv('PURGE_CHUNK_SIZE', '1000'))
+# Pause between chunks so other writers get the tables in between
+PURGE_CHUNK_PAUSE_MS = float(os.getenv('PURGE_CHUNK_PAUSE_MS', '10'))
+# A running job whose worker has not reported progress for this long is presumed dead and taken over
+PURGE_LEASE_S = float(os.getenv('PURGE_LEASE_S', '300'))
+
+# (model, column holding the user id), children before the rows they reference and Users last
+PURGE_ORDER = (
+    (Savings, 'user_id'),
+    (Goal, 'user_id'),
+    (Transaction, 'user_id'),
+    (Income, 'user_id'),
+    (Expenses, 'user_id'),
+    (Budget, 'user_id'),
+    (LinkedAccount, 'associated_user'),
+    (RecurringStream, 'user_id'),
+    (TransactionCategory, 'user_id'),
+    (SearchDocument, 'user_id'),
+    (SpendingAnomaly, 'user_id'),
+    (SpendingObservation, 'user_id'),
+    (SpendingStat, 'user_id'),
+    (BalanceNode, 'user_id'),
+    (BalanceWarning, 'user_id'),
+    (LinkTokenPool, 'user_id'),
+    (XpEvent, 'user_id'),
+    (XpTotals, 'user_id'),
+    (User, 'id'),
+)
+# Models whose per-id GET routes go through the entity cache
+CACHED_MODELS = {Savings, Goal, Income, Expenses, Budget, User}
+# Models mirrored to Firestore, by collection
+MIRRORED_MODELS = {Goal: 'goals', Budget: 'budgets'}
+
+jobs = UserPurge.__table__
+
+# Plaid errors meaning the item is already gone
+REVOKED_ERRORS = {'ITEM_NOT_FOUND', 'INVALID_ACCESS_TOKEN'}
+
+def _already_revoked(error):
+    try:
+        return json.loads(error.body).get('error_code') in REVOKED_ERRORS
+    except (TypeError, ValueError, AttributeError):
+        return False
+
+def revoke_plaid_items(user_id):
+    # item_remove each linked item; a token row is only deleted once Plaid has let go of the item
+    revoked = 0
+    for token_id, access_token in db.session.execute(
+        sa.select(AccessToken.id, AccessToken.access_token).where(AccessToken.user_id == user_id)
+    ).all():
+        try:
+            call_plaid(client.item_remove, ItemRemoveRequest(access_token=access_token))
+        except plaid.ApiException as e:
+            if not _already_revoked(e):
+                raise
+        db.session.execute(sa.delete(AccessToken).where(AccessToken.id == token_id))
+        _count(user_id, 1)
+        db.session.commit()
+        revoked += 1
+    return revoked
+
+def _count(user_id, deleted):
+    db.session.execute(jobs.update().where(jobs.c.user_id == user_id).values(
+        rows_deleted=jobs.c.rows_deleted + deleted, heartbeat_at=datetime.datetime.now()
+    ))
+
+def _delete_in_chunks(table, column, user_id, on_chunk=None):
+    # Select a chunk of ids, delete exactly those, commit; repeat until the user has no rows left
+    if 'id' not in table.c or column.name == 'id':
+        deleted = db.session.execute(table.delete().where(column == user_id)).rowcount
+        _count(user_id, deleted)
+        db.session.commit()
+        return deleted
+
+    deleted = 0
+    while True:
+        ids = db.session.execute(sa.select(table.c.id).where(column == user_id).limit(PURGE_CHUNK_SIZE)).scalars().all()
+        if not ids:
+            return deleted
+        if on_chunk:
+            on_chunk(ids)
+        db.session.execute(table.delete().where(table.c.id.in_(ids)))
+        _count(user_id, len(ids))
+        db.session.commit()
+        deleted += len(ids)
+        if on_chunk:
+            on_chunk.committed(ids)
+        time.sleep(PURGE_CHUNK_PAUSE_MS / 1000)
+
+class _AfterChunk:
+    # Per-chunk side effects: before the delete (same transaction) and after it commits
+    def __init__(self, model, user_id):
+        self.model = model
+        self.user_id = user_id
+
+    def __call__(self, ids):
+        self.unlinked = []
+        if self.model is Goal:
+            # Another user's savings can point at this user's goals; unlink them instead of failing the delete
+            self.unlinked = db.session.execute(sa.select(Savings.id).where(Savings.goal_id.in_(ids))).scalars().all()
+            if self.unlinked:
+                db.session.execute(sa.update(Savings).where(Savings.id.in_(self.unlinked)).values(goal_id=None).execution_options(synchronize_session=False))
+
+    def committed(self, ids):
+        for id in self.unlinked:
+            entity_cache.invalidate(Savings, id)
+        if self.model in CACHED_MODELS:
+            for id in ids:
+                entity_cache.invalidate(self.model, id)
+        if self.model in MIRRORED_MODELS:
+            mirror.enqueue({(MIRRORED_MODELS[self.model], id): self.user_id for id in ids})
+
+def purge_model(model, column_name, user_id):
+    deleted = _delete_in_chunks(model.__table__, model.__table__.c[column_name], user_id, _AfterChunk(model, user_id))
+    if model is User:
+        entity_cache.invalidate(User, user_id)
+
+    # Partitioned tables also keep rows in sealed SQLite shards and in compressed archives
+    if model.__tablename__ in PARTITIONED_MODELS:
+        for shard in sealed_shards(db.engine, model.__tablename__):
+            deleted += _delete_in_chunks(shard, shard.c.user_id, user_id)
+        archive = archive_table(model.__tablename__)
+        if sa.inspect(db.engine).has_table(archive.name):
+            deleted += _delete_in_chunks(archive, archive.c.user_id, user_id)
+    return deleted
+
+def purge_local_state(user_id):
+    # Everything outside the database: the analytics snapshot, the link token refiller and Firestore
+    try:
+        os.remove(snapshot_path(user_id))
+    except FileNotFoundError:
+        pass
+    with refiller.lock:
+        refiller.demand.pop(user_id, None)
+    mirror.enqueue({('purged', user_id): user_id})
+
+# Run in order; a resumed job restarts at the step it was on (every step is idempotent)
+STEPS = (
+    (('plaid_items', revoke_plaid_items),)
+    + tuple((model.__tablename__, functools.partial(purge_model, model, column)) for model, column in PURGE_ORDER)
+    + (('local_state', purge_local_state),)
+)
+
+def record_job(user_id):
+    # A failed or finished job is reopened and resumes from its step
+    job = db.session.get(UserPurge, user_id)
+    if job is None:
+        try:
+            db.session.add(UserPurge(user_id=user_id, status='pending', rows_deleted=0))
+            db.session.commit()
+        except sa.exc.IntegrityError:
+            # Recorded by a concurrent request
+            db.session.rollback()
+        return db.session.get(UserPurge, user_id)
+    if job.status in ('done', 'failed'):
+        job.status, job.error, job.finished_at = 'pending', None, None
+        db.session.commit()
+    return job
+
+def claim_job(user_id):
+    # Only one worker (thread or process) runs a job: whoever flips it to running first
+    stale = datetime.datetime.now() - datetime.timedelta(seconds=PURGE_LEASE_S)
+    claimed = db.session.execute(
+        jobs.update()
+        .where(jobs.c.user_id == user_id, sa.or_(
+            jobs.c.status.in_(('pending', 'failed')),
+            sa.and_(jobs.c.status == 'running', sa.or_(jobs.c.heartbeat_at.is_(None), jobs.c.heartbeat_at < stale)),
+        ))
+        .values(status='running', error=None, heartbeat_at=datetime.datetime.now())
+    ).rowcount
+    db.session.commit()
+    return claimed == 1
+
+def run_purge(user_id):
+    job = db.session.get(UserPurge, user_id)
+    if job is None or job.status == 'done':
+        return job
+    if not claim_job(user_id):
+        db.session.refresh(job)
+        return job
+    db.session.refresh(job)
+    names = [name for name, _ in STEPS]
+    start = names.index(job.step) if job.step in names else 0
+
+    try:
+        for name, step in STEPS[start:]:
+            db.session.execute(jobs.update().where(jobs.c.user_id == user_id).values(step=name, heartbeat_at=datetime.datetime.now()))
+            db.session.commit()
+            step(user_id)
+    except Exception as e:
+        db.session.rollback()
+        app.logger.error(f"User purge stopped at step {name}", exc_info=True)
+        db.session.execute(jobs.update().where(jobs.c.user_id == user_id).values(status='failed', error=str(e)[:500]))
+        db.session.commit()
+        return db.session.get(UserPurge, user_id)
+
+    db.session.execute(jobs.update().where(jobs.c.user_id == user_id).values(
+        status='done', step=None, error=None, finished_at=datetime.datetime.now()
+    ))
+    db.session.commit()
+    return db.session.get(UserPurge, user_id)
+
+class PurgeWorker:
+    def __init__(self, app):
+        self.app = app
+        self.pending = queue.Queue()
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, user_id):
+        # Record the job and hand it to the background thread
+        job = record_job(user_id)
+        self.pending.put(user_id)
+        self._ensure_started()
+        return job
+
+    def start(self):
+        # Called once per worker process (gunicorn.conf.py), so jobs interrupted by a restart resume on their own
+        self._ensure_started()
+
+    def _ensure_started(self):
+        if self.thread and self.thread.is_alive():
+            return
+        with self.lock:
+            if not (self.thread and self.thread.is_alive()):
+                self.thread = threading.Thread(target=self._run, name="user-purge", daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        with self.app.app_context():
+            # Unfinished jobs first; claim_job keeps every worker process from running the same one
+            try:
+                resume_unfinished()
+            except Exception:
+                db.session.rollback()
+                self.app.logger.error("Resuming unfinished user purges failed", exc_info=True)
+            finally:
+                db.session.remove()
+            while True:
+                user_id = self.pending.get()
+                try:
+                    run_purge(user_id)
+                except Exception:
+                    db.session.rollback()
+                    self.app.logger.error("User purge failed", exc_info=True)
+                finally:
+                    db.session.remove()
+
+purger = PurgeWorker(app)
+
+def purge_status(job):
+    return {
+        'user_id': job.user_id,
+        'status': job.status,
+        'step': job.step,
+        'rows_deleted': job.rows_deleted,
+        'error': job.error,
+        'requested_at': job.requested_at.isoformat(),
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+def resume_unfinished():
+    # Jobs interrupted by a restart (or failed) are picked up where they stopped
+    user_ids = db.session.execute(sa.select(jobs.c.user_id).where(jobs.c.status != 'done')).scalars().all()
+    return [run_purge(user_id) for user_id in user_ids]
+
+if __name__ == "__main__":
+    with app.app_context():
+        if len(sys.argv) > 1:
+            record_job(sys.argv[1])
+            results = [run_purge(sys.argv[1])]
+        else:
+            results = resume_unfinished()
+        for job in results:
+            print(f"✅ Purge of {job.user_id}: {job.status}, {job.rows_deleted} row(s) deleted.")
@@ -0,0 +1,130 @@
+import datetime
+import json
+import re
+import numpy as np
+from config import db
+from models import RecurringStream
+
+# Recent occurrences kept per merchant; detection only ever looks at this window
+MAX_HISTORY = 36
+MIN_OCCURRENCES = 3
+# Share of gaps that must match the period, and the max std/mean of amounts for a subscription
+MIN_GAP_MATCH = 0.75
+MAX_SUBSCRIPTION_VARIATION = 0.1
+
+# name, period in days, tolerance in days
+FREQUENCIES = (
+    ('weekly', 7, 1),
+    ('biweekly', 14, 2),
+    ('monthly', 30.44, 4),
+    ('annual', 365.25, 10),
+)
+
+NOISE_WORDS = {'pos', 'debit', 'purchase', 'payment', 'recurring', 'card', 'ach', 'www', 'com', 'inc', 'llc'}
+
+def normalize_merchant(transaction):
+    # Collapse store numbers, punctuation and processor noise so "NETFLIX.COM 8443" == "Netflix"
+    raw = transaction.get('merchant_name') or transaction.get('name') or ''
+    words = re.sub(r'[^a-z ]+', ' ', re.sub(r'#?\d+', ' ', raw.lower())).split()
+    words = [word for word in words if word not in NOISE_WORDS and len(word) > 1]
+    return ' '.join(words)[:200]
+
+def _to_date(value):
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value)[:10])
+
+def detect_streams(owner, days, amounts, n_merchants):
+    # Vectorized over every merchant at once: owner[i] is the merchant index of occurrence i
+    order = np.lexsort((days, owner))
+    owner, days, amounts = owner[order], days[order], amounts[order]
+
+    counts = np.bincount(owner, minlength=n_merchants)
+    # Same-day repeats at one merchant are split charges, not a new period
+    same_merchant = (owner[1:] == owner[:-1]) & (np.diff(days) > 0)
+    gaps = np.diff(days)[same_merchant].astype(float)
+    gap_owner = owner[1:][same_merchant]
+    gap_counts = np.bincount(gap_owner, minlength=n_merchants)
+    mean_gap = np.bincount(gap_owner, weights=gaps, minlength=n_merchants) / np.maximum(gap_counts, 1)
+
+    # Fraction of each merchant's gaps that fall within tolerance of each candidate period
+    match = np.stack([
+        np.bincount(gap_owner, weights=(np.abs(gaps - period) <= tolerance).astype(float), minlength=n_merchants)
+        for _, period, tolerance in FREQUENCIES
+    ], axis=1) / np.maximum(gap_counts, 1)[:, None]
+    best = match.argmax(axis=1)
+    best_match = match[np.arange(n_merchants), best]
+
+    mean_amount = np.bincount(owner, weights=amounts, minlength=n_merchants) / np.maximum(counts, 1)
+    mean_square = np.bincount(owner, weights=amounts ** 2, minlength=n_merchants) / np.maximum(counts, 1)
+    std_amount = np.sqrt(np.maximum(mean_square - mean_amount ** 2, 0))
+    variation = np.where(mean_amount != 0, std_amount / np.abs(np.where(mean_amount == 0, 1, mean_amount)), 0)
+
+    last_index = np.flatnonzero(np.r_[owner[1:] != owner[:-1], True])
+    last_day = np.zeros(n_merchants, dtype=np.int64)
+    last_day[owner[last_index]] = days[last_index]
+
+    recurring = (counts >= MIN_OCCURRENCES) & (best_match >= MIN_GAP_MATCH)
+    return {
+        'recurring': recurring,
+        'frequency': best,
+        'mean_gap': mean_gap,
+        'mean_amount': mean_amount,
+        'variation': variation,
+        'last_day': last_day,
+        'counts': counts,
+    }
+
+def update_recurring_streams(user_id, transactions):
+    # Fold newly fetched Plaid transactions into the per-merchant streams they touch
+    incoming = {}
+    for transaction in transactions:
+        if transaction.get('pending'):
+            continue
+        merchant = normalize_merchant(transaction)
+        if merchant:
+            day = _to_date(transaction['date']).toordinal()
+            incoming.setdefault(merchant, set()).add((day, round(float(transaction['amount']), 2)))
+
+    if not incoming:
+        return []
+
+    existing = {
+        stream.merchant: stream
+        for stream in RecurringStream.query.filter(RecurringStream.user_id == user_id, RecurringStream.merchant.in_(list(incoming)))
+    }
+
+    merchants = list(incoming)
+    histories = []
+    for merchant in merchants:
+        seen = {tuple(pair) for pair in json.loads(existing[merchant].history)} if merchant in existing else set()
+        histories.append(sorted(seen | incoming[merchant])[-MAX_HISTORY:])
+
+    owner = np.repeat(np.arange(len(merchants)), [len(history) for history in histories])
+    pairs = np.array([pair for history in histories for pair in history], dtype=float)
+    result = detect_streams(owner, pairs[:, 0].astype(np.int64), pairs[:, 1], len(merchants))
+
+    today = datetime.date.today().toordinal()
+    streams = []
+    for i, merchant in enumerate(merchants):
+        stream = existing.get(merchant) or RecurringStream(user_id=user_id, merchant=merchant)
+        is_recurring = bool(result['recurring'][i])
+        name, period, tolerance = FREQUENCIES[result['frequency'][i]]
+        last_day = int(result['last_day'][i])
+
+        stream.frequency = name if is_recurring else None
+        stream.average_amount = round(float(result['mean_amount'][i]), 2)
+        stream.amount_variation = round(float(result['variation'][i]), 4)
+        stream.occurrences = int(result['counts'][i])
+        stream.last_date = datetime.date.fromordinal(last_day)
+        stream.next_date = datetime.date.fromordinal(last_day + round(result['mean_gap'][i])) if is_recurring else None
+        # Plaid reports outflows as positive amounts
+        stream.is_subscription = is_recurring and stream.average_amount > 0 and stream.amount_variation <= MAX_SUBSCRIPTION_VARIATION
+        stream.is_active = is_recurring and today <= last_day + period + tolerance * 2
+        stream.history = json.dumps(histories[i])
+
+        db.session.add(stream)
+        streams.append(stream)
+
+    db.session.commit()
+    return streams
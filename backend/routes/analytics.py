@@ -0,0 +1,24 @@
+from flask import request, jsonify
+from datetime import datetime
+from key_utils import validate_key
+from snapshots import snapshot_analytics
+from config import db
+
+def setup_analytics_routes(app):
+    # Dashboard aggregations from the user's columnar snapshot, no Plaid round trip
+    @app.route('/api/analytics/<string:user_id>', methods=['GET'])
+    def get_analytics(user_id):
+        key = request.headers.get("key")
+        if not key or not validate_key(db.session, key):
+            return jsonify({"error": "Unauthorized access"}), 403
+
+        try:
+            start_date = datetime.strptime(request.args["start_date"], "%Y-%m-%d").date() if request.args.get("start_date") else None
+            end_date = datetime.strptime(request.args["end_date"], "%Y-%m-%d").date() if request.args.get("end_date") else None
+        except ValueError:
+            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+
+        analytics = snapshot_analytics(user_id, start_date, end_date)
+        if not analytics:
+            return jsonify({"error": "No synced transactions for this user yet"}), 404
+        return jsonify(analytics), 200
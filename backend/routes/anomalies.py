@@ -0,0 +1,36 @@
+from flask import request, jsonify
+from key_utils import validate_key
+from models import SpendingAnomaly
+from schemas import spending_anomalies_schema
+from anomalies import register_anomaly_listener
+from config import db
+
+def setup_anomaly_routes(app):
+    # Scores manually entered expenses as they are created
+    register_anomaly_listener()
+
+    @app.route('/api/anomalies/<string:user_id>', methods=['GET'])
+    def get_anomalies(user_id):
+        key = request.headers.get("key")
+        if not key or not validate_key(db.session, key):
+            return jsonify({"error": "Unauthorized access"}), 403
+
+        query = SpendingAnomaly.query.filter(SpendingAnomaly.user_id == user_id)
+        if request.args.get("include_dismissed") != "true":
+            query = query.filter(SpendingAnomaly.dismissed.is_(False))
+
+        limit = min(request.args.get("limit", 50, type=int), 200)
+        flagged = query.order_by(SpendingAnomaly.date.desc(), SpendingAnomaly.id.desc()).limit(limit).all()
+        return jsonify({"anomalies": spending_anomalies_schema.dump(flagged)}), 200
+
+    @app.route('/api/anomalies/<int:id>/dismiss', methods=['POST'])
+    def dismiss_anomaly(id):
+        key = request.headers.get("key")
+        if not key or not validate_key(db.session, key):
+            return jsonify({"error": "Unauthorized access"}), 403
+
+        anomaly = SpendingAnomaly.query.get_or_404(id)
+        anomaly.dismissed = True
+        db.session.commit()
+
+        return jsonify({"message": "Anomaly dismissed"}), 200
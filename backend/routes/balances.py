@@ -0,0 +1,91 @@
+import datetime
+from flask import request, jsonify
+from key_utils import validate_key
+from balance_index import INDEXED_MODELS, range_totals, register_balance_listener, running_balance
+from config import db
+
+MAX_POINTS = 1000
+STEPS = ('day', 'week', 'month')
+
+def _points(start_date, end_date, step):
+    points, day = [], start_date
+    while day <= end_date and len(points) < MAX_POINTS:
+        points.append(day)
+        if step == 'day':
+            day += datetime.timedelta(days=1)
+        elif step == 'week':
+            day += datetime.timedelta(days=7)
+        else:
+            day = datetime.date(day.year + day.month // 12, day.month % 12 + 1, 1)
+    return points
+
+def setup_balance_routes(app):
+    # Keeps the prefix-sum index in step with transaction / expense / income writes
+    register_balance_listener()
+
+    def parse_dates():
+        start_date = datetime.datetime.strptime(request.args["start_date"], "%Y-%m-%d").date() if request.args.get("start_date") else None
+        end_date = datetime.datetime.strptime(request.args["end_date"], "%Y-%m-%d").date() if request.args.get("end_date") else None
+        return start_date, end_date
+
+    @app.route('/api/balances/<string:user_id>/totals', methods=['GET'])
+    def get_balance_totals(user_id):
+        key = request.headers.get("key")
+        if not key or not validate_key(db.session, key):
+            return jsonify({"error": "Unauthorized access"}), 403
+
+        kind = request.args.get("kind")
+        if kind and kind not in INDEXED_MODELS:
+            return jsonify({"error": f"kind must be one of: {', '.join(INDEXED_MODELS)}"}), 400
+
+        try:
+            start_date, end_date = parse_dates()
+        except ValueError:
+            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+
+        if start_date and end_date and start_date > end_date:
+            return jsonify({"error": "start_date must not be after end_date"}), 400
+
+        totals = range_totals(user_id, start_date, end_date, kinds=[kind] if kind else None,
+                              category=request.args.get("category"))
+
+        by_kind = {name: 0.0 for name in INDEXED_MODELS}
+        for (row_kind, _), (amount, _) in totals.items():
+            by_kind[row_kind] += amount
+
+        return jsonify({
+            "income": round(by_kind['income'], 2),
+            "expenses": round(by_kind['expense'], 2),
+            "transactions": round(by_kind['transaction'], 2),
+            "net": round(by_kind['income'] - by_kind['expense'], 2),
+            "by_category": [
+                {"kind": row_kind, "category": category, "amount": amount, "count": count}
+                for (row_kind, category), (amount, count) in sorted(totals.items())
+            ],
+        }), 200
+
+    @app.route('/api/balances/<string:user_id>/running', methods=['GET'])
+    def get_running_balance(user_id):
+        key = request.headers.get("key")
+        if not key or not validate_key(db.session, key):
+            return jsonify({"error": "Unauthorized access"}), 403
+
+        step = request.args.get("step", "day")
+        if step not in STEPS:
+            return jsonify({"error": f"step must be one of: {', '.join(STEPS)}"}), 400
+
+        try:
+            start_date, end_date = parse_dates()
+        except ValueError:
+            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+
+        end_date = end_date or datetime.date.today()
+        start_date = start_date or end_date - datetime.timedelta(days=30)
+        if start_date > end_date:
+            return jsonify({"error": "start_date must not be after end_date"}), 400
+
+        try:
+            series = running_balance(user_id, _points(start_date, end_date, step))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"series": series}), 200
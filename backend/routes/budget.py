@@ -1,10 +1,18 @@
-from config import db
+from group_commit import commit_add, commit_update, commit_delete
 from flask import jsonify, request
 from marshmallow import ValidationError
 from models import Budget
+from xp_ledger import register_xp_listener
+from firestore_mirror import register_firestore_listener
 from schemas import budget_schema
+from entity_cache import entity_cache
 
 def setup_budget_routes(app):
+    # Appends XP ledger events for every write below
+    register_xp_listener()
+    # Mirrors the changes to Firestore when FIRESTORE_MIRROR is on
+    register_firestore_listener()
+
     # Create budget
     @app.route('/budget', methods=['POST'])
     def create_budget():
@@ -13,19 +21,18 @@ def setup_budget_routes(app):
         except ValidationError as e:
             return jsonify(e.messages), 400
         
-        new_budget = Budget(category=budget_data['category'], target_amount=budget_data['target_amount'], month=budget_data['month'], year=budget_data['year'])
+        new_budget = Budget(category=budget_data['category'], target_amount=budget_data['target_amount'], month=budget_data['month'], year=budget_data['year'], user_id=budget_data.get('user_id'))
 
-        db.session.add(new_budget)
-        db.session.commit()
+        commit_add(new_budget)
 
         return jsonify({"message": "Budget created!"}), 201
 
     # Read budget
     @app.route('/budgets/<int:id>', methods=['GET'])
     def read_budget(id):
-        budget = Budget.query.filter(Budget.id == id).first_or_404()
+        budget = entity_cache.fetch(Budget, id, lambda: budget_schema.dump(Budget.query.filter(Budget.id == id).first_or_404()))
 
-        return budget_schema.jsonify(budget)
+        return jsonify(budget)
 
     # Update budget
     @app.route('/budgets/<int:id>', methods=['PUT'])
@@ -42,7 +49,8 @@ def setup_budget_routes(app):
         budget.month = budget_data['month']
         budget.year = budget_data['year']
 
-        db.session.commit()
+        commit_update(budget)
+        entity_cache.invalidate(Budget, id)
 
         return jsonify({'message': 'Budget updated successfully!'}), 200
 
@@ -51,7 +59,7 @@ def setup_budget_routes(app):
     def delete_budget(id):
         budget = Budget.query.get_or_404(id)
 
-        db.session.delete(budget)
-        db.session.commit()
+        commit_delete(budget)
+        entity_cache.invalidate(Budget, id)
 
         return jsonify({'message': 'Budget removed successfully!'})
\ No newline at end of file
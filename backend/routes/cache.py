@@ -0,0 +1,14 @@
+from flask import request, jsonify
+from key_utils import validate_key
+from entity_cache import entity_cache
+from config import db
+
+def setup_cache_routes(app):
+    # Hit / miss / invalidation counts for the entity cache, for this worker process
+    @app.route('/api/cache/stats', methods=['GET'])
+    def get_cache_stats():
+        key = request.headers.get("key")
+        if not key or not validate_key(db.session, key):
+            return jsonify({"error": "Unauthorized access"}), 403
+
+        return jsonify(entity_cache.summary()), 200
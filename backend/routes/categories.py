@@ -0,0 +1,79 @@
+from flask import request, jsonify
+from marshmallow import ValidationError
+from key_utils import validate_key
+from models import CategoryRule
+from schemas import category_rule_schema, category_rules_schema
+from categorization import CATEGORIES, clear_override, recategorizer, set_override
+from config import db
+
+def setup_category_routes(app):
+    def authorized():
+        key = request.headers.get("key")
+        return key and validate_key(db.session, key)
+
+    @app.route('/api/category_rules', methods=['GET'])
+    def list_category_rules():
+        if not authorized():
+            return jsonify({"error": "Unauthorized access"}), 403
+
+        rules = CategoryRule.query.order_by(CategoryRule.priority.desc(), CategoryRule.id).all()
+        return jsonify(category_rules_schema.dump(rules)), 200
+
+    @app.route('/api/category_rules', methods=['POST'])
+    def create_category_rule():
+        if not authorized():
+            return jsonify({"error": "Unauthorized access"}), 403
+
+        try:
+            rule_data = category_rule_schema.load(request.json)
+        except ValidationError as e:
+            app.logger.warning(f"Category rule validation failed: {e.messages}")
+            return jsonify({"error": "Invalid category rule data"}), 400
+
+        rule = CategoryRule(**rule_data)
+        db.session.add(rule)
+        db.session.commit()
+
+        # Stored results are rescanned in the background
+        recategorizer.request()
+        return jsonify({"message": "Category rule created!", "id": rule.id}), 202
+
+    @app.route('/api/category_rules/<int:id>', methods=['DELETE'])
+    def delete_category_rule(id):
+        if not authorized():
+            return jsonify({"error": "Unauthorized access"}), 403
+
+        rule = CategoryRule.query.get_or_404(id)
+        db.session.delete(rule)
+        db.session.commit()
+
+        recategorizer.request()
+        return jsonify({"message": "Category rule removed successfully!"}), 202
+
+    # User override for a single transaction; survives rule changes until cleared
+    @app.route('/api/transactions/<string:transaction_id>/category', methods=['PUT'])
+    def override_transaction_category(transaction_id):
+        if not authorized():
+            return jsonify({"error": "Unauthorized access"}), 403
+
+        data = request.get_json() or {}
+        user_id = data.get("user_id")
+        category = data.get("category")
+        if not user_id or category not in CATEGORIES:
+            return jsonify({"error": f"user_id and a category of {', '.join(CATEGORIES)} are required"}), 400
+
+        row = set_override(user_id, transaction_id, category)
+        if not row:
+            return jsonify({"error": "Transaction not found"}), 404
+        return jsonify({"transaction_id": transaction_id, "category": row.category, "source": row.source}), 200
+
+    @app.route('/api/transactions/<string:transaction_id>/category', methods=['DELETE'])
+    def clear_transaction_category(transaction_id):
+        if not authorized():
+            return jsonify({"error": "Unauthorized access"}), 403
+
+        user_id = request.args.get("user_id")
+        row = clear_override(user_id, transaction_id)
+        if not row:
+            return jsonify({"error": "Transaction not found"}), 404
+        return jsonify({"transaction_id": transaction_id, "category": row.category, "source": row.source}), 200
@@ -0,0 +1,45 @@
+from flask import jsonify, request
+from marshmallow import ValidationError
+from counters import DeltaConflict, apply_deltas
+from models import Goal, TaxInfo
+from schemas import delta_schema, delta_batch_schema
+
+def setup_counter_routes(app):
+    # In-place increments, e.g. PATCH /goals/3/current_amount {"delta": 25.0, "expected_version": 4}
+    _counter_routes(app, Goal, 'goals', 'current_amount')
+    _counter_routes(app, TaxInfo, 'tax_info', 'total_saved')
+
+def _counter_routes(app, model, prefix, column):
+    @app.route(f'/{prefix}/<int:id>/{column}', methods=['PATCH'], endpoint=f'increment_{prefix}_{column}')
+    def increment(id):
+        try:
+            update = delta_schema.load(request.json or {})
+        except ValidationError as e:
+            app.logger.warning(f"Delta validation failed: {e.messages}")
+            return jsonify({"error": "Invalid delta"}), 400
+
+        try:
+            result = apply_deltas(model, column, [{**update, 'id': id}])
+        except DeltaConflict as e:
+            conflict = e.conflicts[0]
+            if conflict['reason'] == 'not_found':
+                return jsonify({"error": "Not found"}), 404
+            return jsonify({"error": "Version mismatch", **conflict}), 409
+
+        return jsonify(result[id]), 200
+
+    # Many increments in one transaction: {"updates": [{"id": 3, "delta": 25.0}, ...]}; all apply or none do
+    @app.route(f'/{prefix}/{column}', methods=['PATCH'], endpoint=f'increment_{prefix}_{column}_batch')
+    def increment_batch():
+        try:
+            updates = delta_batch_schema.load(request.json or {})['updates']
+        except ValidationError as e:
+            app.logger.warning(f"Delta batch validation failed: {e.messages}")
+            return jsonify({"error": "Invalid delta batch"}), 400
+
+        try:
+            results = apply_deltas(model, column, updates)
+        except DeltaConflict as e:
+            return jsonify({"error": "Some updates could not be applied", "conflicts": e.conflicts}), 409
+
+        return jsonify({"results": list(results.values())}), 200
@@ -1,9 +1,7 @@
 from flask import request, jsonify
-from plaid.model.link_token_create_request import LinkTokenCreateRequest
-from plaid.model.link_token_create_request_user import LinkTokenCreateRequestUser
-from plaid.model.country_code import CountryCode
-from plaid.model.products import Products
 from plaid_client_config import client
+from plaid_calls import call_plaid, PlaidBusy
+from link_token_pool import LINK_TOKEN_POOL, link_token_request, take_link_token
 from key_utils import validate_key
 from config import db
 
@@ -23,21 +21,28 @@ def setup_create_link_token(app, session):
         if not user_id:
             return jsonify({"error": "Missing user_id"}), 400
 
-        request_data = LinkTokenCreateRequest(
-            client_name="PennyPilot",
-            country_codes=[CountryCode('US')],
-            language="en",
-            products=[Products("auth"), Products("transactions")],
-            user=LinkTokenCreateRequestUser(client_user_id=user_id),
-        )
+        if LINK_TOKEN_POOL:
+            try:
+                pooled = take_link_token(user_id)
+                if pooled:
+                    app.logger.info("Link token handed out from the pool")
+                    return jsonify(pooled)
+            except Exception:
+                db.session.rollback()
+                app.logger.warning("Link token pool unavailable, creating synchronously", exc_info=True)
+
+        request_data = link_token_request(user_id)
 
         try:
-            response = client.link_token_create(request_data)
+            response = call_plaid(client.link_token_create, request_data)
             link_token_data = response.to_dict()
 
             app.logger.info("Link token successfully created for user_id")
             return jsonify(link_token_data)
 
+        except PlaidBusy:
+            app.logger.warning("Link token creation: Plaid concurrency limit reached")
+            return jsonify({"error": "Bank service is busy, please retry shortly"}), 503, {"Retry-After": "1"}
         except Exception as e:
             app.logger.error(f"❌ Plaid link token creation error: {str(e)}")
             return jsonify({"error": "Failed to create link token"}), 500
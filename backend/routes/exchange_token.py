@@ -1,8 +1,10 @@
 from flask import request, jsonify
 from plaid_client_config import client
+from plaid_calls import call_plaid, PlaidBusy
 from plaid.model.item_public_token_exchange_request import ItemPublicTokenExchangeRequest
 from key_utils import validate_key
 from models import AccessToken
+from search_index import remove_plaid_transactions
 from config import db
 
 def setup_exchange_token(app, session):
@@ -18,7 +20,7 @@ def setup_exchange_token(app, session):
 
         try:
             exchange_request = ItemPublicTokenExchangeRequest(public_token=public_token)
-            exchange_response = client.item_public_token_exchange(exchange_request)
+            exchange_response = call_plaid(client.item_public_token_exchange, exchange_request)
             access_token = exchange_response["access_token"]
             item_id = exchange_response["item_id"]
 
@@ -31,6 +33,9 @@ def setup_exchange_token(app, session):
                 "message": "Access token stored successfully"
             }), 200
 
+        except PlaidBusy:
+            app.logger.warning("Token exchange: Plaid concurrency limit reached")
+            return jsonify({"error": "Bank service is busy, please retry shortly"}), 503, {"Retry-After": "1"}
         except Exception as e:
             app.logger.error("Plaid token exchange failed", exc_info=True)
             return jsonify({"error": "Plaid token exchange failed"}), 500
@@ -51,6 +56,9 @@ def setup_exchange_token(app, session):
                 return jsonify({"message": "No bank account found for this user"}), 404
 
             db.session.delete(token_entry)
+            # Search documents don't record their item, so all of the user's Plaid transactions leave the index;
+            # those of items still linked are indexed again on the next /api/transactions fetch
+            remove_plaid_transactions(user_id)
             db.session.commit()
 
             return jsonify({"message": "Bank account removed successfully"}), 200
@@ -1,8 +1,9 @@
-from config import db
+from group_commit import commit_add, commit_update, commit_delete
 from flask import jsonify, request
 from marshmallow import ValidationError
 from models import Expenses
 from schemas import expenses_schema
+from entity_cache import entity_cache
 
 def setup_expense_routes(app):
     # Create expense
@@ -13,19 +14,18 @@ def setup_expense_routes(app):
         except ValidationError as e:
             return jsonify({"error": "Invalid expense data submitted."}), 400
         
-        new_expense = Expenses(amount=expense_data['amount'], category=expense_data['category'], date=expense_data['date'], description=expense_data['description'])
+        new_expense = Expenses(amount=expense_data['amount'], category=expense_data['category'], date=expense_data['date'], description=expense_data['description'], user_id=expense_data.get('user_id'))
 
-        db.session.add(new_expense)
-        db.session.commit()
+        commit_add(new_expense)
 
         return jsonify({"message": "Expense created!"}), 201
 
     # Read expense
     @app.route('/expenses/<int:id>', methods=['GET'])
     def read_expense(id):
-        expense = Expenses.query.filter(Expenses.id == id).first_or_404()
+        expense = entity_cache.fetch(Expenses, id, lambda: expenses_schema.dump(Expenses.query.filter(Expenses.id == id).first_or_404()))
 
-        return expenses_schema.jsonify(expense)
+        return jsonify(expense)
 
     # Update expense
     @app.route('/expenses/<int:id>', methods=['PUT'])
@@ -42,7 +42,8 @@ def setup_expense_routes(app):
         expense.date = expense_data['date']
         expense.description = expense_data['description']
 
-        db.session.commit()
+        commit_update(expense)
+        entity_cache.invalidate(Expenses, id)
 
         return jsonify({'message': 'Expense updated successfully!'}), 200
 
@@ -51,7 +52,7 @@ def setup_expense_routes(app):
     def delete_expense(id):
         expense = Expenses.query.get_or_404(id)
 
-        db.session.delete(expense)
-        db.session.commit()
+        commit_delete(expense)
+        entity_cache.invalidate(Expenses, id)
 
         return jsonify({'message': 'Expense removed successfully!'})
\ No newline at end of file
@@ -0,0 +1,74 @@
+from flask import Response, request, jsonify, stream_with_context
+from datetime import datetime
+from key_utils import validate_key
+from config import db
+from export_utils import EXPORTABLE, InvalidCursor, archived_rows, build_export_query, decode_cursor, encode_cursor, is_archivable, page_bounds, query_rows, stream_rows
+
+MIMETYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+def setup_export_routes(app):
+    # Stream a user's full history for one resource as CSV or NDJSON
+    @app.route('/api/export/<string:resource>', methods=['GET'])
+    def export_resource(resource):
+        key = request.headers.get("key")
+        if not key or not validate_key(db.session, key):
+            return jsonify({"error": "Unauthorized access"}), 403
+
+        if resource not in EXPORTABLE:
+            return jsonify({"error": f"Unknown export resource: {resource}"}), 404
+
+        user_id = request.args.get("user_id")
+        fmt = request.args.get("format", "csv").lower()
+        start_date_str = request.args.get("start_date")
+        end_date_str = request.args.get("end_date")
+        cursor = request.args.get("cursor")
+        limit = request.args.get("limit", type=int)
+        archived = request.args.get("archived", "false").lower() == "true"
+
+        if not user_id:
+            return jsonify({"error": "Missing user_id"}), 400
+
+        if fmt not in MIMETYPES:
+            return jsonify({"error": "Invalid format. Use csv or ndjson."}), 400
+
+        if limit is not None and limit <= 0:
+            return jsonify({"error": "limit must be a positive integer"}), 400
+
+        try:
+            start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date() if start_date_str else None
+            end_date = datetime.strptime(end_date_str, "%Y-%m-%d").date() if end_date_str else None
+        except ValueError:
+            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+
+        headers = {"Content-Disposition": f"attachment; filename={resource}.{fmt}"}
+
+        # Cold history moved out by the retention job lives in compressed archive chunks
+        if archived:
+            if not is_archivable(resource):
+                return jsonify({"error": f"{resource} has no archived history"}), 400
+            if cursor or limit is not None:
+                return jsonify({"error": "cursor and limit are not supported for archived exports"}), 400
+
+            rows = archived_rows(resource, user_id, start_date, end_date)
+            return Response(stream_with_context(stream_rows(rows, resource, fmt)), mimetype=MIMETYPES[fmt], headers=headers)
+
+        try:
+            after_id = decode_cursor(cursor, resource, user_id) if cursor else None
+        except InvalidCursor as e:
+            return jsonify({"error": str(e)}), 400
+
+        query, id_column = build_export_query(resource, user_id, start_date, end_date, after_id)
+
+        if limit is not None:
+            last_id, has_more = page_bounds(query, id_column, limit)
+            if last_id is not None:
+                query = query.filter(id_column <= last_id)
+            if has_more:
+                # Pass this back as ?cursor= to continue where this page stopped
+                headers["X-Next-Cursor"] = encode_cursor(resource, user_id, last_id)
+
+        app.logger.info(f"GET /api/export/{resource}: streaming {fmt} export")
+        return Response(stream_with_context(stream_rows(query_rows(query), resource, fmt)), mimetype=MIMETYPES[fmt], headers=headers)
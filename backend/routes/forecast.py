@@ -0,0 +1,48 @@
+from flask import request, jsonify
+from key_utils import validate_key
+from models import AccessToken, BalanceWarning
+from forecast import forecast, MIN_DAYS
+from plaid_calls import PlaidBusy
+from config import db
+
+def setup_forecast_routes(app):
+    # Projected balances for every linked depository account, 30-90 days out
+    @app.route('/api/forecast/<string:user_id>', methods=['GET'])
+    def get_forecast(user_id):
+        key = request.headers.get("key")
+        if not key or not validate_key(db.session, key):
+            return jsonify({"error": "Unauthorized access"}), 403
+
+        if not AccessToken.query.filter_by(user_id=user_id).first():
+            return jsonify({"error": "Access token not found"}), 404
+
+        try:
+            return jsonify(forecast(user_id, request.args.get("days", MIN_DAYS, type=int))), 200
+        except PlaidBusy:
+            app.logger.warning("Forecast: Plaid concurrency limit reached")
+            return jsonify({"error": "Bank service is busy, please retry shortly"}), 503, {"Retry-After": "1"}
+        except Exception:
+            app.logger.error("Error forecasting balances", exc_info=True)
+            return jsonify({"error": "Failed to forecast balances"}), 500
+
+    # Warnings precomputed by `python forecast.py`
+    @app.route('/api/forecast/<string:user_id>/warnings', methods=['GET'])
+    def get_balance_warnings(user_id):
+        key = request.headers.get("key")
+        if not key or not validate_key(db.session, key):
+            return jsonify({"error": "Unauthorized access"}), 403
+
+        warnings = BalanceWarning.query.filter(BalanceWarning.user_id == user_id).order_by(BalanceWarning.first_low_date).all()
+        return jsonify({"warnings": [
+            {
+                "account_id": w.account_id,
+                "account_name": w.account_name,
+                "balance": w.balance,
+                "first_low_date": w.first_low_date.isoformat(),
+                "min_balance": w.min_balance,
+                "min_date": w.min_date.isoformat(),
+                "before_income": w.before_income,
+                "computed_at": w.computed_at.isoformat(),
+            }
+            for w in warnings
+        ]}), 200
@@ -1,10 +1,21 @@
-from config import db
+from group_commit import commit_add, commit_update, commit_delete
 from flask import jsonify, request
 from marshmallow import ValidationError
 from models import Goal
+from xp_ledger import register_xp_listener
+from firestore_mirror import register_firestore_listener
+from goal_progress import register_goal_progress_listener
 from schemas import goal_schema
+from entity_cache import entity_cache
 
 def setup_goal_routes(app):
+    # Appends XP ledger events for every write below
+    register_xp_listener()
+    # Mirrors the changes to Firestore when FIRESTORE_MIRROR is on
+    register_firestore_listener()
+    # Unlinks the savings of deleted goals
+    register_goal_progress_listener()
+
     # Create goal
     @app.route('/goals', methods=['POST'])
     def create_goal():
@@ -14,19 +25,32 @@ def setup_goal_routes(app):
             app.logger.warning(f"Goal validation failed: {e.messages}")
             return jsonify({"error": "Invalid goal data"}), 400
         
-        new_goal = Goal(target_amount=goal_data['target_amount'], current_amount=goal_data['current_amount'], deadline=goal_data['deadline'])
+        new_goal = Goal(target_amount=goal_data['target_amount'], current_amount=goal_data['current_amount'], deadline=goal_data['deadline'], user_id=goal_data.get('user_id'))
 
-        db.session.add(new_goal)
-        db.session.commit()
+        commit_add(new_goal)
 
         return jsonify({"message": "Goal created!"}), 201
 
     # Read goal
     @app.route('/goals/<int:id>', methods=['GET'])
     def read_goal(id):
-        goal = Goal.query.filter(Goal.id == id).first_or_404()
+        goal = entity_cache.fetch(Goal, id, lambda: goal_schema.dump(Goal.query.filter(Goal.id == id).first_or_404()))
+
+        return jsonify(goal)
+
+    # Read goal progress from the maintained savings counters
+    @app.route('/goals/<int:id>/progress', methods=['GET'])
+    def read_goal_progress(id):
+        goal = Goal.query.get_or_404(id)
+        percent = round(goal.saved_amount / goal.target_amount * 100, 2) if goal.target_amount else 0.0
 
-        return goal_schema.jsonify(goal)
+        return jsonify({
+            'id': goal.id,
+            'target_amount': goal.target_amount,
+            'saved_amount': goal.saved_amount,
+            'savings_count': goal.savings_count,
+            'percent_complete': percent
+        }), 200
 
     # Update goal
     @app.route('/goals/<int:id>', methods=['PUT'])
@@ -42,8 +66,10 @@ def setup_goal_routes(app):
         goal.target_amount = goal_data['target_amount']
         goal.current_amount = goal_data['current_amount']
         goal.deadline = goal_data['deadline']
+        goal.version = Goal.version + 1
 
-        db.session.commit()
+        commit_update(goal)
+        entity_cache.invalidate(Goal, id)
 
         return jsonify({'message': 'Goal updated successfully!'}), 200
 
@@ -52,7 +78,7 @@ def setup_goal_routes(app):
     def delete_goal(id):
         goal = Goal.query.get_or_404(id)
 
-        db.session.delete(goal)
-        db.session.commit()
+        commit_delete(goal)
+        entity_cache.invalidate(Goal, id)
 
         return jsonify({'message': 'Goal removed successfully!'})
\ No newline at end of file
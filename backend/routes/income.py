@@ -1,8 +1,9 @@
-from config import db
+from group_commit import commit_add, commit_update, commit_delete
 from flask import jsonify, request
 from marshmallow import ValidationError
 from models import Income
 from schemas import income_schema
+from entity_cache import entity_cache
 
 def setup_income_routes(app):
     # Create income
@@ -14,19 +15,18 @@ def setup_income_routes(app):
             app.logger.warning(f"Income validation failed: {e.messages}")
             return jsonify({"error": "Invalid income data"}), 400
         
-        new_income = Income(amount=income_data['amount'], source=income_data['source'], date=income_data['date'], description=income_data['description'])
+        new_income = Income(amount=income_data['amount'], source=income_data['source'], date=income_data['date'], description=income_data['description'], user_id=income_data.get('user_id'))
 
-        db.session.add(new_income)
-        db.session.commit()
+        commit_add(new_income)
 
         return jsonify({"message": "Income created!"}), 201
 
     # Read income
     @app.route('/incomes/<int:id>', methods=['GET'])
     def read_income(id):
-        income = Income.query.filter(Income.id == id).first_or_404()
+        income = entity_cache.fetch(Income, id, lambda: income_schema.dump(Income.query.filter(Income.id == id).first_or_404()))
 
-        return income_schema.jsonify(income)
+        return jsonify(income)
 
     # Update income
     @app.route('/incomes/<int:id>', methods=['PUT'])
@@ -44,7 +44,8 @@ def setup_income_routes(app):
         income.date = income_data['date']
         income.description = income_data['description']
 
-        db.session.commit()
+        commit_update(income)
+        entity_cache.invalidate(Income, id)
 
         return jsonify({'message': 'Income updated successfully!'}), 200
 
@@ -53,7 +54,7 @@ def setup_income_routes(app):
     def delete_income(id):
         income = Income.query.get_or_404(id)
 
-        db.session.delete(income)
-        db.session.commit()
+        commit_delete(income)
+        entity_cache.invalidate(Income, id)
 
         return jsonify({'message': 'Income removed successfully!'})
\ No newline at end of file
@@ -6,6 +6,7 @@ from schemas import linked_account_schema
 from key_utils import validate_key
 from plaid.model.accounts_get_request import AccountsGetRequest
 from plaid_client_config import client
+from plaid_calls import call_plaid, PlaidBusy
 from models import AccessToken
 
 def setup_linked_account_routes(app):
@@ -85,12 +86,15 @@ def setup_linked_account_routes(app):
 
         try:
             plaid_request = AccountsGetRequest(access_token=access_token_entry.access_token)
-            response = client.accounts_get(plaid_request)
+            response = call_plaid(client.accounts_get, plaid_request)
             accounts = response.to_dict()["accounts"]
 
             print(f"✅ Found {len(accounts)} account(s)")
             return jsonify(accounts), 200
 
+        except PlaidBusy:
+            app.logger.warning("Linked accounts: Plaid concurrency limit reached")
+            return jsonify({"error": "Bank service is busy, please retry shortly"}), 503, {"Retry-After": "1"}
         except Exception as e:
             app.logger.error("Error fetching linked accounts", exc_info=True)
             return jsonify({"error": str(e)}), 500
\ No newline at end of file
@@ -2,12 +2,27 @@ from flask import request, jsonify
 from plaid.model.transactions_get_request import TransactionsGetRequest
 from plaid.model.transactions_get_request_options import TransactionsGetRequestOptions
 from plaid_client_config import client
+from plaid_calls import call_plaid, PlaidBusy
 from models import AccessToken
 from key_utils import validate_key
+from recurring import update_recurring_streams
+from categorization import categorize_transactions
+from search_index import index_plaid_transactions
+from snapshots import snapshot_analytics, update_snapshot
+from anomalies import detect_anomalies
 from config import db
 from datetime import datetime
 import traceback
 
+# Run on every successful fetch, in order; a failing hook never fails the fetch itself
+TRANSACTION_HOOKS = (
+    ("categorizing transactions", categorize_transactions),
+    ("updating recurring streams", update_recurring_streams),
+    ("indexing transactions for search", index_plaid_transactions),
+    ("updating analytics snapshot", update_snapshot),
+    ("detecting spending anomalies", detect_anomalies),
+)
+
 def setup_plaid_routes(app):
 
     @app.route('/api/transactions', methods=['GET'])
@@ -41,14 +56,30 @@ def setup_plaid_routes(app):
                 options=TransactionsGetRequestOptions(count=100)
             )
 
-            response = client.transactions_get(request_data)
+            response = call_plaid(client.transactions_get, request_data)
             transactions = response.to_dict()["transactions"]
 
+            for label, hook in TRANSACTION_HOOKS:
+                try:
+                    hook(user_id, transactions)
+                except Exception:
+                    db.session.rollback()
+                    app.logger.error(f"Error {label}", exc_info=True)
+
+            analytics = {}
+            try:
+                analytics = snapshot_analytics(user_id, start_date, end_date)
+            except Exception:
+                app.logger.error("Error computing analytics", exc_info=True)
+
             return jsonify({
                 "transactions": transactions,
-                "analytics": {}
+                "analytics": analytics
             })
 
+        except PlaidBusy:
+            app.logger.warning("Transactions fetch: Plaid concurrency limit reached")
+            return jsonify({"error": "Bank service is busy, please retry shortly"}), 503, {"Retry-After": "1"}
         except Exception as e:
             app.logger.error("Error fetching transactions", exc_info=True)
             return jsonify({"error": "Failed to fetch transactions"}), 500
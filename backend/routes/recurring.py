@@ -0,0 +1,22 @@
+from flask import request, jsonify
+from key_utils import validate_key
+from models import RecurringStream
+from schemas import recurring_streams_schema
+from config import db
+
+def setup_recurring_routes(app):
+    # Recurring charges/deposits detected from the user's synced Plaid transactions
+    @app.route('/api/recurring/<string:user_id>', methods=['GET'])
+    def get_recurring_streams(user_id):
+        key = request.headers.get("key")
+        if not key or not validate_key(db.session, key):
+            return jsonify({"error": "Unauthorized access"}), 403
+
+        query = RecurringStream.query.filter(RecurringStream.user_id == user_id, RecurringStream.frequency.isnot(None))
+        if request.args.get("subscriptions") == "true":
+            query = query.filter(RecurringStream.is_subscription.is_(True))
+        if request.args.get("include_inactive") != "true":
+            query = query.filter(RecurringStream.is_active.is_(True))
+
+        streams = query.order_by(RecurringStream.next_date).all()
+        return jsonify({"streams": recurring_streams_schema.dump(streams)}), 200
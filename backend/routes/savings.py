@@ -1,10 +1,20 @@
-from config import db
+from group_commit import commit_add, commit_update, commit_delete
 from flask import jsonify, request
 from marshmallow import ValidationError
-from models import Savings
+from models import Goal, Savings
 from schemas import savings_schema
+from entity_cache import entity_cache
+from goal_progress import register_goal_progress_listener
+from xp_ledger import register_xp_listener
+from firestore_mirror import register_firestore_listener
 
 def setup_savings_routes(app):
+    # Keeps Goal.saved_amount / savings_count in step with linked savings and logs XP events
+    register_goal_progress_listener()
+    register_xp_listener()
+    # Mirrors the changes to Firestore when FIRESTORE_MIRROR is on
+    register_firestore_listener()
+
     # Create savings
     @app.route('/savings', methods=['POST'])
     def create_savings():
@@ -14,20 +24,21 @@ def setup_savings_routes(app):
             app.logger.warning(f"Savings validation failed: {e.messages}")
             return jsonify({"error": "Invalid savings data"}), 400
 
+        if savings_data.get('goal_id') is not None and not Goal.query.filter(Goal.id == savings_data['goal_id']).first():
+            return jsonify({"error": "Goal not found"}), 400
         
-        new_savings = Savings(amount=savings_data['amount'], goal_name=savings_data['goal_name'], target_amount=savings_data['target_amount'], date=savings_data['date'])
+        new_savings = Savings(amount=savings_data['amount'], goal_name=savings_data['goal_name'], target_amount=savings_data['target_amount'], date=savings_data['date'], user_id=savings_data.get('user_id'), goal_id=savings_data.get('goal_id'))
 
-        db.session.add(new_savings)
-        db.session.commit()
+        commit_add(new_savings)
 
         return jsonify({"message": "Savings created!"}), 201
 
     # Read savings
     @app.route('/savings/<int:id>', methods=['GET'])
     def read_savings(id):
-        savings = Savings.query.filter(Savings.id == id).first_or_404()
+        savings = entity_cache.fetch(Savings, id, lambda: savings_schema.dump(Savings.query.filter(Savings.id == id).first_or_404()))
 
-        return savings_schema.jsonify(savings)
+        return jsonify(savings)
 
     # Update savings
     @app.route('/savings/<int:id>', methods=['PUT'])
@@ -40,13 +51,17 @@ def setup_savings_routes(app):
             app.logger.warning(f"Savings validation failed: {e.messages}")
             return jsonify({"error": "Invalid savings data"}), 400
 
+        if savings_data.get('goal_id') is not None and not Goal.query.filter(Goal.id == savings_data['goal_id']).first():
+            return jsonify({"error": "Goal not found"}), 400
         
         savings.amount = savings_data['amount']
         savings.goal_name = savings_data['goal_name']
         savings.target_amount = savings_data['target_amount']
         savings.date = savings_data['date']
+        savings.goal_id = savings_data.get('goal_id')
 
-        db.session.commit()
+        commit_update(savings)
+        entity_cache.invalidate(Savings, id)
 
         return jsonify({'message': 'Savings updated successfully!'}), 200
 
@@ -55,7 +70,7 @@ def setup_savings_routes(app):
     def delete_savings(id):
         savings = Savings.query.get_or_404(id)
 
-        db.session.delete(savings)
-        db.session.commit()
+        commit_delete(savings)
+        entity_cache.invalidate(Savings, id)
 
         return jsonify({'message': 'Savings removed successfully!'})
\ No newline at end of file
@@ -0,0 +1,46 @@
+from flask import request, jsonify
+from datetime import datetime
+from key_utils import validate_key
+from search_index import register_search_listener, search_documents
+from config import db
+
+SEARCH_KINDS = ('transaction', 'expense', 'income')
+
+def setup_search_routes(app):
+    # Keeps Search_Documents in step with expense/income writes
+    register_search_listener()
+
+    @app.route('/api/search', methods=['GET'])
+    def search():
+        key = request.headers.get("key")
+        if not key or not validate_key(db.session, key):
+            return jsonify({"error": "Unauthorized access"}), 403
+
+        user_id = request.args.get("user_id")
+        query = request.args.get("q", "")
+        kind = request.args.get("kind")
+
+        if not user_id or not query.strip():
+            return jsonify({"error": "Missing user_id or q"}), 400
+
+        if kind and kind not in SEARCH_KINDS:
+            return jsonify({"error": f"kind must be one of: {', '.join(SEARCH_KINDS)}"}), 400
+
+        try:
+            start_date = datetime.strptime(request.args["start_date"], "%Y-%m-%d").date() if request.args.get("start_date") else None
+            end_date = datetime.strptime(request.args["end_date"], "%Y-%m-%d").date() if request.args.get("end_date") else None
+        except ValueError:
+            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+
+        results = search_documents(
+            user_id,
+            query,
+            merchant=request.args.get("merchant"),
+            min_amount=request.args.get("min_amount", type=float),
+            max_amount=request.args.get("max_amount", type=float),
+            start_date=start_date,
+            end_date=end_date,
+            kind=kind,
+            limit=max(1, request.args.get("limit", 50, type=int)),
+        )
+        return jsonify({"results": results}), 200
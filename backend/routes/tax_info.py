@@ -3,6 +3,7 @@ from flask import jsonify, request
 from marshmallow import ValidationError
 from models import TaxInfo
 from schemas import tax_info_schema
+from entity_cache import entity_cache
 
 def setup_tax_info_routes(app):
     # Create tax_info
@@ -33,9 +34,9 @@ def setup_tax_info_routes(app):
     # Read tax_info
     @app.route('/tax_info/<int:id>', methods=['GET'])
     def read_tax_info(id):
-        tax_info = TaxInfo.query.filter(TaxInfo.id == id).first_or_404()
+        tax_info = entity_cache.fetch(TaxInfo, id, lambda: tax_info_schema.dump(TaxInfo.query.filter(TaxInfo.id == id).first_or_404()))
 
-        return tax_info_schema.jsonify(tax_info)
+        return jsonify(tax_info)
 
     # Update tax_info
     @app.route('/tax_info/<int:id>', methods=['PUT'])
@@ -58,8 +59,10 @@ def setup_tax_info_routes(app):
         tax_info.total_income = tax_info_data['total_income']
         tax_info.tax_to_save = tax_info_data['tax_to_save']
         tax_info.total_saved = tax_info_data['total_saved']
+        tax_info.version = TaxInfo.version + 1
 
         db.session.commit()
+        entity_cache.invalidate(TaxInfo, id)
 
         return jsonify({'message': 'Tax info updated successfully!'}), 200
 
@@ -70,5 +73,6 @@ def setup_tax_info_routes(app):
 
         db.session.delete(tax_info)
         db.session.commit()
+        entity_cache.invalidate(TaxInfo, id)
 
         return jsonify({'message': 'Tax info removed successfully!'})
\ No newline at end of file
@@ -1,4 +1,4 @@
-from config import db
+from group_commit import commit_add, commit_update, commit_delete
 from flask import jsonify, request
 from marshmallow import ValidationError
 from models import Transaction
@@ -15,10 +15,9 @@ def setup_transaction_routes(app):
             return jsonify({"error": "Invalid transaction data."}), 400
 
         
-        new_transaction = Transaction(transaction_date=transaction_data['transaction_date'], transaction_amount=transaction_data['transaction_amount'])
+        new_transaction = Transaction(transaction_date=transaction_data['transaction_date'], transaction_amount=transaction_data['transaction_amount'], user_id=transaction_data.get('user_id'))
 
-        db.session.add(new_transaction)
-        db.session.commit()
+        commit_add(new_transaction)
 
         return jsonify({"message": "Transaction complete!"}), 201
 
@@ -44,7 +43,7 @@ def setup_transaction_routes(app):
         transaction.transaction_date = transaction_data['transaction_date']
         transaction.transaction_amount = transaction_data['transaction_amount']
 
-        db.session.commit()
+        commit_update(transaction)
 
         return jsonify({'message': 'Transaction updated successfully!'}), 200
 
@@ -53,7 +52,6 @@ def setup_transaction_routes(app):
     def delete_transaction(id):
         transaction = Transaction.query.get_or_404(id)
 
-        db.session.delete(transaction)
-        db.session.commit()
+        commit_delete(transaction)
 
         return jsonify({'message': 'Transaction cancelled successfully!'})
\ No newline at end of file
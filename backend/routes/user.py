@@ -1,8 +1,10 @@
 from config import db
 from flask import jsonify, request
 from marshmallow import ValidationError
-from models import User
+from models import User, UserPurge
 from schemas import user_schema
+from entity_cache import entity_cache
+from purge import purger, purge_status
 
 def setup_user_routes(app):
     # Create user
@@ -25,9 +27,9 @@ def setup_user_routes(app):
     # Read user
     @app.route('/users/<int:id>', methods=['GET'])
     def read_user(id):
-        user = User.query.filter(User.id == id).first_or_404()
+        user = entity_cache.fetch(User, id, lambda: user_schema.dump(User.query.filter(User.id == id).first_or_404()))
 
-        return user_schema.jsonify(user)
+        return jsonify(user)
 
     # Update user
     @app.route('/users/<int:id>', methods=['PUT'])
@@ -45,15 +47,22 @@ def setup_user_routes(app):
         user.phone = user_data['phone']
 
         db.session.commit()
+        entity_cache.invalidate(User, id)
 
         return jsonify({'message': 'User updated successfully!'}), 200
 
-    # Delete user
+    # Delete user: revokes their Plaid items and purges their data from every table in the background
     @app.route('/users/<int:id>', methods=['DELETE'])
     def delete_user(id):
         user = User.query.get_or_404(id)
 
-        db.session.delete(user)
-        db.session.commit()
+        job = purger.submit(user.id)
+
+        return jsonify({'message': 'User removal started', 'purge': purge_status(job)}), 202
+
+    # Progress of a user's purge
+    @app.route('/users/<int:id>/purge', methods=['GET'])
+    def read_user_purge(id):
+        job = UserPurge.query.get_or_404(str(id))
 
-        return jsonify({'message': 'User removed successfully!'})
\ No newline at end of file
+        return jsonify(purge_status(job)), 200
\ No newline at end of file
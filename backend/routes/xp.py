@@ -0,0 +1,33 @@
+from flask import request, jsonify
+from key_utils import validate_key
+from models import XpEvent
+from xp_ledger import xp_summary
+from config import db
+
+def setup_xp_routes(app):
+    # Level, XP and badges from the materialized totals row
+    @app.route('/api/xp/<string:user_id>', methods=['GET'])
+    def get_xp(user_id):
+        key = request.headers.get("key")
+        if not key or not validate_key(db.session, key):
+            return jsonify({"error": "Unauthorized access"}), 403
+
+        return jsonify(xp_summary(user_id)), 200
+
+    @app.route('/api/xp/<string:user_id>/events', methods=['GET'])
+    def get_xp_events(user_id):
+        key = request.headers.get("key")
+        if not key or not validate_key(db.session, key):
+            return jsonify({"error": "Unauthorized access"}), 403
+
+        limit = min(request.args.get("limit", 50, type=int), 200)
+        events = (
+            XpEvent.query.filter(XpEvent.user_id == user_id)
+            .order_by(XpEvent.id.desc())
+            .limit(limit)
+            .all()
+        )
+        return jsonify({"events": [
+            {"id": e.id, "event": e.event, "ref": e.ref, "xp": e.xp, "created_at": e.created_at.isoformat()}
+            for e in events
+        ]}), 200
@@ -1,5 +1,5 @@
 from config import ma
-from marshmallow import fields
+from marshmallow import fields, validate
 
 class UserSchema(ma.Schema):
     name = fields.String(required=True)
@@ -25,17 +25,21 @@ class LinkedAccountSchema(ma.Schema):
 class TransactionSchema(ma.Schema):
     transaction_date = fields.Date(required=True)
     transaction_amount = fields.Float(required=True)
+    user_id = fields.String()
 
     class Meta:
-        fields = ('id', 'transaction_date', 'transaction_amount')
+        fields = ('id', 'transaction_date', 'transaction_amount', 'user_id')
 
 class GoalSchema(ma.Schema):
     target_amount = fields.Float(required=True)
     current_amount = fields.Float(required=True)
     deadline = fields.Date(required=True)
+    user_id = fields.String()
+    # Bumped by every write; compare against it for optimistic delta updates
+    version = fields.Integer()
 
     class Meta:
-        fields = ('id', 'target_amount', 'current_amount', 'deadline')
+        fields = ('id', 'target_amount', 'current_amount', 'deadline', 'user_id', 'version')
 
 class TaxInfoSchema(ma.Schema):
     income1 = fields.Float(required=True)
@@ -47,45 +51,78 @@ class TaxInfoSchema(ma.Schema):
     total_income = fields.Float(required=True)
     tax_to_save = fields.Float(required=True)
     total_saved = fields.Float(required=True)
+    version = fields.Integer()
 
     class Meta:
-        fields = ('id', 'income1', 'income2', 'income3', 'income4', 'income5', 'tax_rate', 'total_income', 'tax_to_save', 'total_saved')
+        fields = ('id', 'income1', 'income2', 'income3', 'income4', 'income5', 'tax_rate', 'total_income', 'tax_to_save', 'total_saved', 'version')
 
 class IncomeSchema(ma.Schema):
     amount = fields.Float(required=True)
     source = fields.String(required=True)
     date = fields.Date(required=True)
     description = fields.String()
+    user_id = fields.String()
 # If we need to require the description, this will need to be updated.
     class Meta:
-        fields = ('id', 'amount', 'source', 'date', 'description')
+        fields = ('id', 'amount', 'source', 'date', 'description', 'user_id')
 
 class ExpensesSchema(ma.Schema):
     amount = fields.Float(required=True)
     category = fields.String(required=True)
     date = fields.Date(required=True)
     description = fields.String()
+    user_id = fields.String()
 # This one too.
     class Meta:
-        fields = ('id', 'amount', 'category', 'date', 'description')
+        fields = ('id', 'amount', 'category', 'date', 'description', 'user_id')
 
 class SavingsSchema(ma.Schema):
     amount = fields.Float(required=True)
     goal_name = fields.String(required=True)
     target_amount = fields.Float(required=True)
     date = fields.Date(required=True)
+    user_id = fields.String()
+    goal_id = fields.Integer(allow_none=True)
 
     class Meta:
-        fields = ('id', 'amount', 'goal_name', 'target_amount', 'date')
+        fields = ('id', 'amount', 'goal_name', 'target_amount', 'date', 'user_id', 'goal_id')
 
 class BudgetSchema(ma.Schema):
     category = fields.String(required=True)
     target_amount = fields.Float(required=True)
     month = fields.String(required=True)
     year = fields.Integer(required=True)
+    user_id = fields.String()
 
     class Meta:
-        fields = ('id', 'category', 'target_amount', 'month', 'year')
+        fields = ('id', 'category', 'target_amount', 'month', 'year', 'user_id')
+
+class RecurringStreamSchema(ma.Schema):
+    class Meta:
+        fields = ('id', 'merchant', 'frequency', 'average_amount', 'amount_variation', 'occurrences', 'last_date', 'next_date', 'is_subscription', 'is_active')
+
+class SpendingAnomalySchema(ma.Schema):
+    class Meta:
+        fields = ('id', 'kind', 'ref', 'category', 'merchant', 'amount', 'date', 'expected_amount', 'z_score', 'reason', 'dismissed')
+
+class CategoryRuleSchema(ma.Schema):
+    keyword = fields.String(required=True, validate=validate.Length(min=1, max=100))
+    category = fields.String(required=True, validate=validate.OneOf(['Income', 'Expense', 'Savings']))
+    priority = fields.Integer(load_default=0)
+    amount_sign = fields.String(load_default='any', validate=validate.OneOf(['any', 'inflow', 'outflow']))
+    plaid_primary = fields.String(load_default=None, allow_none=True, validate=validate.Length(min=1, max=50))
+
+    class Meta:
+        fields = ('id', 'keyword', 'category', 'priority', 'amount_sign', 'plaid_primary')
+
+class DeltaSchema(ma.Schema):
+    # One increment for the PATCH counter routes; expected_version makes it conditional
+    id = fields.Integer(required=True)
+    delta = fields.Float(required=True, allow_nan=False)
+    expected_version = fields.Integer(allow_none=True)
+
+class DeltaBatchSchema(ma.Schema):
+    updates = fields.List(fields.Nested(DeltaSchema), required=True, validate=validate.Length(min=1, max=500))
 
 # Initializing schemas
 
@@ -98,4 +135,10 @@ income_schema = IncomeSchema()
 expenses_schema = ExpensesSchema()
 savings_schema = SavingsSchema()
 budget_schema = BudgetSchema()
-access_token_schema = AccessTokenSchema()
\ No newline at end of file
+access_token_schema = AccessTokenSchema()
+recurring_streams_schema = RecurringStreamSchema(many=True)
+category_rule_schema = CategoryRuleSchema()
+category_rules_schema = CategoryRuleSchema(many=True)
+spending_anomalies_schema = SpendingAnomalySchema(many=True)
+delta_schema = DeltaSchema(partial=('id',))
+delta_batch_schema = DeltaBatchSchema()
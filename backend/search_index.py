@@ -0,0 +1,203 @@
+import datetime
+import re
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+from config import db, app
+from models import Expenses, Income, SearchDocument
+
+MAX_RESULTS = 200
+documents = SearchDocument.__table__
+
+# SQLite: external-content FTS5 table kept in step with Search_Documents by triggers
+SQLITE_DDL = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS "Search_Documents_fts" USING fts5('
+    "merchant, description, content='Search_Documents', content_rowid='id', tokenize='unicode61')",
+    'CREATE TRIGGER IF NOT EXISTS "Search_Documents_ai" AFTER INSERT ON "Search_Documents" BEGIN '
+    'INSERT INTO "Search_Documents_fts"(rowid, merchant, description) VALUES (new.id, new.merchant, new.description); END',
+    'CREATE TRIGGER IF NOT EXISTS "Search_Documents_ad" AFTER DELETE ON "Search_Documents" BEGIN '
+    'INSERT INTO "Search_Documents_fts"("Search_Documents_fts", rowid, merchant, description) VALUES (\'delete\', old.id, old.merchant, old.description); END',
+    'CREATE TRIGGER IF NOT EXISTS "Search_Documents_au" AFTER UPDATE ON "Search_Documents" BEGIN '
+    'INSERT INTO "Search_Documents_fts"("Search_Documents_fts", rowid, merchant, description) VALUES (\'delete\', old.id, old.merchant, old.description); '
+    'INSERT INTO "Search_Documents_fts"(rowid, merchant, description) VALUES (new.id, new.merchant, new.description); END',
+)
+
+# Postgres: generated tsvector column with a GIN index, maintained by the database on every write
+POSTGRES_DDL = (
+    'ALTER TABLE "Search_Documents" ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS '
+    "(to_tsvector('simple', coalesce(merchant, '') || ' ' || coalesce(description, ''))) STORED",
+    'CREATE INDEX IF NOT EXISTS "ix_Search_Documents_search_vector" ON "Search_Documents" USING GIN (search_vector)',
+)
+
+_index_ready = set()
+
+def ensure_search_index(connection):
+    # Idempotent; runs once per database per process, on the caller's connection so it joins their transaction
+    engine = connection.engine
+    if engine.url in _index_ready:
+        return
+    documents.create(connection, checkfirst=True)
+    statements = POSTGRES_DDL if engine.dialect.name == 'postgresql' else SQLITE_DDL if engine.dialect.name == 'sqlite' else ()
+    for statement in statements:
+        connection.execute(sa.text(statement))
+    _index_ready.add(engine.url)
+
+def _search_terms(query):
+    return re.findall(r'\w+', query.lower())[:10]
+
+# --- Keeping the index in sync ---
+
+def _plaid_document(user_id, transaction):
+    date = transaction['date']
+    return {
+        'user_id': user_id,
+        'kind': 'transaction',
+        'ref': transaction['transaction_id'],
+        'merchant': (transaction.get('merchant_name') or '')[:200] or None,
+        'description': (transaction.get('name') or '')[:1000],
+        'amount': float(transaction['amount']),
+        'date': date if isinstance(date, datetime.date) else datetime.date.fromisoformat(str(date)[:10]),
+    }
+
+def index_plaid_transactions(user_id, transactions):
+    # Upsert the fetched transactions; unchanged documents are left alone so the FTS index isn't rewritten
+    ensure_search_index(db.session.connection())
+    incoming = {t['transaction_id']: _plaid_document(user_id, t) for t in transactions if t.get('transaction_id')}
+    if not incoming:
+        return 0
+
+    existing = {
+        row.ref: row for row in db.session.execute(
+            sa.select(documents).where(documents.c.kind == 'transaction', documents.c.ref.in_(list(incoming)))
+        )
+    }
+
+    inserts, updates = [], []
+    for ref, document in incoming.items():
+        row = existing.get(ref)
+        if row is None:
+            inserts.append(document)
+        elif any(getattr(row, name) != value for name, value in document.items()):
+            updates.append({**document, 'doc_id': row.id})
+
+    if inserts:
+        db.session.execute(documents.insert(), inserts)
+    if updates:
+        db.session.execute(documents.update().where(documents.c.id == sa.bindparam('doc_id')), updates)
+    db.session.commit()
+    return len(inserts) + len(updates)
+
+def remove_plaid_transactions(user_id, transaction_ids=None):
+    # Drop the user's Plaid transaction documents (all of them, or just these ids); the caller commits
+    ensure_search_index(db.session.connection())
+    statement = documents.delete().where(documents.c.user_id == user_id, documents.c.kind == 'transaction')
+    if transaction_ids is not None:
+        statement = statement.where(documents.c.ref.in_(list(transaction_ids)))
+    return db.session.execute(statement).rowcount
+
+def _entry_document(obj):
+    if isinstance(obj, Expenses):
+        return {'user_id': obj.user_id, 'kind': 'expense', 'ref': str(obj.id), 'merchant': obj.category,
+                'description': obj.description, 'amount': obj.amount, 'date': obj.date}
+    return {'user_id': obj.user_id, 'kind': 'income', 'ref': str(obj.id), 'merchant': obj.source,
+            'description': obj.description, 'amount': obj.amount, 'date': obj.date}
+
+def sync_entry_documents(session, flush_context):
+    # Mirror Expenses / Income writes into Search_Documents inside the same transaction
+    tracked = (Expenses, Income)
+    written = [obj for obj in list(session.new) + list(session.dirty) if isinstance(obj, tracked)]
+    removed = [obj for obj in session.deleted if isinstance(obj, tracked)]
+    if not written and not removed:
+        return
+
+    connection = session.connection()
+    ensure_search_index(connection)
+    for obj in removed:
+        kind = 'expense' if isinstance(obj, Expenses) else 'income'
+        connection.execute(documents.delete().where(documents.c.kind == kind, documents.c.ref == str(obj.id)))
+    for obj in written:
+        document = _entry_document(obj)
+        updated = connection.execute(
+            documents.update().where(documents.c.kind == document['kind'], documents.c.ref == document['ref']).values(**document)
+        ).rowcount
+        if not updated:
+            connection.execute(documents.insert().values(**document))
+
+def register_search_listener():
+    if not sa.event.contains(Session, 'after_flush', sync_entry_documents):
+        sa.event.listen(Session, 'after_flush', sync_entry_documents)
+
+def rebuild_entry_documents():
+    # Full resync of expenses and incomes, e.g. after enabling search on an existing database
+    ensure_search_index(db.session.connection())
+    db.session.execute(documents.delete().where(documents.c.kind.in_(['expense', 'income'])))
+    for model in (Expenses, Income):
+        batch = []
+        for obj in model.query.yield_per(1000):
+            batch.append(_entry_document(obj))
+            if len(batch) >= 1000:
+                db.session.execute(documents.insert(), batch)
+                batch = []
+        if batch:
+            db.session.execute(documents.insert(), batch)
+    db.session.commit()
+
+# --- Querying ---
+
+def search_documents(user_id, query, merchant=None, min_amount=None, max_amount=None,
+                     start_date=None, end_date=None, kind=None, limit=50):
+    engine = db.engine
+    ensure_search_index(db.session.connection())
+    terms = _search_terms(query)
+    if not terms:
+        return []
+
+    params = {'user_id': user_id, 'limit': min(limit, MAX_RESULTS)}
+    filters = ['d.user_id = :user_id']
+    if merchant:
+        filters.append('lower(d.merchant) LIKE :merchant')
+        params['merchant'] = merchant.lower() + '%'
+    if min_amount is not None:
+        filters.append('d.amount >= :min_amount')
+        params['min_amount'] = min_amount
+    if max_amount is not None:
+        filters.append('d.amount <= :max_amount')
+        params['max_amount'] = max_amount
+    if start_date:
+        filters.append('d.date >= :start_date')
+        params['start_date'] = start_date.isoformat()
+    if end_date:
+        filters.append('d.date <= :end_date')
+        params['end_date'] = end_date.isoformat()
+    if kind:
+        filters.append('d.kind = :kind')
+        params['kind'] = kind
+
+    columns = 'd.kind, d.ref, d.merchant, d.description, d.amount, d.date'
+    if engine.dialect.name == 'sqlite':
+        # Every term must match; each one also matches as a prefix
+        params['match'] = ' '.join(f'"{term}"*' for term in terms)
+        sql = (f'SELECT {columns}, bm25("Search_Documents_fts") AS score FROM "Search_Documents_fts" '
+               f'JOIN "Search_Documents" d ON d.id = "Search_Documents_fts".rowid '
+               f'WHERE "Search_Documents_fts" MATCH :match AND {" AND ".join(filters)} ORDER BY score LIMIT :limit')
+    elif engine.dialect.name == 'postgresql':
+        params['match'] = ' & '.join(f'{term}:*' for term in terms)
+        sql = (f"SELECT {columns}, ts_rank(d.search_vector, to_tsquery('simple', :match)) AS score FROM \"Search_Documents\" d "
+               f"WHERE d.search_vector @@ to_tsquery('simple', :match) AND {' AND '.join(filters)} ORDER BY score DESC LIMIT :limit")
+    else:
+        # No inverted index on other backends; fall back to a filtered scan
+        for i, term in enumerate(terms):
+            filters.append(f"lower(coalesce(d.merchant, '') || ' ' || coalesce(d.description, '')) LIKE :term{i}")
+            params[f'term{i}'] = f'%{term}%'
+        sql = f'SELECT {columns}, 0 AS score FROM "Search_Documents" d WHERE {" AND ".join(filters)} ORDER BY d.date DESC LIMIT :limit'
+
+    results = []
+    for row in db.session.execute(sa.text(sql), params).mappings():
+        result = dict(row)
+        result['date'] = result['date'].isoformat() if hasattr(result['date'], 'isoformat') else result['date']
+        results.append(result)
+    return results
+
+if __name__ == "__main__":
+    with app.app_context():
+        rebuild_entry_documents()
+        print("✅ Search index rebuilt for expenses and incomes.")
@@ -0,0 +1,163 @@
+import datetime
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import numpy as np
+
+# One columnar snapshot file per user, read through np.memmap so aggregations never build Python rows
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'snapshots'))
+MAGIC = b'PPSNAP02'
+# Files written by an older layout are dropped and rebuilt from the next sync
+MAGIC_PREFIX = b'PPSNAP'
+ALIGNMENT = 64
+EPOCH = datetime.date(1970, 1, 1)
+UNCATEGORIZED = 'Uncategorized'
+
+# Column order and types on disk: transaction id hash, days since epoch, amount in cents, Plaid category code,
+# and whether the server-side categorizer labelled the transaction Savings
+COLUMNS = (
+    ('ids', np.uint64),
+    ('dates', np.int32),
+    ('amounts', np.int64),
+    ('categories', np.int16),
+    ('savings', np.uint8),
+)
+
+def snapshot_path(user_id):
+    # Hash the id so arbitrary user ids can't escape the snapshot directory
+    return os.path.join(SNAPSHOT_DIR, hashlib.sha256(user_id.encode()).hexdigest()[:32] + '.snap')
+
+def _padded(length):
+    return -(-length // ALIGNMENT) * ALIGNMENT
+
+def transaction_hash(transaction_id):
+    return int.from_bytes(hashlib.blake2b(transaction_id.encode(), digest_size=8).digest(), 'little')
+
+def write_snapshot(path, columns, categories):
+    rows = len(columns['ids'])
+    meta = json.dumps({'rows': rows, 'categories': categories}).encode()
+    header_length = _padded(len(MAGIC) + 4 + len(meta))
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # A unique temp file per write: concurrent rebuilds for one user (threads, greenlets) never share one
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC + struct.pack('<I', len(meta)) + meta)
+            f.write(b'\0' * (header_length - f.tell()))
+            for name, dtype in COLUMNS:
+                data = np.ascontiguousarray(columns[name], dtype=dtype).tobytes()
+                f.write(data + b'\0' * (_padded(len(data)) - len(data)))
+        # Readers either see the old file or the new one, never a half-written one
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+def load_snapshot(user_id):
+    path = snapshot_path(user_id)
+    if not os.path.exists(path):
+        return None
+
+    with open(path, 'rb') as f:
+        magic = f.read(len(MAGIC))
+        if magic != MAGIC:
+            if magic.startswith(MAGIC_PREFIX):
+                return None
+            raise ValueError(f"Not a snapshot file: {path}")
+        meta_length = struct.unpack('<I', f.read(4))[0]
+        meta = json.loads(f.read(meta_length))
+
+    rows = meta['rows']
+    offset = _padded(len(MAGIC) + 4 + meta_length)
+    snapshot = {'category_names': meta['categories'], 'rows': rows}
+    for name, dtype in COLUMNS:
+        if rows:
+            snapshot[name] = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(rows,))
+        else:
+            snapshot[name] = np.empty(0, dtype=dtype)
+        offset += _padded(rows * np.dtype(dtype).itemsize)
+    return snapshot
+
+def _day_number(value):
+    day = value if isinstance(value, datetime.date) else datetime.date.fromisoformat(str(value)[:10])
+    return (day - EPOCH).days
+
+def update_snapshot(user_id, transactions):
+    # Merge freshly synced transactions into the user's snapshot: new ids are added, known ids replaced
+    incoming = [t for t in transactions if t.get('transaction_id') and not t.get('pending')]
+    if not incoming:
+        return 0
+
+    existing = load_snapshot(user_id)
+    categories = list(existing['category_names']) if existing else []
+    codes = {name: code for code, name in enumerate(categories)}
+
+    def category_code(transaction):
+        # Plaid's own category; 'category' is the Income / Expense / Savings label by the time this runs
+        name = (transaction.get('personal_finance_category') or {}).get('primary')
+        if not name and isinstance(transaction.get('category'), list):
+            name = transaction['category'][0] if transaction['category'] else None
+        name = name or UNCATEGORIZED
+        if name not in codes:
+            codes[name] = len(categories)
+            categories.append(name)
+        return codes[name]
+
+    new_columns = {
+        'ids': np.array([transaction_hash(t['transaction_id']) for t in incoming], dtype=np.uint64),
+        'dates': np.array([_day_number(t['date']) for t in incoming], dtype=np.int32),
+        'amounts': np.array([round(float(t['amount']) * 100) for t in incoming], dtype=np.int64),
+        'categories': np.array([category_code(t) for t in incoming], dtype=np.int16),
+        'savings': np.array([t.get('category') == 'Savings' for t in incoming], dtype=np.uint8),
+    }
+
+    if existing and existing['rows']:
+        keep = ~np.isin(existing['ids'], new_columns['ids'])
+        merged = {name: np.concatenate([existing[name][keep], new_columns[name]]) for name, _ in COLUMNS}
+    else:
+        merged = new_columns
+
+    # Keep rows ordered by day so date ranges are two binary searches
+    order = np.lexsort((merged['ids'], merged['dates']))
+    write_snapshot(snapshot_path(user_id), {name: merged[name][order] for name, _ in COLUMNS}, categories)
+    return len(order)
+
+def summarize(snapshot, start_date=None, end_date=None):
+    # Dashboard totals straight off the mapped columns; Plaid amounts are positive for outflows
+    dates = snapshot['dates']
+    lo = np.searchsorted(dates, _day_number(start_date), 'left') if start_date else 0
+    hi = np.searchsorted(dates, _day_number(end_date), 'right') if end_date else len(dates)
+    amounts, codes, days = snapshot['amounts'][lo:hi], snapshot['categories'][lo:hi], dates[lo:hi]
+
+    categories = snapshot['category_names']
+    inflow = amounts < 0
+    savings = ~inflow & (snapshot['savings'][lo:hi] != 0)
+    expense = ~inflow & ~savings
+
+    by_category = np.bincount(codes[expense], weights=amounts[expense], minlength=len(categories))
+
+    months = days.astype('datetime64[D]').astype('datetime64[M]')
+    unique_months, month_index = np.unique(months, return_inverse=True)
+    monthly_income = np.bincount(month_index, weights=np.where(inflow, -amounts, 0), minlength=len(unique_months))
+    monthly_expenses = np.bincount(month_index, weights=np.where(expense, amounts, 0), minlength=len(unique_months))
+
+    return {
+        'totalIncome': int(-amounts[inflow].sum()) / 100,
+        'totalExpenses': int(amounts[expense].sum()) / 100,
+        'totalSavings': int(amounts[savings].sum()) / 100,
+        'categoryBreakdown': [
+            {'category': categories[code], 'amount': round(total / 100, 2)}
+            for code, total in enumerate(by_category) if total
+        ],
+        'monthlyTrend': [
+            {'month': str(month), 'income': round(income / 100, 2), 'expenses': round(spent / 100, 2)}
+            for month, income, spent in zip(unique_months, monthly_income, monthly_expenses)
+        ],
+    }
+
+def snapshot_analytics(user_id, start_date=None, end_date=None):
+    snapshot = load_snapshot(user_id)
+    return summarize(snapshot, start_date, end_date) if snapshot else {}
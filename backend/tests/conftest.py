@@ -0,0 +1,65 @@
+import os
+import shutil
+import sys
+import tempfile
+import pytest
+import sqlalchemy as sa
+
+# The backend is a flat set of modules run from its own directory
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Tests get their own file database (background threads need to share it); TEST_DATABASE_URI overrides
+TEST_DIR = tempfile.mkdtemp(prefix='pennypilot-tests-')
+os.environ['SQLALCHEMY_DATABASE_URI'] = os.getenv('TEST_DATABASE_URI', f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}")
+os.environ['SNAPSHOT_DIR'] = os.path.join(TEST_DIR, 'snapshots')
+os.environ.setdefault('PLAID_ENV', 'Simulator')
+os.environ.pop('FLASK_ENV', None)
+
+from base import Base
+from config import app as flask_app, db
+from key_utils import store_key
+import models
+
+API_KEY = 'test-key'
+
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        Base.metadata.create_all(db.engine)
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        _drop_everything()
+        _reset_module_state()
+        shutil.rmtree(os.environ['SNAPSHOT_DIR'], ignore_errors=True)
+
+def _drop_everything():
+    # Includes tables created outside the models: FTS5 indexes, partition shards and archives
+    db.drop_all()
+    Base.metadata.drop_all(db.engine)
+    with db.engine.begin() as conn:
+        for name in sa.inspect(conn).get_table_names():
+            conn.execute(sa.text(f'DROP TABLE IF EXISTS "{name}"'))
+
+def _reset_module_state():
+    import categorization, search_index
+    categorization._matcher_cache.update(version=None, matcher=None)
+    search_index._index_ready.clear()
+
+@pytest.fixture
+def client(app):
+    import app as routes  # registers every route on the app
+    store_key(db.session, API_KEY)
+    return routes.app.test_client()
+
+@pytest.fixture
+def headers():
+    return {'key': API_KEY}
+
+@pytest.fixture
+def user(app):
+    user = models.User(id='user-1', name='Test User', email='test@example.com', phone='5550100')
+    db.session.add(user)
+    db.session.commit()
+    return user.id
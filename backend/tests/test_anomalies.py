@@ -0,0 +1,108 @@
+import datetime
+import threading
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql, sqlite
+from anomalies import _claim, detect_anomalies, ingest, rebuild_anomaly_state, register_anomaly_listener
+from config import db
+from models import Expenses, SpendingAnomaly, SpendingObservation, SpendingStat
+
+def _transactions(ids, amount=10.0):
+    return [
+        {'transaction_id': f'tx-{i}', 'amount': amount, 'date': '2024-05-01', 'name': 'Grocer',
+         'personal_finance_category': {'primary': 'FOOD_AND_DRINK'}}
+        for i in ids
+    ]
+
+def _stats():
+    return db.session.execute(sa.select(SpendingStat.count, SpendingStat.mean)).one()
+
+def test_refetched_charges_are_counted_once(app):
+    detect_anomalies('user-1', _transactions(range(10)))
+    detect_anomalies('user-1', _transactions(range(5, 15)))
+
+    assert _stats() == (15, 10.0)
+
+def test_outlier_is_flagged_after_enough_history(app):
+    detect_anomalies('user-1', [dict(t, amount=10.0 + i % 3) for i, t in enumerate(_transactions(range(20)))])
+    flagged = detect_anomalies('user-1', _transactions(['big'], amount=400.0))
+
+    assert [f['ref'] for f in flagged] == ['tx-big']
+    assert db.session.execute(sa.select(sa.func.count(SpendingAnomaly.id))).scalar() == 1
+
+def test_concurrent_ingests_lose_no_updates(app):
+    errors = []
+
+    def fetch(ids):
+        with app.app_context():
+            try:
+                for start in range(0, len(ids), 5):
+                    detect_anomalies('user-1', _transactions(ids[start:start + 5]))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    # Overlapping fetches of one user's transactions, all in one category
+    batches = [list(range(0, 60)), list(range(30, 90)), list(range(0, 90, 2))]
+    threads = [threading.Thread(target=fetch, args=(ids,)) for ids in batches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert db.session.execute(sa.select(sa.func.count(SpendingObservation.id))).scalar() == 90
+    assert _stats() == (90, 10.0)
+
+def test_claim_skips_observations_recorded_concurrently(app):
+    observation = {'user_id': 'user-1', 'kind': 'transaction', 'ref': 'tx-1', 'category': 'FOOD_AND_DRINK',
+                   'merchant': None, 'amount': 10.0, 'date': datetime.date(2024, 5, 1)}
+    ingest(db.session.connection(), [observation])
+    db.session.commit()
+
+    # Another ingest recorded tx-1 between our duplicate check and our insert
+    connection = db.session.connection()
+    dialect = {'sqlite': sqlite, 'postgresql': postgresql}[connection.dialect.name]
+    second = dict(observation, ref='tx-2')
+    assert _claim(connection, [observation, second], dialect) == [second]
+
+def _expense(amount, day, category='Food'):
+    return Expenses(amount=amount, category=category, date=datetime.date(2024, 5, day), user_id='user-1')
+
+def _all_stats():
+    rows = db.session.execute(sa.select(SpendingStat.category, SpendingStat.count, SpendingStat.mean, SpendingStat.m2,
+                                        SpendingStat.ewma, SpendingStat.sketch).order_by(SpendingStat.category))
+    return [(category, count, round(mean, 6), round(m2, 6), round(ewma, 6), sketch) for category, count, mean, m2, ewma, sketch in rows
+            if count]
+
+def test_edited_and_deleted_expenses_leave_the_stats(app):
+    register_anomaly_listener()
+    expenses = [_expense(10.0 + i, i + 1) for i in range(12)]
+    db.session.add_all(expenses)
+    db.session.commit()
+
+    expenses[3].amount = 250.0
+    expenses[5].category = 'Travel'
+    db.session.delete(expenses[7])
+    db.session.commit()
+
+    streamed = _all_stats()
+    assert [(category, count) for category, count, *_ in streamed] == [('Food', 10), ('Travel', 1)]
+    assert db.session.execute(sa.select(SpendingObservation.amount).where(SpendingObservation.ref == str(expenses[3].id))).scalar() == 250.0
+    # Same numbers as replaying everything from scratch
+    rebuild_anomaly_state()
+    assert _all_stats() == streamed
+
+def test_editing_a_flagged_expense_clears_its_flag(app):
+    register_anomaly_listener()
+    db.session.add_all(_expense(10.0 + i % 3, i + 1) for i in range(10))
+    db.session.commit()
+    outlier = _expense(400.0, 20)
+    db.session.add(outlier)
+    db.session.commit()
+    assert db.session.execute(sa.select(SpendingAnomaly.ref)).scalars().all() == [str(outlier.id)]
+
+    outlier.amount = 11.0
+    db.session.commit()
+    assert db.session.execute(sa.select(SpendingAnomaly.ref)).scalars().all() == []
+    assert _stats().count == 11
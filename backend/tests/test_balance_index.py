@@ -0,0 +1,101 @@
+import datetime
+import random
+import pytest
+import sqlalchemy as sa
+from balance_index import range_totals, rebuild_balance_index, register_balance_listener, running_balance
+from config import db
+from models import Expenses, Income
+
+START = datetime.date(2023, 1, 1)
+CATEGORIES = ('Food', 'Rent', 'Fun')
+
+def _day(rng):
+    return START + datetime.timedelta(days=rng.randrange(730))
+
+def _populate(rng):
+    register_balance_listener()
+    for _ in range(150):
+        db.session.add(Expenses(amount=round(rng.uniform(1, 300), 2), category=rng.choice(CATEGORIES), date=_day(rng), user_id='user-1'))
+        db.session.add(Income(amount=round(rng.uniform(100, 3000), 2), source='Salary', date=_day(rng), user_id='user-1'))
+    # Another user's rows must never show up
+    db.session.add(Expenses(amount=999.0, category='Food', date=START, user_id='user-2'))
+    db.session.commit()
+
+    # Edits move amounts, dates and categories; deletes take rows out
+    expenses = Expenses.query.filter_by(user_id='user-1').all()
+    for expense in rng.sample(expenses, 40):
+        expense.amount = round(rng.uniform(1, 300), 2)
+        expense.date = _day(rng)
+        expense.category = rng.choice(CATEGORIES)
+    db.session.commit()
+    for expense in rng.sample(Expenses.query.filter_by(user_id='user-1').all(), 20):
+        db.session.delete(expense)
+    db.session.commit()
+
+def _brute_total(model, start, end, category=None):
+    query = sa.select(sa.func.coalesce(sa.func.sum(model.amount), 0.0), sa.func.count(model.id)).where(
+        model.user_id == 'user-1', model.date >= start, model.date <= end
+    )
+    if category is not None:
+        query = query.where(model.category == category)
+    amount, count = db.session.execute(query).one()
+    # Sums are added in a different order than the index adds them, so allow a cent of rounding
+    return pytest.approx((round(amount, 2), count), abs=0.01)
+
+def _brute_amount(model, day):
+    return db.session.execute(
+        sa.select(sa.func.coalesce(sa.func.sum(model.amount), 0.0)).where(model.user_id == 'user-1', model.date <= day)
+    ).scalar()
+
+def _check_against_brute_force(rng):
+    for _ in range(50):
+        start, end = sorted((_day(rng), _day(rng)))
+        totals = range_totals('user-1', start, end)
+        for category in CATEGORIES:
+            assert totals.get(('expense', category), (0.0, 0)) == _brute_total(Expenses, start, end, category)
+        assert totals.get(('income', 'Salary'), (0.0, 0)) == _brute_total(Income, start, end)
+
+    points = sorted({_day(rng) for _ in range(20)})
+    for point in running_balance('user-1', points):
+        day = datetime.date.fromisoformat(point['date'])
+        income, expenses = _brute_amount(Income, day), _brute_amount(Expenses, day)
+        assert point['income'] == pytest.approx(income, abs=0.01)
+        assert point['expenses'] == pytest.approx(expenses, abs=0.01)
+        assert point['balance'] == pytest.approx(income - expenses, abs=0.02)
+
+def test_incremental_index_matches_brute_force(app):
+    rng = random.Random(38)
+    _populate(rng)
+    _check_against_brute_force(rng)
+
+def test_rebuilt_index_matches_brute_force(app):
+    rng = random.Random(83)
+    _populate(rng)
+    rebuild_balance_index()
+    _check_against_brute_force(rng)
+
+def test_open_ended_range_covers_everything(app):
+    _populate(random.Random(1))
+    assert range_totals('user-1', kinds=['income'])[('income', 'Salary')] == _brute_total(Income, datetime.date.min, datetime.date.max)
+
+def test_dates_outside_the_index_are_clamped(app):
+    _populate(random.Random(2))
+    everything = range_totals('user-1')
+    assert range_totals('user-1', datetime.date(1900, 1, 1), datetime.date(2999, 12, 31)) == everything
+    assert range_totals('user-1', datetime.date(1900, 1, 1), datetime.date(1960, 1, 1)) == {}
+    assert range_totals('user-1', datetime.date(2200, 1, 1), datetime.date(2300, 1, 1)) == {}
+
+def test_totals_route_checks_the_range(client, headers, user):
+    register_balance_listener()
+    db.session.add(Expenses(amount=25.0, category='Food', date=START, user_id='user-1'))
+    db.session.commit()
+
+    def totals(**params):
+        return client.get('/api/balances/user-1/totals', query_string=params, headers=headers)
+
+    response = totals(start_date='1900-01-01', end_date='2999-12-31')
+    assert response.status_code == 200 and response.json['expenses'] == 25.0
+    response = totals(start_date='2024-01-01', end_date='2023-01-01')
+    assert response.status_code == 400
+    assert response.json['error'] == "start_date must not be after end_date"
+    assert totals(start_date='2023-13-01').status_code == 400
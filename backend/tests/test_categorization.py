@@ -0,0 +1,83 @@
+import time
+import sqlalchemy as sa
+from categorization import DEFAULT_RULES, KeywordMatcher, categorize, categorize_transactions, get_matcher, seed_default_rules
+from config import db
+from models import TransactionCategory
+
+# Plaid amounts: outflows are positive, inflows negative
+OUTFLOW, INFLOW = 12.5, -12.5
+
+def test_highest_priority_wins_over_a_longer_overlapping_keyword():
+    matcher = KeywordMatcher([('uber eats', 'Food', 1, 'any'), ('uber', 'Transport', 10, 'any')])
+    assert matcher.match('UBER EATS order', OUTFLOW)[1] == 'Transport'
+
+def test_keyword_in_the_middle_of_another_is_found():
+    matcher = KeywordMatcher([('payment received', 'Income', 1, 'any'), ('received', 'Savings', 5, 'any')])
+    assert matcher.match('Payment received - thanks', OUTFLOW)[1] == 'Savings'
+
+def test_rules_sharing_a_keyword_are_all_considered():
+    matcher = KeywordMatcher([('transfer', 'Income', 5, 'inflow'), ('transfer', 'Transfer', 1, 'any')])
+    assert matcher.match('Online transfer', INFLOW)[1] == 'Income'
+    assert matcher.match('Online transfer', OUTFLOW)[1] == 'Transfer'
+
+def test_amount_sign_filters_rules():
+    matcher = KeywordMatcher(DEFAULT_RULES)
+    assert categorize(matcher, 'ACME PAYROLL', INFLOW, None) == ('Income', 'rule')
+    assert categorize(matcher, 'ACME PAYROLL', OUTFLOW, None) == ('Expense', 'default')
+    assert categorize(matcher, 'Paycheck', OUTFLOW, 'INCOME') == ('Income', 'plaid')
+
+def test_no_rules_or_no_text():
+    assert KeywordMatcher([]).match('anything', OUTFLOW) is None
+    assert KeywordMatcher(DEFAULT_RULES).match('', OUTFLOW) is None
+
+def test_keywords_match_whole_words_only():
+    matcher = KeywordMatcher(DEFAULT_RULES)
+    for name in ("Sally's Salon", 'Finally Fitness', 'really good pizza', 'TRANSFERWISE FEE'):
+        assert categorize(matcher, name, OUTFLOW, 'TRANSFER') == ('Expense', 'default')
+    assert KeywordMatcher([('uber', 'Transport', 1, 'any')]).match('UBERX trip', OUTFLOW) is None
+    assert KeywordMatcher([('uber', 'Transport', 1, 'any')]).match('Uber eats', OUTFLOW)[1] == 'Transport'
+
+def test_savings_and_ally_only_apply_to_transfers():
+    matcher = KeywordMatcher(DEFAULT_RULES)
+    assert categorize(matcher, 'Ally Bank', OUTFLOW, 'TRANSFER_OUT') == ('Expense', 'default')
+    assert categorize(matcher, 'Ally Bank', OUTFLOW, 'TRANSFER') == ('Savings', 'rule')
+    assert categorize(matcher, 'Savings club dues', OUTFLOW, 'GENERAL_MERCHANDISE') == ('Expense', 'default')
+    assert categorize(matcher, 'To savings', OUTFLOW, 'transfer') == ('Savings', 'rule')
+
+def test_expense_primary_short_circuits_rules():
+    matcher = KeywordMatcher(DEFAULT_RULES)
+    assert categorize(matcher, 'Wire transfer fee', OUTFLOW, 'EXPENSE') == ('Expense', 'plaid')
+    assert categorize(matcher, 'Wire transfer fee', OUTFLOW, None) == ('Savings', 'rule')
+
+def test_seeded_rules_keep_their_plaid_primary(app):
+    seed_default_rules()
+    _, matcher = get_matcher()
+    assert categorize(matcher, 'Ally Bank', OUTFLOW, None) == ('Expense', 'default')
+    assert categorize(matcher, 'Ally Bank', OUTFLOW, 'TRANSFER') == ('Savings', 'rule')
+
+def _plaid(transaction_id, name):
+    return {'transaction_id': transaction_id, 'name': name, 'amount': OUTFLOW, 'personal_finance_category': {'primary': 'GENERAL_MERCHANDISE'}}
+
+def _stored(transaction_id):
+    db.session.expire_all()
+    return db.session.execute(sa.select(TransactionCategory.category).where(TransactionCategory.transaction_id == transaction_id)).scalar()
+
+def test_rule_changes_recategorize_in_the_background(client, headers, user):
+    categorize_transactions('user-1', [_plaid('tx-1', 'Gym membership'), _plaid('tx-2', 'Gym membership')])
+    assert _stored('tx-1') == 'Expense'
+
+    response = client.post('/api/category_rules', json={'keyword': 'gym', 'category': 'Savings'}, headers=headers)
+    assert response.status_code == 202
+
+    # A fetch sees the new rule right away, whether or not the rescan has reached the row
+    assert categorize_transactions('user-1', [_plaid('tx-1', 'Gym membership')])[0]['category'] == 'Savings'
+    deadline = time.monotonic() + 10
+    while _stored('tx-2') != 'Savings' and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert _stored('tx-2') == 'Savings'
+
+    assert client.delete(f"/api/category_rules/{response.json['id']}", headers=headers).status_code == 202
+    deadline = time.monotonic() + 10
+    while _stored('tx-2') != 'Expense' and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert _stored('tx-2') == 'Expense'
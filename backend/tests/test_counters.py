@@ -0,0 +1,92 @@
+import datetime
+import threading
+import pytest
+from config import db
+from counters import DeltaConflict, apply_deltas
+from models import Goal
+
+GOAL = {'target_amount': 100.0, 'current_amount': 0.0, 'deadline': '2030-01-01', 'user_id': 'user-1'}
+
+def _goal(client, id):
+    return client.get(f'/goals/{id}').json
+
+def test_delta_increments_and_bumps_version(client, user):
+    client.post('/goals', json=GOAL)
+
+    response = client.patch('/goals/1/current_amount', json={'delta': 25.0})
+    assert response.status_code == 200
+    assert response.json == {'id': 1, 'current_amount': 25.0, 'version': 1}
+    assert _goal(client, 1)['current_amount'] == 25.0
+
+def test_expected_version_conflict(client, user):
+    client.post('/goals', json=GOAL)
+    assert client.patch('/goals/1/current_amount', json={'delta': 10.0, 'expected_version': 0}).status_code == 200
+
+    # A second writer still holding version 0 is turned away and told the current version
+    response = client.patch('/goals/1/current_amount', json={'delta': 10.0, 'expected_version': 0})
+    assert response.status_code == 409
+    assert response.json['version'] == 1
+    assert response.json['reason'] == 'version_mismatch'
+    assert _goal(client, 1)['current_amount'] == 10.0
+
+    # A full PUT moves the version on as well
+    client.put('/goals/1', json={**GOAL, 'current_amount': 50.0})
+    assert client.patch('/goals/1/current_amount', json={'delta': 1.0, 'expected_version': 1}).status_code == 409
+    assert client.patch('/goals/1/current_amount', json={'delta': 1.0, 'expected_version': 2}).status_code == 200
+
+def test_missing_row_and_invalid_delta(client, user):
+    assert client.patch('/goals/9/current_amount', json={'delta': 1.0}).status_code == 404
+    assert client.patch('/goals/9/current_amount', json={'delta': 'lots'}).status_code == 400
+
+def test_batch_is_all_or_nothing(client, user):
+    client.post('/goals', json=GOAL)
+    client.post('/goals', json=GOAL)
+
+    response = client.patch('/goals/current_amount', json={'updates': [
+        {'id': 1, 'delta': 5.0}, {'id': 2, 'delta': 5.0, 'expected_version': 3},
+    ]})
+    assert response.status_code == 409
+    assert [conflict['id'] for conflict in response.json['conflicts']] == [2]
+    assert _goal(client, 1)['current_amount'] == 0.0
+
+    response = client.patch('/goals/current_amount', json={'updates': [{'id': 2, 'delta': 5.0}, {'id': 1, 'delta': 7.0}]})
+    assert response.status_code == 200
+    assert sorted((r['id'], r['current_amount']) for r in response.json['results']) == [(1, 7.0), (2, 5.0)]
+
+def test_reaching_the_target_through_a_delta_awards_xp(client, headers, user):
+    client.post('/goals', json=GOAL)
+    client.patch('/goals/1/current_amount', json={'delta': 100.0})
+
+    assert client.get('/api/xp/user-1', headers=headers).json['completed_goals'] == 1
+
+def test_concurrent_deltas_are_not_lost(app, user):
+    db.session.add(Goal(target_amount=1000.0, current_amount=0.0, deadline=datetime.date(2030, 1, 1), user_id='user-1'))
+    db.session.commit()
+    errors = []
+
+    def increment():
+        with app.app_context():
+            try:
+                for _ in range(10):
+                    apply_deltas(Goal, 'current_amount', [{'id': 1, 'delta': 1.0}])
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=increment) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    db.session.expire_all()
+    goal = db.session.get(Goal, 1)
+    assert (goal.current_amount, goal.version) == (80.0, 80)
+
+def test_non_counter_column_is_rejected(app):
+    with pytest.raises(ValueError):
+        apply_deltas(Goal, 'target_amount', [{'id': 1, 'delta': 1.0}])
+    with pytest.raises(DeltaConflict):
+        apply_deltas(Goal, 'current_amount', [{'id': 1, 'delta': 1.0}])
@@ -0,0 +1,70 @@
+import time
+import pytest
+import entity_cache
+from entity_cache import EntityCache, LRUCache
+from models import Goal
+
+@pytest.fixture
+def backend(monkeypatch):
+    monkeypatch.setattr(entity_cache, 'ENTITY_CACHE', True)
+    # One backend shared by every EntityCache below, as Redis is shared by the workers
+    return LRUCache(100, 60)
+
+class Loader:
+    def __init__(self, *values, during=None):
+        self.values, self.calls, self.during = list(values), 0, during
+
+    def __call__(self):
+        self.calls += 1
+        if self.during:
+            self.during()
+        return self.values[min(self.calls, len(self.values)) - 1]
+
+def test_hit_miss_and_invalidate(backend):
+    cache = EntityCache(backend)
+    load = Loader({'id': 1, 'current_amount': 10.0}, {'id': 1, 'current_amount': 20.0})
+
+    assert cache.fetch(Goal, 1, load) == {'id': 1, 'current_amount': 10.0}
+    assert cache.fetch(Goal, 1, load) == {'id': 1, 'current_amount': 10.0}
+    assert load.calls == 1
+
+    cache.invalidate(Goal, 1)
+    assert cache.fetch(Goal, 1, load) == {'id': 1, 'current_amount': 20.0}
+    assert load.calls == 2
+    assert cache.summary()['models']['Goals'] == {'hits': 1, 'misses': 2, 'invalidations': 1, 'hit_ratio': round(1 / 3, 4)}
+
+def test_load_overlapping_another_workers_invalidation_is_not_stored(backend, monkeypatch):
+    worker_a, worker_b = EntityCache(backend), EntityCache(backend)
+    # Worker A reads the row, then worker B commits a change and invalidates before A stores its copy
+    stale = Loader({'current_amount': 10.0}, during=lambda: worker_b.invalidate(Goal, 1))
+
+    assert worker_a.fetch(Goal, 1, stale) == {'current_amount': 10.0}
+    fresh = Loader({'current_amount': 20.0})
+    assert worker_a.fetch(Goal, 1, fresh) == {'current_amount': 20.0}
+    assert worker_b.fetch(Goal, 1, fresh) == {'current_amount': 20.0}
+    assert fresh.calls == 2
+
+    # Once the tombstone is gone, loads are cached again
+    monkeypatch.setattr(entity_cache, 'ENTITY_CACHE_TOMBSTONE_S', 0.05)
+    worker_b.invalidate(Goal, 1)
+    time.sleep(0.1)
+    assert worker_a.fetch(Goal, 1, fresh) == {'current_amount': 20.0}
+    assert worker_b.fetch(Goal, 1, fresh) == {'current_amount': 20.0}
+    assert fresh.calls == 3
+
+def test_disabled_cache_always_loads(backend, monkeypatch):
+    monkeypatch.setattr(entity_cache, 'ENTITY_CACHE', False)
+    cache = EntityCache(backend)
+    load = Loader({'id': 1})
+    cache.fetch(Goal, 1, load)
+    cache.fetch(Goal, 1, load)
+    assert load.calls == 2 and len(backend) == 0
+
+def test_lru_evicts_the_least_recently_used():
+    lru = LRUCache(2, 60)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    lru.get('a')
+    lru.set('c', 3)
+    assert (lru.get('a'), lru.get('b'), lru.get('c')) == (1, None, 3)
+    assert not lru.add('a', 9) and lru.get('a') == 1
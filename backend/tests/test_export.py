@@ -0,0 +1,64 @@
+import csv
+import datetime
+import io
+import json
+import export_utils
+from config import db
+from export_utils import encode_cursor
+from models import Expenses
+
+def _expenses(user_id, count):
+    db.session.add_all(
+        Expenses(amount=float(i), category='Food', date=datetime.date(2024, 1, 1) + datetime.timedelta(days=i % 300),
+                 description=f'expense {i}', user_id=user_id)
+        for i in range(count)
+    )
+    db.session.commit()
+
+def _export(client, headers, **params):
+    return client.get('/api/export/expenses', query_string={'user_id': 'user-1', **params}, headers=headers)
+
+def _ids(response, fmt):
+    body = response.get_data(as_text=True)
+    if fmt == 'ndjson':
+        return [json.loads(line)['id'] for line in body.splitlines()]
+    return [int(row['id']) for row in csv.DictReader(io.StringIO(body))]
+
+def test_paged_export_resumes_from_the_cursor(client, headers, user, monkeypatch):
+    # Several yield_per batches per page
+    monkeypatch.setattr(export_utils, 'EXPORT_BATCH_SIZE', 7)
+    _expenses('user-1', 100)
+    _expenses('user-2', 10)
+    expected = sorted(db.session.execute(db.select(Expenses.id).where(Expenses.user_id == 'user-1')).scalars())
+
+    for fmt in ('csv', 'ndjson'):
+        seen, cursor = [], None
+        while True:
+            params = {'format': fmt, 'limit': 30, **({'cursor': cursor} if cursor else {})}
+            response = _export(client, headers, **params)
+            assert response.status_code == 200
+            seen += _ids(response, fmt)
+            cursor = response.headers.get('X-Next-Cursor')
+            if not cursor:
+                break
+        assert seen == expected
+
+def test_full_export_streams_every_row(client, headers, user, monkeypatch):
+    monkeypatch.setattr(export_utils, 'EXPORT_BATCH_SIZE', 7)
+    _expenses('user-1', 50)
+
+    response = _export(client, headers, format='csv')
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 50
+    assert rows[3] == {'id': '4', 'amount': '3.0', 'category': 'Food', 'date': '2024-01-04', 'description': 'expense 3'}
+
+def test_cursor_and_key_are_checked(client, headers, user):
+    _expenses('user-1', 5)
+
+    other_user = encode_cursor('expenses', 'user-2', 1)
+    assert _export(client, headers, cursor=other_user).status_code == 400
+    other_resource = encode_cursor('income', 'user-1', 1)
+    assert _export(client, headers, cursor=other_resource).status_code == 400
+    assert _export(client, headers, cursor='not-a-cursor').status_code == 400
+    assert _export(client, {'key': 'wrong-key'}).status_code == 403
+    assert _export(client, {}).status_code == 403
@@ -0,0 +1,119 @@
+import datetime
+import os
+import pytest
+import requests
+import firestore_mirror
+from config import db
+from firestore_mirror import FIRESTORE_BATCH_SIZE, FirestoreMirror, firestore_client, register_firestore_listener
+from models import Goal
+
+# Runs against the local emulator: firebase emulators:start --only firestore, FIRESTORE_EMULATOR_HOST=localhost:8080
+pytestmark = pytest.mark.skipif(not os.getenv('FIRESTORE_EMULATOR_HOST'), reason="FIRESTORE_EMULATOR_HOST is not set")
+
+class RecordingBatch:
+    def __init__(self, batch, log):
+        self.batch, self.log, self.ops = batch, log, []
+
+    def set(self, reference, document):
+        self.ops.append(('set', reference.path))
+        self.batch.set(reference, document)
+
+    def delete(self, reference):
+        self.ops.append(('delete', reference.path))
+        self.batch.delete(reference)
+
+    def commit(self):
+        self.log.append(self.ops)
+        return self.batch.commit()
+
+class RecordingClient:
+    # The emulator client, with every committed batch's operations kept in `batches`
+    def __init__(self, client):
+        self.client, self.batches = client, []
+
+    def batch(self):
+        return RecordingBatch(self.client.batch(), self.batches)
+
+    def document(self, path):
+        return self.client.document(path)
+
+@pytest.fixture
+def mirror(app, monkeypatch):
+    pytest.importorskip('google.cloud.firestore')
+    client = firestore_client()
+    requests.delete(
+        f"http://{os.environ['FIRESTORE_EMULATOR_HOST']}/emulator/v1/projects/{client.project}/databases/(default)/documents"
+    ).raise_for_status()
+
+    monkeypatch.setattr(firestore_mirror, 'FIRESTORE_MIRROR', True)
+    register_firestore_listener()
+    recording = RecordingClient(client)
+    mirror = FirestoreMirror(app, lambda: recording)
+    # Changes stay pending until the test flushes them
+    mirror._ensure_started = lambda: None
+    monkeypatch.setattr(firestore_mirror, 'mirror', mirror)
+    return mirror
+
+# Every flush also rewrites the progress document of the users it touched
+PROGRESS = 'users/user-1/progress/xp'
+
+def _flush(mirror):
+    changes, mirror.pending = mirror.pending, {}
+    mirror.flush(changes)
+    return mirror.client.batches
+
+def _goal(current=0.0):
+    return Goal(target_amount=100.0, current_amount=current, deadline=datetime.date(2030, 1, 1), user_id='user-1')
+
+def _stored(mirror, path):
+    snapshot = mirror.client.document(path).get()
+    return snapshot.to_dict() if snapshot.exists else None
+
+def test_rolled_back_changes_are_never_sent(mirror):
+    db.session.add(_goal())
+    db.session.flush()
+    db.session.rollback()
+    assert mirror.pending == {}
+
+    goal = _goal()
+    db.session.add(goal)
+    db.session.commit()
+    assert list(mirror.pending) == [('goals', goal.id)]
+
+    batches = _flush(mirror)
+    assert batches == [[('set', f'users/user-1/goals/{goal.id}'), ('set', PROGRESS)]]
+
+def test_repeated_changes_are_coalesced(mirror):
+    goal = _goal()
+    db.session.add(goal)
+    db.session.commit()
+    for amount in (10.0, 20.0, 30.0, 40.0):
+        goal.current_amount = amount
+        db.session.commit()
+
+    batches = _flush(mirror)
+    assert batches == [[('set', f'users/user-1/goals/{goal.id}'), ('set', PROGRESS)]]
+    assert _stored(mirror, f'users/user-1/goals/{goal.id}')['current_amount'] == 40.0
+
+def test_batches_stay_within_the_write_limit(mirror):
+    db.session.add_all(_goal() for _ in range(1200))
+    db.session.commit()
+
+    batches = _flush(mirror)
+    # 1200 goal documents plus the user's progress document
+    assert [len(ops) for ops in batches] == [FIRESTORE_BATCH_SIZE, FIRESTORE_BATCH_SIZE, 201]
+    assert len(list(mirror.client.client.collection('users/user-1/goals').stream())) == 1200
+
+def test_deleted_rows_become_deletes(mirror):
+    goal = _goal()
+    db.session.add(goal)
+    db.session.commit()
+    _flush(mirror)
+    path = f'users/user-1/goals/{goal.id}'
+    assert _stored(mirror, path) is not None
+
+    db.session.delete(goal)
+    db.session.commit()
+    batches = _flush(mirror)
+    assert batches[-1] == [('delete', path), ('set', PROGRESS)]
+    assert _stored(mirror, path) is None
@@ -0,0 +1,65 @@
+import datetime
+import pytest
+import forecast
+from config import db
+from models import AccessToken, RecurringStream, SpendingObservation
+from plaid_simulator import ACCESS_TOKEN_PREFIX, PlaidSimulator
+
+ACCESS_TOKEN = f'{ACCESS_TOKEN_PREFIX}forecast'
+
+@pytest.fixture
+def simulator(monkeypatch):
+    # Offline Plaid whatever PLAID_ENV is, with the checking balance pinned
+    simulator = PlaidSimulator()
+    checking = simulator._item(ACCESS_TOKEN)['accounts'][0]
+    checking['balances'] = dict(checking['balances'], available=500.0, current=500.0)
+    monkeypatch.setattr(forecast, 'client', simulator)
+    return simulator
+
+def _spend(today, per_day, days):
+    db.session.add_all(
+        SpendingObservation(user_id='user-1', kind='transaction', ref=f'tx-{i}', category='FOOD_AND_DRINK',
+                            merchant='Corner Grocer', amount=per_day, date=today - datetime.timedelta(days=i))
+        for i in range(days)
+    )
+
+def test_projected_low_balance_day(client, headers, user, simulator):
+    today = datetime.date.today()
+    db.session.add(AccessToken(user_id='user-1', access_token=ACCESS_TOKEN, item_id='item-simulator-forecast'))
+    # $10 a day of everyday spending, and $200 rent due in ten days (not counted in the daily rate)
+    _spend(today, 10.0, 30)
+    db.session.add(SpendingObservation(user_id='user-1', kind='transaction', ref='rent', category='RENT_AND_UTILITIES',
+                                       merchant='Landlord', amount=200.0, date=today - datetime.timedelta(days=20)))
+    db.session.add(RecurringStream(user_id='user-1', merchant='landlord', frequency='monthly', average_amount=200.0,
+                                   amount_variation=0.0, occurrences=6, last_date=today - datetime.timedelta(days=20),
+                                   next_date=today + datetime.timedelta(days=10), is_subscription=True, is_active=True,
+                                   history='[]'))
+    db.session.commit()
+
+    response = client.get('/api/forecast/user-1', query_string={'days': 60}, headers=headers)
+    assert response.status_code == 200
+    result = response.json
+    assert result['daily_spending'] == 10.0
+    assert result['spending_by_category'] == {'FOOD_AND_DRINK': 10.0}
+    assert result['upcoming'][0] == {'date': (today + datetime.timedelta(days=10)).isoformat(), 'merchant': 'landlord', 'amount': -200.0}
+
+    # Only the depository account is projected: 500 - 10/day - 200 on day 10 first drops below zero on day 30
+    [account] = result['accounts']
+    assert (account['name'], account['balance'], account['primary']) == ('Simulated Checking', 500.0, True)
+    assert account['projected'][9] == 400.0 and account['projected'][10] == 190.0
+    assert account['first_low_date'] == (today + datetime.timedelta(days=30)).isoformat()
+    assert account['before_income'] is True
+    assert account['low'] == account['projected']
+
+def test_steady_balance_has_no_low_day(app, simulator):
+    today = datetime.date.today()
+    db.session.add(AccessToken(user_id='user-1', access_token=ACCESS_TOKEN, item_id='item-simulator-forecast'))
+    _spend(today, 1.0, 30)
+    db.session.commit()
+
+    [account] = forecast.forecast('user-1', 90)['accounts']
+    assert account['first_low_date'] is None
+    assert account['min_balance'] == 410.0
+
+def test_forecast_needs_a_linked_account(client, headers, user):
+    assert client.get('/api/forecast/user-1', headers=headers).status_code == 404
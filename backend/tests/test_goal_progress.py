@@ -0,0 +1,67 @@
+import sqlalchemy as sa
+from config import db
+from goal_progress import check_goal_progress
+from models import Goal, Savings
+
+GOAL = {'target_amount': 500.0, 'current_amount': 0.0, 'deadline': '2030-01-01', 'user_id': 'user-1'}
+
+def _savings(amount, goal_id):
+    return {'amount': amount, 'goal_name': 'Trip', 'target_amount': 500.0, 'date': '2024-05-01', 'user_id': 'user-1', 'goal_id': goal_id}
+
+def _progress(client, goal_id):
+    response = client.get(f'/goals/{goal_id}/progress')
+    assert response.status_code == 200
+    return response.json['saved_amount'], response.json['savings_count']
+
+def test_counters_follow_savings_create_update_and_delete(client, user):
+    assert client.post('/goals', json=GOAL).status_code == 201
+    assert client.post('/goals', json=GOAL).status_code == 201
+
+    for amount in (50.0, 25.0, 10.0):
+        assert client.post('/savings', json=_savings(amount, 1)).status_code == 201
+    assert _progress(client, 1) == (85.0, 3)
+
+    # Change an amount, then move an entry to the other goal
+    assert client.put('/savings/1', json=_savings(70.0, 1)).status_code == 200
+    assert _progress(client, 1) == (105.0, 3)
+    assert client.put('/savings/2', json=_savings(25.0, 2)).status_code == 200
+    assert _progress(client, 1) == (80.0, 2)
+    assert _progress(client, 2) == (25.0, 1)
+
+    assert client.delete('/savings/3').status_code == 200
+    assert _progress(client, 1) == (70.0, 1)
+    assert check_goal_progress() == []
+
+def test_unlinked_savings_do_not_count(client, user):
+    client.post('/goals', json=GOAL)
+    client.post('/savings', json=_savings(40.0, 1))
+    client.put('/savings/1', json=_savings(40.0, None))
+
+    assert _progress(client, 1) == (0.0, 0)
+
+def test_repair_fixes_drift(client, user):
+    client.post('/goals', json=GOAL)
+    client.post('/savings', json=_savings(30.0, 1))
+    client.post('/savings', json=_savings(20.0, 1))
+    db.session.execute(sa.update(Goal).where(Goal.id == 1).values(saved_amount=999.0, savings_count=7))
+    db.session.commit()
+
+    assert check_goal_progress() == [{'id': 1, 'saved_amount': 50.0, 'savings_count': 2}]
+    check_goal_progress(repair=True)
+    assert _progress(client, 1) == (50.0, 2)
+    assert check_goal_progress() == []
+
+def test_deleting_a_goal_unlinks_its_savings(client, user):
+    client.post('/goals', json=GOAL)
+    client.post('/savings', json=_savings(30.0, 1))
+
+    assert client.delete('/goals/1').status_code == 200
+    db.session.expire_all()
+    assert db.session.get(Savings, 1).goal_id is None
+    assert client.get('/savings/1').json['goal_id'] is None
+
+    # The next goal may reuse the id on SQLite; it must start empty
+    client.post('/goals', json=GOAL)
+    new_goal = db.session.execute(sa.select(Goal.id)).scalar()
+    assert _progress(client, new_goal) == (0.0, 0)
+    assert check_goal_progress() == []
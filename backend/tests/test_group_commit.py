@@ -0,0 +1,82 @@
+import datetime
+import threading
+from concurrent.futures import Future
+import pytest
+import sqlalchemy.exc
+import group_commit
+from config import db
+from group_commit import GroupCommitter
+from models import Expenses
+
+def _expense(amount):
+    return Expenses(amount=amount, category='Food', date=datetime.date(2024, 5, 1), user_id='user-1')
+
+def _add(obj):
+    return lambda session: session.add(obj)
+
+def _batch(*operations):
+    return [(operation, Future()) for operation in operations]
+
+def _amounts():
+    return sorted(db.session.execute(db.select(Expenses.amount)).scalars())
+
+def test_batch_commits_every_write_in_one_transaction(app):
+    batch = _batch(_add(_expense(1)), _add(_expense(2)), _add(_expense(3)))
+    GroupCommitter(app)._flush(batch)
+
+    assert [future.result(timeout=0) for _, future in batch] == [True, True, True]
+    assert _amounts() == [1, 2, 3]
+
+def test_failed_batch_falls_back_to_one_commit_per_write(app):
+    # amount is NOT NULL, so the second write fails the batch transaction
+    batch = _batch(_add(_expense(1)), _add(_expense(None)), _add(_expense(3)))
+    GroupCommitter(app)._flush(batch)
+
+    good, bad, other = (future for _, future in batch)
+    assert good.result(timeout=0) is True
+    assert other.result(timeout=0) is True
+    with pytest.raises(sqlalchemy.exc.IntegrityError):
+        bad.result(timeout=0)
+    assert _amounts() == [1, 3]
+
+def test_cancelled_write_is_never_applied(app):
+    batch = _batch(_add(_expense(1)), _add(_expense(2)))
+    batch[1][1].cancel()
+    GroupCommitter(app)._flush(batch)
+
+    assert batch[0][1].result(timeout=0) is True
+    assert _amounts() == [1]
+
+def test_concurrent_submits_share_the_flusher(app):
+    committer = GroupCommitter(app, max_rows=8, max_wait_ms=50)
+    errors = []
+
+    def submit(amount):
+        try:
+            committer.submit(_add(_expense(amount)))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=submit, args=(amount,)) for amount in [1, 2, None, 4, 5]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert len(errors) == 1 and isinstance(errors[0], sqlalchemy.exc.IntegrityError)
+    db.session.expire_all()
+    assert _amounts() == [1, 2, 4, 5]
+
+def test_timed_out_write_is_withdrawn(app, monkeypatch):
+    monkeypatch.setattr(group_commit, 'GROUP_COMMIT_TIMEOUT_S', 0.05)
+    committer = GroupCommitter(app)
+    # A flusher that never drains the queue, so the write is still waiting when the request gives up
+    committer.thread = threading.Thread(target=threading.Event().wait, daemon=True)
+    committer.thread.start()
+
+    with pytest.raises(group_commit.TimeoutError):
+        committer.submit(_add(_expense(1)))
+    operation, future = committer.pending.get_nowait()
+    assert future.cancelled()
+    committer._flush([(operation, future)])
+    assert _amounts() == []
@@ -0,0 +1,85 @@
+import datetime
+import threading
+import sqlalchemy as sa
+import link_token_pool
+from config import db
+from link_token_pool import LINK_TOKEN_POOL_MIN_TTL_S, pool, refill, take_link_token
+from models import AccessToken
+
+class FakeResponse:
+    def __init__(self, link_token):
+        self.link_token = link_token
+
+    def to_dict(self):
+        return {'link_token': self.link_token, 'expiration': None}
+
+def _pooled(user_id, link_token, expires_in):
+    db.session.execute(pool.insert().values(
+        user_id=user_id, link_token=link_token,
+        expiration=link_token_pool._utcnow() + datetime.timedelta(seconds=expires_in),
+    ))
+    db.session.commit()
+
+def _left():
+    return sorted(db.session.execute(sa.select(pool.c.link_token)).scalars())
+
+def _quiet(monkeypatch):
+    # No background refills while the test hands tokens out
+    demand = []
+    monkeypatch.setattr(link_token_pool.refiller, 'note_demand', demand.append)
+    return demand
+
+def test_each_token_is_handed_out_once(app, monkeypatch):
+    _quiet(monkeypatch)
+    for i in range(5):
+        _pooled('user-1', f'link-{i}', 3600 + i)
+    handed, errors = [], []
+
+    def claim():
+        with app.app_context():
+            try:
+                token = take_link_token('user-1')
+                if token:
+                    handed.append(token['link_token'])
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=claim) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(handed) == [f'link-{i}' for i in range(5)]
+    assert _left() == []
+
+def test_tokens_about_to_expire_are_skipped(app, monkeypatch):
+    demand = _quiet(monkeypatch)
+    _pooled('user-1', 'expiring', LINK_TOKEN_POOL_MIN_TTL_S - 60)
+    _pooled('user-2', 'other-user', 3600)
+
+    assert take_link_token('user-1') is None
+    assert demand == ['user-1']
+    _pooled('user-1', 'fresh', 3600)
+    token = take_link_token('user-1')
+    assert token['link_token'] == 'fresh' and token['expiration'].tzinfo is datetime.timezone.utc
+    assert _left() == ['expiring', 'other-user']
+
+def test_refill_drops_expiring_tokens_and_tops_up_active_users(app, monkeypatch):
+    minted = []
+    monkeypatch.setattr(link_token_pool, 'call_plaid', lambda method, request: minted.append(request.user.client_user_id) or FakeResponse(f'new-{len(minted)}'))
+    monkeypatch.setattr(link_token_pool, 'LINK_TOKEN_POOL_RETURNING', True)
+    monkeypatch.setattr(link_token_pool.refiller, 'demand', {'user-1': float('-inf'), 'user-2': float('inf')})
+    db.session.add(AccessToken(user_id='user-3', access_token='access-3', item_id='item-3'))
+    db.session.add(AccessToken(user_id='user-2', access_token='access-2', item_id='item-2'))
+    db.session.commit()
+    _pooled('user-2', 'expiring', 60)
+
+    # user-1's demand is long past; user-2 asked recently and user-3 has a linked bank
+    assert refill() == 2
+    assert minted == ['user-2', 'user-3']
+    assert _left() == ['new-1', 'new-2']
+    assert refill() == 0
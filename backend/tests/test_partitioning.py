@@ -0,0 +1,87 @@
+import datetime
+import pytest
+import sqlalchemy as sa
+import partitioning
+from config import db
+from models import Expenses
+from partitioning import add_months, archive_cold_partitions, iter_archived_rows, month_start, partition_name, range_source, seal_closed_months
+
+THIS_MONTH = month_start(datetime.date.today())
+# Sealed but kept, and old enough to be archived
+RECENT, COLD = add_months(THIS_MONTH, -3), add_months(THIS_MONTH, -30)
+
+@pytest.fixture
+def partitioned(app, monkeypatch):
+    if db.engine.dialect.name != 'sqlite':
+        pytest.skip("shard tables are the SQLite layout")
+    monkeypatch.setattr(partitioning, 'PARTITIONED_STORAGE', True)
+
+def _add(user_id, day, amount):
+    expense = Expenses(amount=amount, category='Food', date=day, user_id=user_id)
+    db.session.add(expense)
+    db.session.commit()
+    return expense.id
+
+def _visible(user_id, start_date=None, end_date=None):
+    source = range_source(Expenses, start_date, end_date)
+    query = sa.select(source.c.id).where(source.c.user_id == user_id)
+    if start_date:
+        query = query.where(source.c.date >= start_date)
+    if end_date:
+        query = query.where(source.c.date <= end_date)
+    return sorted(db.session.execute(query).scalars())
+
+def _tables():
+    return set(sa.inspect(db.engine).get_table_names())
+
+def test_sealed_months_stay_visible(partitioned):
+    ids = [_add('user-1', day, 10.0) for day in (COLD, RECENT, RECENT + datetime.timedelta(days=3), THIS_MONTH)]
+    other = _add('user-2', RECENT, 5.0)
+
+    assert seal_closed_months(db.engine) == 4
+    assert {partition_name('Expenses', COLD), partition_name('Expenses', RECENT)} <= _tables()
+    # Only the open month is left in the live table
+    assert db.session.execute(sa.select(Expenses.id)).scalars().all() == [ids[3]]
+
+    assert _visible('user-1') == ids
+    assert _visible('user-1', RECENT, RECENT + datetime.timedelta(days=1)) == [ids[1]]
+    assert _visible('user-2') == [other]
+    # Sealing twice moves nothing and duplicates nothing
+    assert seal_closed_months(db.engine) == 0
+    assert _visible('user-1') == ids
+
+def test_new_rows_never_reuse_a_sealed_id(partitioned):
+    sealed = [_add('user-1', RECENT, 10.0) for _ in range(3)]
+    seal_closed_months(db.engine)
+
+    assert _add('user-1', THIS_MONTH, 10.0) > max(sealed)
+
+def test_archived_months_move_to_compressed_chunks(partitioned):
+    cold = [_add('user-1', COLD + datetime.timedelta(days=day), 10.0 + day) for day in range(3)]
+    other = _add('user-2', COLD, 1.0)
+    recent = _add('user-1', RECENT, 10.0)
+    seal_closed_months(db.engine)
+
+    assert archive_cold_partitions(db.engine, 24) == [partition_name('Expenses', COLD)]
+    assert partition_name('Expenses', COLD) not in _tables()
+    assert partition_name('Expenses', RECENT) in _tables()
+
+    # Live queries see what's left; the archive holds the rest, per user
+    assert _visible('user-1') == [recent]
+    archived = list(iter_archived_rows(db.engine, Expenses, 'user-1'))
+    assert [row['id'] for row in archived] == cold
+    assert [row['amount'] for row in archived] == [10.0, 11.0, 12.0]
+    assert archived[0]['date'] == COLD
+    assert [row['id'] for row in iter_archived_rows(db.engine, Expenses, 'user-2')] == [other]
+
+    one_day = COLD + datetime.timedelta(days=1)
+    assert [row['id'] for row in iter_archived_rows(db.engine, Expenses, 'user-1', one_day, one_day)] == [cold[1]]
+    assert archive_cold_partitions(db.engine, 24) == []
+
+def test_maintenance_script_runs_only_from_main(partitioned, capsys):
+    import partition_maintenance
+    assert capsys.readouterr().out == ''
+
+    _add('user-1', RECENT, 10.0)
+    partition_maintenance.main(['maintain'])
+    assert 'Sealed 1 row(s)' in capsys.readouterr().out
@@ -0,0 +1,45 @@
+import time
+import pytest
+from flask import Flask
+import profiling
+from profiling import load_profiles, merge, register_profiler
+
+def busy_view():
+    # Keeps the request on-CPU long enough for several samples
+    deadline = time.perf_counter() + 0.2
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(1000))
+    return {'total': total}
+
+@pytest.fixture
+def profiled_app(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILE_DIR', str(tmp_path))
+    monkeypatch.setattr(profiling, 'PROFILE_SAMPLE_RATE', 1.0)
+    flask_app = Flask(__name__)
+    flask_app.add_url_rule('/api/busy/<int:n>', 'busy', lambda n: busy_view())
+    return flask_app
+
+def test_profiler_is_off_by_default(profiled_app, tmp_path):
+    register_profiler(profiled_app)
+
+    assert 'request_profiler' not in profiled_app.extensions
+    assert not profiled_app.before_request_funcs and not profiled_app.teardown_request_funcs
+    assert profiled_app.test_client().get('/api/busy/1').status_code == 200
+    assert list(tmp_path.iterdir()) == []
+
+def test_profiled_request_writes_folded_stacks(profiled_app, tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'REQUEST_PROFILING', True)
+    register_profiler(profiled_app)
+    assert profiled_app.test_client().get('/api/busy/7').status_code == 200
+
+    [(name, meta, stacks)] = list(load_profiles(str(tmp_path)))
+    assert name.endswith('.folded')
+    assert (meta['path'], meta['route'], meta['status'], meta['reason']) == ('/api/busy/7', '/api/busy/<int:n>', 200, 'sampled')
+    assert meta['duration_ms'] >= 200 and meta['samples'] == sum(stacks.values()) > 0
+    # Root-first frames down to the view, labelled relative to the backend
+    assert any(stack.split(';')[-1].startswith('busy_view (tests/test_profiling.py:') for stack in stacks)
+
+    merged = merge(load_profiles(str(tmp_path)))
+    assert all(stack.startswith('GET /api/busy/<int:n>;') for stack in merged)
+    assert list(load_profiles(str(tmp_path), route='/api/other')) == []
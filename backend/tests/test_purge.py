@@ -0,0 +1,121 @@
+import datetime
+import time
+import pytest
+import sqlalchemy as sa
+import purge
+from config import db
+from models import AccessToken, Expenses, Goal, Savings, User, UserPurge
+from purge import PurgeWorker, claim_job, record_job, run_purge
+
+@pytest.fixture
+def plaid(monkeypatch):
+    # item_remove calls, without reaching Plaid
+    removed = []
+    monkeypatch.setattr(purge, 'call_plaid', lambda method, request: removed.append(request.access_token))
+    return removed
+
+@pytest.fixture
+def steps(monkeypatch):
+    # Records which steps run; a step named in `fail` raises once
+    ran, fail = [], set()
+
+    def recorded(name, step):
+        def run(user_id):
+            ran.append(name)
+            if name in fail:
+                fail.discard(name)
+                raise RuntimeError(f"{name} is unavailable")
+            return step(user_id)
+        return run
+
+    monkeypatch.setattr(purge, 'STEPS', tuple((name, recorded(name, step)) for name, step in purge.STEPS))
+    return ran, fail
+
+def _populate():
+    db.session.add_all([
+        User(id='user-1', name='Purged', email='a@example.com', phone='5550100'),
+        User(id='user-2', name='Kept', email='b@example.com', phone='5550101'),
+        AccessToken(user_id='user-1', access_token='access-1', item_id='item-1'),
+    ])
+    for user_id in ('user-1', 'user-2'):
+        db.session.add(Goal(target_amount=100.0, current_amount=0.0, deadline=datetime.date(2030, 1, 1), user_id=user_id))
+        for day in range(5):
+            db.session.add(Expenses(amount=10.0, category='Food', date=datetime.date(2024, 5, 1 + day), user_id=user_id))
+    db.session.commit()
+    # user-2 saves towards user-1's goal
+    db.session.add(Savings(amount=5.0, goal_name='Shared', target_amount=100.0, date=datetime.date(2024, 5, 1), user_id='user-2', goal_id=1))
+    db.session.commit()
+
+def _rows(model, column, user_id):
+    return db.session.execute(sa.select(sa.func.count()).select_from(model).where(getattr(model, column) == user_id)).scalar()
+
+def test_purge_removes_only_the_users_data(app, plaid):
+    _populate()
+    record_job('user-1')
+    job = run_purge('user-1')
+
+    assert job.status == 'done'
+    assert plaid == ['access-1']
+    for model, column in ((User, 'id'), (AccessToken, 'user_id'), (Goal, 'user_id'), (Expenses, 'user_id')):
+        assert _rows(model, column, 'user-1') == 0
+    assert [_rows(User, 'id', 'user-2'), _rows(Goal, 'user_id', 'user-2'), _rows(Expenses, 'user_id', 'user-2')] == [1, 1, 5]
+    # The other user's savings survive, unlinked from the purged goal
+    assert db.session.execute(sa.select(Savings.goal_id).where(Savings.user_id == 'user-2')).scalar_one() is None
+
+def test_failed_purge_resumes_at_the_failed_step(app, plaid, steps):
+    ran, fail = steps
+    _populate()
+    fail.add('Expenses')
+
+    record_job('user-1')
+    job = run_purge('user-1')
+    assert (job.status, job.step) == ('failed', 'Expenses')
+    assert 'Expenses is unavailable' in job.error
+    assert _rows(Goal, 'user_id', 'user-1') == 0
+    assert _rows(Expenses, 'user_id', 'user-1') == 5
+
+    first_run = list(ran)
+    ran.clear()
+    record_job('user-1')
+    job = run_purge('user-1')
+    assert job.status == 'done'
+    # Everything before the failed step ran once; the resumed run starts at it
+    assert ran[0] == 'Expenses' and set(first_run[:-1]).isdisjoint(ran)
+    assert _rows(Expenses, 'user_id', 'user-1') == 0
+    assert _rows(User, 'id', 'user-1') == 0
+
+def test_running_job_is_claimed_once(app, plaid, steps):
+    ran, _ = steps
+    _populate()
+    record_job('user-1')
+
+    assert claim_job('user-1')
+    # A second worker (or process) finds it running and leaves it alone
+    assert not claim_job('user-1')
+    assert run_purge('user-1').status == 'running'
+    assert ran == []
+
+    # Until the running worker has gone quiet for longer than the lease
+    db.session.execute(sa.update(UserPurge).values(heartbeat_at=datetime.datetime.now() - datetime.timedelta(seconds=purge.PURGE_LEASE_S + 1)))
+    db.session.commit()
+    assert run_purge('user-1').status == 'done'
+
+def test_worker_resumes_unfinished_jobs_when_it_starts(app, plaid):
+    _populate()
+    # Left behind by a process that died mid-purge
+    db.session.add(UserPurge(user_id='user-1', status='running', step='Expenses', rows_deleted=3,
+                             heartbeat_at=datetime.datetime.now() - datetime.timedelta(hours=1)))
+    db.session.commit()
+
+    PurgeWorker(app).start()
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        db.session.expire_all()
+        if db.session.get(UserPurge, 'user-1').status == 'done':
+            break
+        time.sleep(0.05)
+
+    assert db.session.get(UserPurge, 'user-1').status == 'done'
+    assert _rows(Expenses, 'user_id', 'user-1') == 0
+    # Resumed at Expenses: the earlier Plaid step was not repeated
+    assert plaid == []
@@ -0,0 +1,59 @@
+import datetime
+import json
+import numpy as np
+from models import RecurringStream
+from recurring import FREQUENCIES, MAX_HISTORY, detect_streams, update_recurring_streams
+
+START = datetime.date(2024, 1, 15)
+
+def _monthly(months, amount=15.99):
+    return [(datetime.date(2024 + (month // 12), month % 12 + 1, 15), amount) for month in range(months)]
+
+def _every(days, count, amount):
+    return [(START + datetime.timedelta(days=days * i), amount) for i in range(count)]
+
+def _detect(*merchants):
+    # merchants: lists of (date, amount); returns detect_streams' result
+    owner = np.repeat(np.arange(len(merchants)), [len(charges) for charges in merchants])
+    days = np.array([day.toordinal() for charges in merchants for day, _ in charges], dtype=np.int64)
+    amounts = np.array([amount for charges in merchants for _, amount in charges], dtype=float)
+    return detect_streams(owner, days, amounts, len(merchants))
+
+def _frequency(result, i):
+    return FREQUENCIES[result['frequency'][i]][0] if result['recurring'][i] else None
+
+def test_cadences_are_told_apart():
+    irregular = [(START + datetime.timedelta(days=offset), amount) for offset, amount in ((0, 42.0), (3, 7.5), (43, 120.0), (54, 9.99), (150, 64.0))]
+    # Detection does not depend on the order charges arrive in
+    result = _detect(list(reversed(_monthly(6))), _every(7, 8, 5.0), irregular)
+
+    assert [_frequency(result, i) for i in range(3)] == ['monthly', 'weekly', None]
+    assert result['counts'].tolist() == [6, 8, 5]
+    assert result['mean_amount'][0] == 15.99 and result['variation'][0] == 0
+    assert result['last_day'][0] == datetime.date(2024, 6, 15).toordinal()
+
+def test_too_few_charges_are_not_a_stream():
+    result = _detect(_monthly(2), _every(14, 3, 20.0))
+    assert [_frequency(result, i) for i in range(2)] == [None, 'biweekly']
+
+def test_same_day_splits_do_not_break_the_cadence():
+    charges = _every(7, 6, 5.0)
+    result = _detect(charges + [(charges[2][0], 1.0)])
+    assert _frequency(result, 0) == 'weekly'
+
+def _plaid(charges, name='NETFLIX.COM 8443'):
+    return [{'name': name, 'date': day.isoformat(), 'amount': amount} for day, amount in charges]
+
+def test_stream_history_is_capped(app):
+    charges = _every(7, MAX_HISTORY + 10, 9.99)
+    update_recurring_streams('user-1', _plaid(charges[:20]))
+    # Overlapping refetch plus the rest
+    [stream] = update_recurring_streams('user-1', _plaid(charges[10:]))
+
+    history = json.loads(stream.history)
+    assert len(history) == MAX_HISTORY
+    assert history[0][0] == charges[10][0].toordinal() and history[-1][0] == charges[-1][0].toordinal()
+    assert (stream.merchant, stream.frequency, stream.occurrences) == ('netflix', 'weekly', MAX_HISTORY)
+    assert stream.is_subscription
+    assert stream.next_date == charges[-1][0] + datetime.timedelta(days=7)
+    assert RecurringStream.query.count() == 1
@@ -0,0 +1,33 @@
+from config import db
+from models import AccessToken
+from search_index import index_plaid_transactions
+
+def _transactions(count):
+    return [
+        {'transaction_id': f'tx-{i}', 'name': f'COFFEE SHOP #{i}', 'merchant_name': 'Coffee Shop', 'amount': 4.5, 'date': '2024-05-01'}
+        for i in range(count)
+    ]
+
+def _search(client, headers, **params):
+    response = client.get('/api/search', query_string={'user_id': 'user-1', 'q': 'coffee', **params}, headers=headers)
+    assert response.status_code == 200
+    return response.json['results']
+
+def test_limit_is_clamped(client, headers, user):
+    index_plaid_transactions('user-1', _transactions(5))
+
+    assert len(_search(client, headers)) == 5
+    assert len(_search(client, headers, limit=2)) == 2
+    assert len(_search(client, headers, limit=-1)) == 1
+    assert len(_search(client, headers, limit=0)) == 1
+
+def test_removing_a_bank_account_drops_its_transactions(client, headers, user):
+    db.session.add(AccessToken(user_id='user-1', access_token='access-sandbox-1', item_id='item-1'))
+    db.session.commit()
+    index_plaid_transactions('user-1', _transactions(3))
+    index_plaid_transactions('user-2', [{**_transactions(1)[0], 'transaction_id': 'other'}])
+
+    response = client.post('/api/remove_bank_account', json={'user_id': 'user-1', 'key': 'test-key'})
+    assert response.status_code == 200
+    assert _search(client, headers) == []
+    assert len(_search(client, headers, user_id='user-2')) == 1
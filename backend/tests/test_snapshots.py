@@ -0,0 +1,70 @@
+import os
+import threading
+import numpy as np
+from categorization import categorize_transactions, seed_default_rules
+from snapshots import load_snapshot, snapshot_analytics, snapshot_path, update_snapshot, write_snapshot
+
+def _columns(rows):
+    return {
+        'ids': np.arange(rows, dtype=np.uint64),
+        'dates': np.full(rows, 19000, dtype=np.int32),
+        'amounts': np.full(rows, rows, dtype=np.int64),
+        'categories': np.zeros(rows, dtype=np.int16),
+        'savings': np.zeros(rows, dtype=np.uint8),
+    }
+
+def test_concurrent_rebuilds_of_one_snapshot(app):
+    path = snapshot_path('user-1')
+    errors = []
+
+    def rebuild(rows):
+        try:
+            for _ in range(20):
+                write_snapshot(path, _columns(rows), ['Food'])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=rebuild, args=(rows,)) for rows in range(1, 9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    snapshot = load_snapshot('user-1')
+    # Whichever write landed last, the file is that write and nothing else
+    assert (snapshot['amounts'] == snapshot['rows']).all()
+    assert [name for name in os.listdir(os.path.dirname(path)) if name.endswith('.tmp')] == []
+
+def _plaid(transaction_id, name, amount, primary):
+    return {'transaction_id': transaction_id, 'name': name, 'amount': amount, 'date': '2024-05-01',
+            'personal_finance_category': {'primary': primary}}
+
+def test_breakdown_groups_by_plaid_category(app):
+    transactions = [
+        _plaid('tx-1', 'Corner Grocer', 40.0, 'FOOD_AND_DRINK'),
+        _plaid('tx-2', 'Corner Grocer', 10.0, 'FOOD_AND_DRINK'),
+        _plaid('tx-3', 'City Transit', 25.0, 'TRANSPORTATION'),
+        _plaid('tx-4', 'Transfer to savings', 100.0, 'TRANSFER_OUT'),
+        _plaid('tx-5', 'ACME PAYROLL', -500.0, 'INCOME'),
+    ]
+    seed_default_rules()
+    # The same hooks, in the same order, as GET /api/transactions
+    update_snapshot('user-1', categorize_transactions('user-1', transactions))
+
+    analytics = snapshot_analytics('user-1')
+    assert analytics['categoryBreakdown'] == [
+        {'category': 'FOOD_AND_DRINK', 'amount': 50.0},
+        {'category': 'TRANSPORTATION', 'amount': 25.0},
+    ]
+    assert (analytics['totalIncome'], analytics['totalExpenses'], analytics['totalSavings']) == (500.0, 75.0, 100.0)
+
+def test_older_snapshot_layout_is_rebuilt(app):
+    path = snapshot_path('user-1')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(b'PPSNAP01' + b'\0' * 60)
+
+    assert load_snapshot('user-1') is None
+    update_snapshot('user-1', [_plaid('tx-1', 'Corner Grocer', 40.0, 'FOOD_AND_DRINK')])
+    assert load_snapshot('user-1')['rows'] == 1
@@ -0,0 +1,35 @@
+from xp_ledger import replay_ledger, xp_summary
+
+def _goal(current, target=100.0):
+    return {'target_amount': target, 'current_amount': current, 'deadline': '2030-01-01', 'user_id': 'user-1'}
+
+def _xp(client, headers):
+    response = client.get('/api/xp/user-1', headers=headers)
+    assert response.status_code == 200
+    return response.json['xp'], response.json['goals'], response.json['completed_goals']
+
+def test_goal_created_already_complete_earns_completion_xp(client, headers, user):
+    assert client.post('/goals', json=_goal(150.0)).status_code == 201
+    assert _xp(client, headers) == (20, 1, 1)
+
+    # Touching it again doesn't award it twice
+    assert client.put('/goals/1', json=_goal(200.0)).status_code == 200
+    assert _xp(client, headers) == (20, 1, 1)
+
+def test_goal_completed_later_and_deleted(client, headers, user):
+    client.post('/goals', json=_goal(10.0))
+    assert _xp(client, headers) == (10, 1, 0)
+
+    client.put('/goals/1', json=_goal(100.0))
+    assert _xp(client, headers) == (20, 1, 1)
+
+    client.delete('/goals/1')
+    assert _xp(client, headers) == (0, 0, 0)
+
+def test_replay_matches_materialized_totals(client, headers, user):
+    client.post('/goals', json=_goal(150.0))
+    client.post('/goals', json=_goal(10.0))
+    before = xp_summary('user-1')
+
+    replay_ledger()
+    assert xp_summary('user-1') == before
@@ -0,0 +1,213 @@
+import json
+import sqlalchemy as sa
+from sqlalchemy.orm import Session
+from config import db, app
+from models import Budget, Goal, Savings, XpEvent, XpTotals
+
+# Same rules the client used (LevelProgress.tsx / GoalsSideBar.tsx): 10 XP per goal, 10 more once it is reached
+GOAL_XP = 10
+GOAL_COMPLETED_XP = 10
+SAVINGS_XP = 5
+BUDGET_XP = 5
+
+# Badge name, number of goals that unlocks it
+BADGES = (
+    ('First Flight', 1),
+    ('Planning Cadet', 5),
+    ('Goal Getter', 10),
+    ('Mission Strategist', 15),
+    ('Flight Commander', 20),
+    ('Elite Pathfinder', 25),
+)
+
+ledger = XpEvent.__table__
+totals_table = XpTotals.__table__
+
+def level_info(xp):
+    level, remaining, required = 1, max(xp, 0), 100
+    while remaining >= required:
+        remaining -= required
+        level += 1
+        required = 100 + level * 20
+    return level, remaining, required
+
+def earned_badges(goals):
+    return [name for name, unlock_at in BADGES if goals >= unlock_at]
+
+def _event(user_id, event, ref, xp, goals=0, completed_goals=0):
+    return {'user_id': user_id, 'event': event, 'ref': ref, 'xp': xp, 'goals': goals, 'completed_goals': completed_goals}
+
+def _completion_awarded(connection, goal_ids):
+    # A goal has its completion XP if goal_completed was logged after the goal's latest goal_created
+    # (SQLite can hand a deleted goal's id to the next goal)
+    if not goal_ids:
+        return set()
+    latest = {}
+    rows = connection.execute(
+        sa.select(ledger.c.ref, ledger.c.event, sa.func.max(ledger.c.id))
+        .where(ledger.c.ref.in_([f'goal:{goal_id}' for goal_id in goal_ids]), ledger.c.event.in_(['goal_created', 'goal_completed']))
+        .group_by(ledger.c.ref, ledger.c.event)
+    )
+    for ref, event, last_id in rows:
+        latest[(ref, event)] = last_id
+    return {
+        goal_id for goal_id in goal_ids
+        if latest.get((f'goal:{goal_id}', 'goal_completed'), 0) > latest.get((f'goal:{goal_id}', 'goal_created'), 0)
+    }
+
+def collect_events(session, connection):
+    events = []
+    created_goals, touched_goals, deleted_goals = set(), set(), []
+
+    for obj in session.new:
+        if isinstance(obj, Goal):
+            events.append(_event(obj.user_id, 'goal_created', f'goal:{obj.id}', GOAL_XP, goals=1))
+            created_goals.add(obj.id)
+        elif isinstance(obj, Savings):
+            events.append(_event(obj.user_id, 'savings_added', f'savings:{obj.id}', SAVINGS_XP))
+            if obj.goal_id is not None:
+                touched_goals.add(obj.goal_id)
+        elif isinstance(obj, Budget):
+            events.append(_event(obj.user_id, 'budget_created', f'budget:{obj.id}', BUDGET_XP))
+
+    for obj in session.dirty:
+        if isinstance(obj, Goal) and session.is_modified(obj):
+            touched_goals.add(obj.id)
+        elif isinstance(obj, Savings) and session.is_modified(obj) and obj.goal_id is not None:
+            touched_goals.add(obj.goal_id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Goal):
+            deleted_goals.append(obj)
+        elif isinstance(obj, Savings):
+            events.append(_event(obj.user_id, 'savings_removed', f'savings:{obj.id}', -SAVINGS_XP))
+        elif isinstance(obj, Budget):
+            events.append(_event(obj.user_id, 'budget_removed', f'budget:{obj.id}', -BUDGET_XP))
+
+    deleted_ids = {goal.id for goal in deleted_goals}
+    touched_goals -= deleted_ids
+    awarded = _completion_awarded(connection, (touched_goals - created_goals) | deleted_ids)
+
+    # Deleting a goal takes back what it earned, as the client's count-based XP did
+    for goal in deleted_goals:
+        completed = goal.id in awarded
+        xp = -GOAL_XP - (GOAL_COMPLETED_XP if completed else 0)
+        events.append(_event(goal.user_id, 'goal_deleted', f'goal:{goal.id}', xp, goals=-1, completed_goals=-int(completed)))
+
+    # New goals can be created already reached; they have no completion XP yet by definition
+    events += _completed_goal_events(connection, touched_goals | created_goals, awarded)
+    return [event for event in events if event['user_id']]
+
+def _completed_goal_events(connection, goal_ids, awarded):
+    # Progress is read back from the database so savings applied by goal_progress.py count too
+    events = []
+    if goal_ids:
+        goals = connection.execute(
+            sa.select(Goal.id, Goal.user_id, Goal.target_amount, Goal.current_amount, Goal.saved_amount)
+            .where(Goal.id.in_(goal_ids))
+        )
+        for goal_id, user_id, target, current, saved in goals:
+            reached = target and max(current or 0, saved or 0) >= target
+            if reached and goal_id not in awarded:
+                events.append(_event(user_id, 'goal_completed', f'goal:{goal_id}', GOAL_COMPLETED_XP, completed_goals=1))
+    return events
+
+def apply_events(connection, events):
+    # Fold appended events into each user's totals row; the row is locked for the rest of the transaction
+    per_user = {}
+    for event in events:
+        event_id = connection.execute(ledger.insert().values(**event)).inserted_primary_key[0]
+        delta = per_user.setdefault(event['user_id'], {'xp': 0, 'goals': 0, 'completed_goals': 0, 'last_event_id': 0})
+        for name in ('xp', 'goals', 'completed_goals'):
+            delta[name] += event[name]
+        delta['last_event_id'] = event_id
+
+    for user_id, delta in per_user.items():
+        current = connection.execute(
+            sa.select(totals_table).where(totals_table.c.user_id == user_id).with_for_update()
+        ).mappings().first()
+        row = _totals_row(
+            user_id,
+            (current['xp'] if current else 0) + delta['xp'],
+            (current['goals'] if current else 0) + delta['goals'],
+            (current['completed_goals'] if current else 0) + delta['completed_goals'],
+            delta['last_event_id'],
+        )
+        if current:
+            connection.execute(totals_table.update().where(totals_table.c.user_id == user_id).values(**row))
+        else:
+            connection.execute(totals_table.insert().values(**row))
+
+def _totals_row(user_id, xp, goals, completed_goals, last_event_id):
+    return {'user_id': user_id, 'xp': xp, 'level': level_info(xp)[0], 'goals': goals, 'completed_goals': completed_goals,
+            'badges': json.dumps(earned_badges(goals)), 'last_event_id': last_event_id}
+
+def record_xp_events(session, flush_context):
+    # Ledger rows and totals commit (or roll back) with the goal / savings / budget write that caused them
+    if not any(isinstance(obj, (Goal, Savings, Budget)) for obj in (*session.new, *session.dirty, *session.deleted)):
+        return
+    connection = session.connection()
+    events = collect_events(session, connection)
+    if events:
+        apply_events(connection, events)
+
+def record_goal_progress(connection, goal_ids):
+    # For goal writes that bypass the ORM (counters.py): award completion XP in the caller's transaction
+    goal_ids = set(goal_ids)
+    events = [event for event in _completed_goal_events(connection, goal_ids, _completion_awarded(connection, goal_ids)) if event['user_id']]
+    if events:
+        apply_events(connection, events)
+
+def register_xp_listener():
+    if not sa.event.contains(Session, 'after_flush', record_xp_events):
+        sa.event.listen(Session, 'after_flush', record_xp_events)
+
+def replay_ledger():
+    # Rebuild every user's totals from scratch in one pass over the ledger
+    state = {}
+    rows = db.session.execute(
+        sa.select(ledger.c.id, ledger.c.user_id, ledger.c.xp, ledger.c.goals, ledger.c.completed_goals)
+        .order_by(ledger.c.id)
+        .execution_options(yield_per=1000)
+    )
+    for event_id, user_id, xp, goals, completed_goals in rows:
+        totals = state.setdefault(user_id, [0, 0, 0, 0])
+        totals[0] += xp
+        totals[1] += goals
+        totals[2] += completed_goals
+        totals[3] = event_id
+
+    db.session.execute(totals_table.delete())
+    rows = [_totals_row(user_id, *totals) for user_id, totals in state.items()]
+    for start in range(0, len(rows), 1000):
+        db.session.execute(totals_table.insert(), rows[start:start + 1000])
+    db.session.commit()
+    return len(rows)
+
+def xp_summary(user_id):
+    return xp_summaries([user_id])[user_id]
+
+def xp_summaries(user_ids):
+    # user id -> summary, from one query over the totals rows
+    rows = {totals.user_id: totals for totals in XpTotals.query.filter(XpTotals.user_id.in_(set(user_ids)))}
+    summaries = {}
+    for user_id in user_ids:
+        totals = rows.get(user_id)
+        xp = totals.xp if totals else 0
+        level, xp_into_level, xp_for_next = level_info(xp)
+        summaries[user_id] = {
+            'user_id': user_id,
+            'xp': xp,
+            'level': totals.level if totals else level,
+            'xp_into_level': xp_into_level,
+            'xp_for_next': xp_for_next,
+            'goals': totals.goals if totals else 0,
+            'completed_goals': totals.completed_goals if totals else 0,
+            'badges': json.loads(totals.badges) if totals else [],
+        }
+    return summaries
+
+if __name__ == "__main__":
+    with app.app_context():
+        replayed = replay_ledger()
+        print(f"✅ Replayed XP ledger into totals for {replayed} user(s).")